@@ -1,4 +1,5 @@
 import os
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from requestAPI.routing import websocket_urlpatterns
@@ -6,12 +7,20 @@ from requestAPI.routing import websocket_urlpatterns
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangoProject.settings')
 
 from requestAPI.middleware import JWTAuthMiddlewareStack
+from requestAPI.http_pool import ThreadPoolHTTPApplication
+from requestAPI.dispatcher import DispatcherLoopMiddleware
 
-application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+http_application = get_asgi_application()
+# by default sync views are serialised on one thread per process, ASGI_HTTP_THREADS runs them on a pool
+if settings.ASGI_HTTP_THREADS > 0:
+    http_application = ThreadPoolHTTPApplication(settings.ASGI_HTTP_THREADS)
+
+# socket notifications are sent from the server's loop, the one the consumers (and in-memory layer) live on
+application = DispatcherLoopMiddleware(ProtocolTypeRouter({
+    "http": http_application,
     "websocket": JWTAuthMiddlewareStack(
         URLRouter(
             websocket_urlpatterns
         )
     ),
-})
\ No newline at end of file
+}))
@@ -45,16 +45,44 @@ INSTALLED_APPS = [
 
 ASGI_APPLICATION = 'djangoProject.asgi.application'
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
-    },
-}
+# threads per process for HTTP views under daphne, 0 keeps Django's default of one thread-sensitive thread
+# (see requestAPI.http_pool) - each thread holds its own database connection
+ASGI_HTTP_THREADS = int(os.getenv('ASGI_HTTP_THREADS', '0'))
+
+# in-memory layer only reaches sockets connected to the same process, so when running on postgres
+# use the LISTEN/NOTIFY layer which fans group messages out across every worker process
+if os.getenv('DB_NAME'):
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "requestAPI.channel_layers.PostgresChannelLayer",
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        },
+    }
+
+# max events waiting in the in-process notification dispatcher before new ones are dropped
+NOTIFICATION_QUEUE_SIZE = int(os.getenv('NOTIFICATION_QUEUE_SIZE', '1000'))
+
+# most missed notifications sent to a socket reconnecting with ?last_seen_id=, beyond it the client is told to resync
+NOTIFICATION_REPLAY_LIMIT = int(os.getenv('NOTIFICATION_REPLAY_LIMIT', '50'))
+
+# unpaginated service request and user lists are built from values_list() rows instead of the DRF serializers,
+# same JSON - see requestAPI.fast_serializers
+FAST_LIST_SERIALIZATION = os.getenv('FAST_LIST_SERIALIZATION', 'True') == 'True'
+
+# most service requests one service-requests/bulk_update_status call may move
+BULK_STATUS_MAX_IDS = int(os.getenv('BULK_STATUS_MAX_IDS', '100'))
 
 # Middleware
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # before anything else that touches the body on the way out, see requestAPI.compression
+    'requestAPI.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -109,6 +137,18 @@ else:
         }
     }
 
+# Cache - local memory by default (and in tests). Every deployment with more than one process (gunicorn workers,
+# daphne next to them) has to point CACHE_BACKEND/CACHE_LOCATION at a shared backend so invalidations and token
+# revocations reach every worker - docker-compose runs memcached (PyMemcacheCache). Without one the response caches
+# are bypassed, and JWT claims are only trusted on a shared cache outside the database (the database cache works for
+# the response caches but saves no query on auth) - see requestAPI.cache.cache_is_shared/cache_is_out_of_db
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
 # Password validators, recommened
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -158,11 +198,42 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'requestAPI.utils.error_log_exception_handler',
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'requestAPI.authentication.ClaimsJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson when it is installed, DRF's json otherwise - see requestAPI.renderers
+    'DEFAULT_RENDERER_CLASSES': [
+        'requestAPI.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'requestAPI.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+
+# Response compression - gzip always, br and zstd once the brotli/zstandard packages are installed.
+# See requestAPI.compression.DEFAULTS for the content types and levels
+COMPRESSION = {
+    'ENCODINGS': os.getenv('COMPRESSION_ENCODINGS', 'br,zstd,gzip').split(','),
+    'MIN_SIZE': int(os.getenv('COMPRESSION_MIN_SIZE', '1024')),
+}
+
+
+# Error logging - see requestAPI.error_logging, 4xx responses are not stored unless listed in INCLUDE_STATUS_CODES
+ERROR_LOGGING = {
+    'MIN_STATUS_CODE': int(os.getenv('ERROR_LOG_MIN_STATUS_CODE', '500')),
+    'INCLUDE_STATUS_CODES': [int(code) for code in os.getenv('ERROR_LOG_INCLUDE_STATUS_CODES', '').split(',') if code],
+    'EXCLUDE_STATUS_CODES': [int(code) for code in os.getenv('ERROR_LOG_EXCLUDE_STATUS_CODES', '').split(',') if code],
+    # tests that read ErrorLog rows switch this off with override_settings
+    'ASYNC': os.getenv('ERROR_LOG_ASYNC', 'True') == 'True',
+    'FLUSH_INTERVAL': 5,
+    'MAX_BUFFER': 200,
+    'SAMPLE_RATE': float(os.getenv('ERROR_LOG_SAMPLE_RATE', '0.1')),
 }
 
 
@@ -182,5 +253,9 @@ SIMPLE_JWT = {
     'BLACKLIST_ENABLED': True,
 }
 
+# full user objects kept per process by ClaimsJWTAuthentication for writes and revoked tokens
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', '1024'))
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', '60'))
+
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 SECURE_SSL_REDIRECT = False
\ No newline at end of file
@@ -0,0 +1,16 @@
+# gunicorn settings for serving the HTTP API over WSGI, with daphne left to serve only /ws/
+# e.g. gunicorn djangoProject.wsgi:application -c gunicorn.conf.py
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# threads per worker, each holds its own database connection so workers * threads must fit the db's limit
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+keepalive = 5
+# recycle workers now and then so a slow leak can't build up
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = 100
+accesslog = '-'
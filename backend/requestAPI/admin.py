@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ServiceType, ServiceRequest, Update, Building, ErrorLog
+from .models import ServiceType, ServiceRequest, Update, Building, ErrorLog, NotificationOutbox
 
 
 @admin.register(ServiceType)
@@ -29,6 +29,13 @@ class BuildingAdmin(admin.ModelAdmin):
 
 @admin.register(ErrorLog)
 class ErrorLogAdmin(admin.ModelAdmin):
-    list_display = ('timestamp', 'endpoint', 'error_message')
-    search_fields = ('endpoint', 'error_message')
-    list_filter = ('timestamp',)
+    list_display = ('timestamp', 'last_seen', 'occurrences', 'status_code', 'endpoint', 'exception_type')
+    search_fields = ('endpoint', 'exception_type', 'error_message')
+    list_filter = ('timestamp', 'last_seen', 'status_code')
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ('id', 'created_date', 'attempts', 'next_attempt_date', 'delivered_date')
+    search_fields = ('last_error',)
+    list_filter = ('delivered_date', 'created_date')
@@ -4,6 +4,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
+from requestAPI.authentication import ClaimsRefreshToken
+from django.contrib.auth.models import User
 from rest_framework_simplejwt.exceptions import TokenError
 from requestAPI.serializers import UserSerializer, UpdatePasswordSerializer
 from django.core.exceptions import ValidationError
@@ -47,7 +49,8 @@ class AuthViewSet(viewsets.GenericViewSet):
         user = authenticate(username=username, password=password)
         if user:
             # really need to change this to handle refresh on server side - will create Jira task if time
-            refresh = RefreshToken.for_user(user)
+            # access tokens carry the user's claims so read requests don't need to load the user
+            refresh = ClaimsRefreshToken.for_user(user)
             serializer = self.get_serializer(user) 
             return Response({
                 'access': str(refresh.access_token),
@@ -80,9 +83,12 @@ class AuthViewSet(viewsets.GenericViewSet):
         if not refresh_token:
             return Response({'error': 'Refresh token not provided'}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            refresh = RefreshToken(refresh_token)
+            refresh = ClaimsRefreshToken(refresh_token)
+            user = User.objects.filter(id=refresh['user_id'], is_active=True).first()
+            if user is None:
+                return Response({'error': 'Invalid refresh token'}, status=status.HTTP_401_UNAUTHORIZED)
             return Response({
-                'access': str(refresh.access_token),
+                'access': str(refresh.access_token_for(user)),
                 'refresh': str(refresh)
             })
         except TokenError:
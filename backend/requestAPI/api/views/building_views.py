@@ -6,6 +6,7 @@ from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from requestAPI.models import Building
 from requestAPI.serializers import BuildingSerializer, UserSimpleSerializer
+from requestAPI.cache import cached_action, BUILDINGS
 from rest_framework.decorators import action
 from django.contrib.auth.models import User
 
@@ -36,12 +37,12 @@ class BuildingViewSet(viewsets.ModelViewSet):
         return Building.objects.filter(users=user)  
 
     @action(detail=False, methods=['get'])
-    # this can technically be removed as redundant could just call list and filter fields but prefer to keep seperate 
-    # plan to make changes to this in the future
+    # public, so only what the registration form needs - no addresses or assigned users. Served from the cache
+    # until a building changes, browsers revalidate with If-None-Match and get a 304 while nothing has
+    @cached_action(BUILDINGS, timeout=3600, etag=True, cache_control='public, max-age=60')
     def registration_list(self, request):
-        buildings = Building.objects.all()
-        serializer = self.get_serializer(buildings, many=True)
-        return Response(serializer.data)
+        buildings = Building.objects.order_by('id').values('id', 'name', 'city', 'postcode')
+        return Response(list(buildings))
     
     @action(detail=True, methods=['get'])
     def users(self, request, pk=None):
@@ -3,18 +3,22 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
 from django.utils import timezone
-from datetime import timedelta
-from django.db.models import Count
-from django.db.models.functions import TruncDay
-from ...models import ServiceRequest, Update
+from datetime import datetime, time, timedelta
+from django.db.models import Count, Sum
+from ...models import ServiceRequest, Update, DailyRequestStats
 from requestAPI.serializers import UpdateSerializer, ServiceRequestSerializer
 from django.db.models import Q
+from requestAPI.dispatcher import notification_dispatcher
+from requestAPI.cache import cached_action, DASHBOARD
+from requestAPI.pagination import UpdateTimelinePagination
+from requestAPI.read_markers import ReadMarkers
 
 
 class DashboardViewSet(viewsets.ViewSet):
     permission_classes = [IsAdminUser]
 
     @action(detail=False, methods=['get'])
+    @cached_action(DASHBOARD, query_params=['timeframe'])
     def requests_over_time(self, request):
         """Returns service requests over time for a specified timeframe (7 days, 30 days, or 3 months)."""
         # Get the timeframe from query params (default to '3months')
@@ -30,10 +34,16 @@ class DashboardViewSet(viewsets.ViewSet):
         else:  # Default to last 3 months (90 days)
             start_date = current_date - timedelta(days=90)
 
-        # Group service requests by day and count the number of requests each day
-        requests_over_time = ServiceRequest.objects.filter(
-            created_date__gte=start_date
-        ).annotate(day=TruncDay('created_date')).values('day').annotate(count=Count('id')).order_by('day')
+        # Read the per-day counts from the rollup table (maintained by signals) rather than grouping ServiceRequest
+        daily_counts = DailyRequestStats.objects.filter(
+            day__gte=timezone.localtime(start_date).date()
+        ).values('day').annotate(count=Sum('count')).filter(count__gt=0).order_by('day')
+
+        # same shape as the old TruncDay output - midnight of each day in the current time zone
+        requests_over_time = [
+            {'day': timezone.make_aware(datetime.combine(row['day'], time.min)), 'count': row['count']}
+            for row in daily_counts
+        ]
 
         return Response({'requests_over_time': requests_over_time})
     
@@ -51,10 +61,18 @@ class DashboardViewSet(viewsets.ViewSet):
         updates_today = Update.objects.filter(
             created_date__date=current_date, 
             type="message"  
-        ).order_by('-created_date')
+        ).select_related('created_by').order_by('-created_date')
+
+        # opt-in keyset pages (?page_size= / ?cursor=), the page goes in the same updates_today key
+        paginator = UpdateTimelinePagination()
+        page = paginator.paginate_queryset(updates_today, request, view=self)
+        # the admin's own updates under their read watermark are reported as read, like UpdateViewSet does
+        context = {'read_markers': ReadMarkers(request.user.id)}
+        if page is not None:
+            return Response({'updates_today': UpdateSerializer(page, many=True, context=context).data, 'next': paginator.get_next_link()})
 
         # Serialize the updates using your existing UpdateSerializer
-        updates_serialized = UpdateSerializer(updates_today, many=True)
+        updates_serialized = UpdateSerializer(updates_today, many=True, context=context)
 
         return Response({'updates_today': updates_serialized.data})
     
@@ -66,7 +84,7 @@ class DashboardViewSet(viewsets.ViewSet):
         three_days_ahead = current_date + timedelta(days=3)
 
         # Filter for requests with SLA date either within the next 3 days or overdue
-        urgent_requests = ServiceRequest.objects.filter(
+        urgent_requests = ServiceRequest.objects.with_details().filter(
             service_level_agreement_date__lte=three_days_ahead,  # SLA date is either overdue or within the next 3 days
             status__in=['open', 'in_progress']  # Only include open or in-progress requests
         ).order_by('service_level_agreement_date')  # Sort by closest SLA date first
@@ -77,37 +95,53 @@ class DashboardViewSet(viewsets.ViewSet):
         return Response({'actions_required': serialized_requests.data})
 
     @action(detail=False, methods=['get'])
+    @cached_action(DASHBOARD)
     def requests_by_building(self, request):
         """Returns service requests grouped by building (not time-sensitive)."""
         # Get the count of requests for each building, no time filtering
-        requests_by_building = ServiceRequest.objects.values('building__name').annotate(count=Count('id')).order_by('-count')
+        requests_by_building = list(ServiceRequest.objects.values('building__name').annotate(count=Count('id')).order_by('-count'))
 
         return Response({'requests_by_building': requests_by_building})
 
     @action(detail=False, methods=['get'])
+    @cached_action(DASHBOARD)
     def requests_by_service_type(self, request):
         """Returns service requests grouped by service type (not time-sensitive)."""
         # Get the count of requests for each service type, no time filtering
-        requests_by_service_type = ServiceRequest.objects.values('service_request_item__name').annotate(count=Count('id')).order_by('-count')
+        requests_by_service_type = list(ServiceRequest.objects.values('service_request_item__name').annotate(count=Count('id')).order_by('-count'))
 
         return Response({'requests_by_service_type': requests_by_service_type})
 
     @action(detail=False, methods=['get'])
+    # short timeout as overdue/due soon counts move with the clock, not just with writes
+    @cached_action(DASHBOARD, timeout=60)
     def general_stats(self, request):
-        """Returns general statistics (open, in-progress, completed, and overdue requests)."""
+        """Returns general statistics (status counts, plus overdue, due within 24 hours and per-priority counts of open/in-progress requests) from a single query."""
         current_date = timezone.now()
-
-        stats = {
-            'open_requests': {
-                'value': ServiceRequest.objects.filter(status='open').count(),
-            },
-            'in_progress_requests': {
-                'value': ServiceRequest.objects.filter(status='in_progress').count(),
-            },
-            'completed_requests': {
-                'value': ServiceRequest.objects.filter(status='completed').count(),
+        active = Q(status__in=['open', 'in_progress'])
+
+        # one conditional aggregate instead of a count() per tile
+        counts = ServiceRequest.objects.aggregate(
+            open_requests=Count('id', filter=Q(status='open')),
+            in_progress_requests=Count('id', filter=Q(status='in_progress')),
+            completed_requests=Count('id', filter=Q(status='completed')),
+            cancelled_requests=Count('id', filter=Q(status='cancelled')),
+            overdue_requests=Count('id', filter=active & Q(service_level_agreement_date__lt=current_date)),
+            due_within_24h_requests=Count('id', filter=active & Q(
+                service_level_agreement_date__gte=current_date,
+                service_level_agreement_date__lte=current_date + timedelta(hours=24)
+            )),
+            **{
+                f'{priority}_priority_requests': Count('id', filter=active & Q(priority=priority))
+                for priority, _ in ServiceRequest.PRIORITY_CHOICES
             }
-        }
+        )
+
+        stats = {name: {'value': value} for name, value in counts.items()}
 
         return Response({'stats': stats})
 
+    @action(detail=False, methods=['get'])
+    def notification_metrics(self, request):
+        """Returns queue depth, dropped and sent counters for this process's notification dispatcher."""
+        return Response({'notification_metrics': notification_dispatcher.stats()})
@@ -2,16 +2,46 @@ from rest_framework import viewsets, status, filters
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from collections import Counter
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
 from ...models import ServiceRequest, Update, User, ServiceType
-from ...serializers import ServiceRequestSerializer, ServiceTypeSerializer
+from ...serializers import ServiceRequestSerializer, ServiceTypeSerializer, UpdateSerializer
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied
-from requestAPI.utils import send_notification_to_user, publish_notification
+from requestAPI.utils import (
+    send_notification_to_user, send_notifications_to_users, publish_notification, publish_notifications,
+    send_admin_event, send_timeline_updates, status_changed_payload, comment_added_payload
+)
+from requestAPI.pagination import ServiceRequestCursorPagination
+from requestAPI.rollups import record_status_changes
+from requestAPI.cache import bump_cache_version_on_commit, DASHBOARD
+from requestAPI.read_markers import adjust_unread_count
+from requestAPI.fast_serializers import ValuesListMixin, serialize_service_requests
 
-class ServiceRequestViewSet(viewsets.ModelViewSet):
+
+def bulk_create_updates(updates):
+    """bulk_create that always sets the new ids on the given updates."""
+    if connection.features.can_return_rows_from_bulk_insert:
+        return Update.objects.bulk_create(updates)
+    # sqlite doesn't return them - the caller's transaction has already written, so it holds sqlite's write lock
+    # and every id past the previous highest is one of these rows, in insert order
+    last_id = Update.objects.aggregate(last=Max('id'))['last'] or 0
+    Update.objects.bulk_create(updates)
+    for update, update_id in zip(updates, Update.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)):
+        update.id = update_id
+    return updates
+
+
+class ServiceRequestViewSet(ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = ServiceRequestSerializer
+    # plain (unpaginated) lists skip the serializer
+    values_list_serializer = staticmethod(serialize_service_requests)
     permission_classes = [IsAuthenticated]
+    # opt-in, only when ?page_size= or ?cursor= is passed
+    pagination_class = ServiceRequestCursorPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['id', 'service_request_item', 'building', 'priority', 'status', 'created_date', 'service_level_agreement_date']
     ordering_fields = ['id', 'service_request_item', 'building', 'priority', 'status', 'created_date', 'service_level_agreement_date']
@@ -20,7 +50,8 @@ class ServiceRequestViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         service_request_id = self.request.query_params.get('id', None)
-        queryset = ServiceRequest.objects.all()
+        # only the nested objects a ?fields=/?expand= request will serialize are loaded
+        queryset = ServiceRequest.objects.with_details(self.get_serializer_class().expanded_relations(self.request))
         if user.is_superuser:
             return queryset.order_by('service_level_agreement_date')
 
@@ -41,6 +72,7 @@ class ServiceRequestViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
+    @transaction.atomic
     def perform_create(self, serializer):
         service_request = serializer.save()
         Update.objects.create(
@@ -50,9 +82,16 @@ class ServiceRequestViewSet(viewsets.ModelViewSet):
             service_request=service_request,
             type="event"
         )
+        send_admin_event(
+            "request_created",
+            service_request,
+            service_type_id=service_request.service_request_item_id,
+            created_by_id=service_request.created_by_id
+        )
         return service_request
     
     @action(detail=True, methods=['patch'])
+    @transaction.atomic
     def update_status(self, request, pk=None):
         service_request = self.get_object()
         previous_status = service_request.status
@@ -83,20 +122,8 @@ class ServiceRequestViewSet(viewsets.ModelViewSet):
                             "type": status_update.type
                 }
                 send_notification_to_user(service_request.created_by.id, notification)
-                publish_notification({
-                    "requestId": service_request.id,
-                    "type": "STATUS_CHANGED",
-                    "recipientEmail": service_request.created_by.email,
-                    "recipientName": service_request.created_by.get_full_name(),
-                    "recipientRole": "customer",
-                    "service": service_request.service_request_item.name,
-                    "building": service_request.building.name,
-                    "priority": service_request.priority,
-                    "slaDate": service_request.service_level_agreement_date.isoformat(),
-                    "timestamp": status_update.created_date.isoformat(),
-                    "previousStatus": previous_status,
-                    "newStatus": new_status
-                })
+                publish_notification(status_changed_payload(service_request, status_update, previous_status, new_status))
+                send_admin_event("status_changed", service_request, previous_status=previous_status)
 
             comment = request.data.get('comment')
             if comment:
@@ -109,31 +136,126 @@ class ServiceRequestViewSet(viewsets.ModelViewSet):
                     type="message"
                 )
 
-                publish_notification({
-                    "requestId": service_request.id,
-                    "type": "COMMENT_ADDED",
-                    "recipientEmail": service_request.created_by.email,
-                    "recipientName": service_request.created_by.get_full_name(),
-                    "recipientRole": "customer",
-                    "service": service_request.service_request_item.name,
-                    "building": service_request.building.name,
-                    "priority": service_request.priority,
-                    "slaDate": service_request.service_level_agreement_date.isoformat(),
-                    "timestamp": comment_update.created_date.isoformat(),
-                    "commentAuthor": request.user.get_full_name(),
-                    "commentContent": comment
-                })
+                publish_notification(comment_added_payload(service_request, comment_update, request.user))
+                send_admin_event(
+                    "comment_added",
+                    service_request,
+                    update_id=comment_update.id,
+                    created_by_id=request.user.id,
+                    update_type=comment_update.type
+                )
                 
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
      
+    @action(detail=False, methods=['post'])
+    @transaction.atomic
+    def bulk_update_status(self, request):
+        # update_status for many requests at once - one transaction, a queryset update, bulk inserted Update events
+        # and one batched socket dispatch. Returns a result per id: updated, unchanged (already in that status)
+        # or not_found
+        if not request.user.is_superuser:
+            raise PermissionDenied("Only admins can update service requests in bulk.")
+        ids = request.data.getlist('ids') if hasattr(request.data, 'getlist') else request.data.get('ids')
+        new_status = request.data.get('status')
+        comment = request.data.get('comment')
+        max_ids = getattr(settings, 'BULK_STATUS_MAX_IDS', 100)
+        if not isinstance(ids, list) or not ids or not all(str(id).isdigit() for id in ids):
+            return Response({"error": "ids must be a list of service request ids."}, status=status.HTTP_400_BAD_REQUEST)
+        ids = list(dict.fromkeys(int(id) for id in ids))
+        if len(ids) > max_ids:
+            return Response({"error": f"At most {max_ids} service requests can be updated at once."}, status=status.HTTP_400_BAD_REQUEST)
+        if new_status not in dict(ServiceRequest.STATUS_CHOICES).keys():
+            return Response({"error": "Invalid status value."}, status=status.HTTP_400_BAD_REQUEST)
+        friendly_status = dict(ServiceRequest.STATUS_CHOICES)[new_status]
+
+        service_requests = {
+            service_request.id: service_request for service_request in
+            ServiceRequest.objects.select_for_update().select_related('created_by', 'building', 'service_request_item').filter(id__in=ids)
+        }
+        moved = [service_request for service_request in service_requests.values() if service_request.status != new_status]
+        previous_statuses = {service_request.id: service_request.status for service_request in moved}
+
+        # update() skips the ServiceRequest signals, so the rollup and dashboard cache are kept in step here
+        record_status_changes(moved, new_status)
+        now = timezone.now()
+        ServiceRequest.objects.filter(id__in=previous_statuses).update(status=new_status, updated_date=now)
+        bump_cache_version_on_commit(DASHBOARD)
+        for service_request in moved:
+            service_request.status = new_status
+            service_request.updated_date = now
+
+        status_updates = [
+            Update(
+                title=f"Request {service_request.id} Status Update",
+                message=f"Request {service_request.id} has been moved to {friendly_status}",
+                created_by=request.user,
+                associated_to=service_request.created_by,
+                service_request=service_request,
+                type="event"
+            ) for service_request in moved
+        ]
+        comment_updates = [
+            Update(
+                title=f"A Comment has been added to Request {service_request.id}",
+                message=comment,
+                created_by=request.user,
+                associated_to=service_request.created_by,
+                service_request=service_request,
+                type="message"
+            ) for service_request in moved
+        ] if comment else []
+        updates = bulk_create_updates(status_updates + comment_updates)
+
+        # bulk_create() skips the Update signals too - unread counters and request timelines
+        unread = Counter(update.associated_to_id for update in updates if update.associated_to_id != request.user.id)
+        for user_id, count in unread.items():
+            adjust_unread_count(user_id, count)
+        send_timeline_updates(dict(UpdateSerializer(update).data) for update in updates)
+
+        send_notifications_to_users(
+            (update.associated_to_id, {
+                "id": update.id,
+                "title": update.title,
+                "message": update.message,
+                "service_request_id": update.service_request_id,
+                "type": update.type
+            }) for update in status_updates
+        )
+        payloads = []
+        for update in status_updates:
+            service_request = update.service_request
+            payloads.append(status_changed_payload(service_request, update, previous_statuses[service_request.id], new_status))
+            send_admin_event("status_changed", service_request, previous_status=previous_statuses[service_request.id])
+        for update in comment_updates:
+            service_request = update.service_request
+            payloads.append(comment_added_payload(service_request, update, request.user))
+            send_admin_event(
+                "comment_added",
+                service_request,
+                update_id=update.id,
+                created_by_id=request.user.id,
+                update_type=update.type
+            )
+        publish_notifications(payloads)
+
+        results = []
+        for id in ids:
+            if id not in service_requests:
+                results.append({"id": id, "result": "not_found"})
+            elif id in previous_statuses:
+                results.append({"id": id, "result": "updated", "previous_status": previous_statuses[id], "status": new_status})
+            else:
+                results.append({"id": id, "result": "unchanged", "status": new_status})
+        return Response({"results": results})
+
     @action(detail=False, methods=['get'])
     def user_home_data(self, request):
         # get user requests
         queryset = ServiceRequest.objects.filter(created_by=request.user)
         
         # get 10 most recent
-        recent_requests = queryset.order_by('-created_date')[:10]
+        recent_requests = queryset.with_details().order_by('-created_date')[:10]
         recent_requests_serialized = ServiceRequestSerializer(recent_requests, many=True, context={'request': request}).data
 
         # get service types for those request and return unique
@@ -5,17 +5,35 @@ from ...serializers import UpdateSerializer
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django_filters.rest_framework import DjangoFilterBackend
+from django_filters import rest_framework as filters
 from ...models import Update, ServiceRequest
 from ...serializers import UpdateSerializer
 from django.shortcuts import get_object_or_404
-from requestAPI.utils import send_notification_to_user, publish_notification
+from django.db import transaction
+from requestAPI.utils import send_notification_to_user, send_unread_count, publish_notification, send_admin_event, comment_added_payload
+from requestAPI.pagination import UpdateTimelinePagination
+from requestAPI.read_markers import ReadMarkers, mark_all_read, mark_read, get_unread_count
+
+class UpdateFilter(filters.FilterSet):
+    # read the way the serializer reports it, i.e. with the user's read watermarks applied
+    is_read = filters.BooleanFilter(method='filter_is_read')
+
+    class Meta:
+        model = Update
+        fields = ['service_request', 'type', 'is_read']
+
+    def filter_is_read(self, queryset, name, value):
+        return queryset.read_state_for(self.request.user.id, value)
+
 
 class UpdateViewSet(viewsets.ModelViewSet):
     serializer_class = UpdateSerializer
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['service_request', 'type', 'is_read']
+    filterset_class = UpdateFilter
     lookup_field = 'id'
+    # opt-in, only when ?page_size= or ?cursor= is passed - ?ordering=created_date pages oldest first
+    pagination_class = UpdateTimelinePagination
+    ordering_fields = ['created_date']
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:                                                                                                                                        
@@ -26,16 +44,26 @@ class UpdateViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        # created_by is nested in every serialized update
+        queryset = Update.objects.select_related('created_by')
         if self.action != 'service_request_updates':
             if not user.is_superuser and not user.is_staff:
-                return Update.objects.filter(associated_to=user)
+                return queryset.filter(associated_to=user)
             else:
-                return Update.objects.all()
+                return queryset
         else:
-            return Update.objects.all() 
-        
+            return queryset
+
+    def get_serializer_context(self):
+        # updates under the user's read watermark are reported as read, see NotificationReadMarker
+        context = super().get_serializer_context()
+        if self.request.user.is_authenticated:
+            context['read_markers'] = ReadMarkers(self.request.user.id)
+        return context
+
     
 
+    @transaction.atomic
     def perform_create(self, serializer):
         service_request_id = self.kwargs.get('service_request_id') or self.request.data.get('service_request')
         service_request = ServiceRequest.objects.get(id=service_request_id)
@@ -61,6 +89,13 @@ class UpdateViewSet(viewsets.ModelViewSet):
             service_request=service_request,  
             type=update_type
         )
+        send_admin_event(
+            "comment_added",
+            service_request,
+            update_id=update.id,
+            created_by_id=self.request.user.id,
+            update_type=update.type
+        )
 
         # send update to user if user is connected
         if associated_to:
@@ -72,20 +107,7 @@ class UpdateViewSet(viewsets.ModelViewSet):
                 "type": update.type
             }
             send_notification_to_user(associated_to.id, notification)
-            publish_notification({
-                "requestId": service_request.id,
-                "type": "COMMENT_ADDED",
-                "recipientEmail": associated_to.email,
-                "recipientName": associated_to.get_full_name() or associated_to.username,
-                "recipientRole": "customer",
-                "service": service_request.service_request_item.name,
-                "building": service_request.building.name,
-                "priority": service_request.priority,
-                "slaDate": service_request.service_level_agreement_date.isoformat(),
-                "timestamp": update.created_date.isoformat(),
-                "commentAuthor": self.request.user.get_full_name() or self.request.user.username,
-                "commentContent": update.message
-            })
+            publish_notification(comment_added_payload(service_request, update, self.request.user))
 
     @action(detail=False, methods=['get', 'post'])
     def service_request_updates(self, request):
@@ -94,6 +116,9 @@ class UpdateViewSet(viewsets.ModelViewSet):
             if not service_request_id:
                 return Response({"error": "service_request_id is required"}, status=status.HTTP_400_BAD_REQUEST)
             updates = self.get_queryset().filter(service_request_id=service_request_id)
+            page = self.paginate_queryset(updates)
+            if page is not None:
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
             serializer = self.get_serializer(updates, many=True)
             return Response(serializer.data)
         
@@ -113,30 +138,26 @@ class UpdateViewSet(viewsets.ModelViewSet):
                 else:
                     associated_to_user = service_request.created_by
 
-                update = Update.objects.create(
-                    title=title,
-                    message=message,
-                    created_by=request.user,
-                    service_request=service_request,
-                    type="message",
-                    associated_to=associated_to_user
-                )
-                serializer = UpdateSerializer(update)
-                if associated_to_user:
-                    publish_notification({
-                        "requestId": service_request.id,
-                        "type": "COMMENT_ADDED",
-                        "recipientEmail": associated_to_user.email,
-                        "recipientName": associated_to_user.get_full_name() or associated_to_user.username,
-                        "recipientRole": "customer",
-                        "service": service_request.service_request_item.name,
-                        "building": service_request.building.name,
-                        "priority": service_request.priority,
-                        "slaDate": service_request.service_level_agreement_date.isoformat(),
-                        "timestamp": update.created_date.isoformat(),
-                        "commentAuthor": request.user.get_full_name() or request.user.username,
-                        "commentContent": message
-                    })
+                # Update and its outbox notification commit together
+                with transaction.atomic():
+                    update = Update.objects.create(
+                        title=title,
+                        message=message,
+                        created_by=request.user,
+                        service_request=service_request,
+                        type="message",
+                        associated_to=associated_to_user
+                    )
+                    serializer = UpdateSerializer(update)
+                    send_admin_event(
+                        "comment_added",
+                        service_request,
+                        update_id=update.id,
+                        created_by_id=request.user.id,
+                        update_type=update.type
+                    )
+                    if associated_to_user:
+                        publish_notification(comment_added_payload(service_request, update, request.user))
 
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -146,15 +167,23 @@ class UpdateViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def notifications(self, request):
         user = self.request.user
-        updates = self.get_queryset().filter(associated_to=user, is_read=False).exclude(created_by=user).order_by('is_read', '-created_date')
+        # unread_for only returns unread rows, newest first is update_unread_idx's order
+        updates = self.get_queryset().unread_for(user.id).exclude(created_by=user).order_by('-created_date', '-id')
+        page = self.paginate_queryset(updates)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
         serializer = self.get_serializer(updates, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
-        user = request.user
-        updates = self.get_queryset().filter(is_read=False, associated_to=user)
-        updates.update(is_read=True)
+        # moves the user's read watermark (one row) rather than updating every unread Update,
+        # pass service_request to only mark that request's updates
+        service_request_id = request.data.get('service_request')
+        if service_request_id and not str(service_request_id).isdigit():
+            return Response({"error": "Invalid service_request."}, status=status.HTTP_400_BAD_REQUEST)
+        if mark_all_read(request.user.id, int(service_request_id) if service_request_id else None) is not None:
+            send_unread_count(request.user.id)
         return Response({'status': 'All updates marked as read'})
 
     @action(detail=True, methods=['post'])
@@ -164,6 +193,11 @@ class UpdateViewSet(viewsets.ModelViewSet):
         if request.user != update.associated_to:
             return Response({"error": "You do not have permission to mark this update as read."}, status=status.HTTP_403_FORBIDDEN)
 
-        update.is_read = True
-        update.save()
-        return Response({'status': 'Update marked as read'})
\ No newline at end of file
+        if mark_read(request.user.id, update.id):
+            send_unread_count(request.user.id)
+        return Response({'status': 'Update marked as read'})
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        # the notification badge, read from UnreadNotificationCounter rather than counting updates
+        return Response({'unread_count': get_unread_count(request.user.id)})
\ No newline at end of file
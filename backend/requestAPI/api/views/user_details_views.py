@@ -2,14 +2,17 @@ from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from requestAPI.serializers import UserSerializer
+from requestAPI.fast_serializers import ValuesListMixin, serialize_users
 from django.contrib.auth.models import User
 from requestAPI.models import Building
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 from rest_framework.decorators import action
 from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = UserSerializer
+    # the list skips the serializer
+    values_list_serializer = staticmethod(serialize_users)
     queryset = User.objects.all()  # base queryset for users
 
     def get_permissions(self):
@@ -20,9 +23,16 @@ class UserViewSet(viewsets.ModelViewSet):
             self.permission_classes = [IsAuthenticated]
         return super().get_permissions()
 
+    def with_buildings(self, queryset):
+        # UserSerializer lists every user's buildings, loaded in one query unless ?fields=/?expand= leaves them out.
+        # id order, the same as requestAPI.fast_serializers
+        if 'buildings' in self.get_serializer_class().expanded_relations(self.request):
+            return queryset.prefetch_related(Prefetch('buildings', queryset=Building.objects.order_by('id')))
+        return queryset
+
     def get_queryset(self):
         # filter users based on query parameter for searching
-        queryset = super().get_queryset()
+        queryset = self.with_buildings(super().get_queryset())
         query = self.request.query_params.get('query', None)
         if query:
             return queryset.filter(
@@ -82,7 +92,7 @@ class UserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def superusers(self, request):
-        superusers = User.objects.filter(is_superuser=True)
+        superusers = self.with_buildings(User.objects.filter(is_superuser=True))
         serializer = self.get_serializer(superusers, many=True)
         return Response(serializer.data)
 
@@ -94,7 +104,7 @@ class UserViewSet(viewsets.ModelViewSet):
 
         try:
             building = Building.objects.get(pk=building_id)
-            users_not_assigned = User.objects.exclude(buildings=building).filter(is_staff=False)
+            users_not_assigned = self.with_buildings(User.objects.exclude(buildings=building).filter(is_staff=False))
             serializer = self.get_serializer(users_not_assigned, many=True)
             return Response(serializer.data)
         except Building.DoesNotExist:
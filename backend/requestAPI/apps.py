@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class RequestapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'requestAPI'
+
+    def ready(self):
+        # connect model signal handlers
+        from . import signals
@@ -0,0 +1,143 @@
+from collections import OrderedDict
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .cache import get_cache_versions, bump_cache_version, bump_cache_version_on_commit, cache_is_out_of_db
+import threading
+import time
+
+# copied onto tokens at login, enough for permission checks and the user fields the API returns
+USER_CLAIMS = ('username', 'first_name', 'last_name', 'email', 'is_staff', 'is_superuser', 'is_active')
+AUTH_VERSION_CLAIM = 'auth_version'
+
+
+def get_auth_version(user_id):
+    # bumped by requestAPI.signals whenever the user is saved (password change included) or deleted
+    return get_cache_versions(f"auth:{user_id}")[0]
+
+
+def revoke_cached_identity(user_id):
+    # straight away so the old claims stop working, and again once committed so a request that read the
+    # uncommitted row in between can't keep it in user_cache under the new version
+    bump_cache_version(f"auth:{user_id}")
+    bump_cache_version_on_commit(f"auth:{user_id}")
+
+
+def add_user_claims(token, user):
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    token[AUTH_VERSION_CLAIM] = get_auth_version(user.pk)
+    return token
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry the user claims ClaimsJWTAuthentication trusts."""
+
+    @classmethod
+    def for_user(cls, user):
+        return add_user_claims(super().for_user(user), user)
+
+    def access_token_for(self, user):
+        # the claims copied from this refresh token are as old as the login, re-stamp them from the user
+        return add_user_claims(self.access_token, user)
+
+
+class UserCache:
+    """Small thread safe LRU of user field values, each entry expires after ttl seconds."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, values = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return values
+
+    def set(self, key, values):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(
+    getattr(settings, 'AUTH_USER_CACHE_SIZE', 1024),
+    getattr(settings, 'AUTH_USER_CACHE_TTL', 60)
+)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that avoids loading the user row on every request.
+
+    Read-only requests get a user built from the token's claims as long as the token's auth_version still
+    matches the user's current version. Anything else (writes, tokens from before a revocation, tokens
+    without claims) gets a full user from the database, kept in a short lived in-process LRU keyed on the
+    current version so a bump drops it straight away. Versions live in the shared cache, so every process
+    has to point at the same CACHE_BACKEND for a revocation to reach it. Claims and the LRU are only trusted on a
+    shared cache outside the database (see requestAPI.cache.cache_is_out_of_db) - with a per-process cache a
+    revocation wouldn't reach the other workers, with the database cache the version read is a query anyway, so in
+    both cases every request loads the user instead.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return self.get_request_user(validated_token, request.method in SAFE_METHODS), validated_token
+
+    def get_request_user(self, validated_token, read_only):
+        if read_only:
+            user = self.get_claims_user(validated_token)
+            if user is not None:
+                return user
+        return self.get_full_user(validated_token)
+
+    def get_claims_user(self, validated_token):
+        """User built from the token's claims, or None when they can't be trusted. Never touches the database."""
+        if not cache_is_out_of_db():
+            return None
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None or validated_token.get(AUTH_VERSION_CLAIM) != get_auth_version(user_id):
+            return None
+        claims = {claim: validated_token[claim] for claim in USER_CLAIMS}
+        claims[self.user_model._meta.pk.attname] = user_id
+        # fields not in the token are deferred, reading one (e.g. password) loads it rather than returning a blank.
+        # from_db expects the values in field order
+        names = [field.attname for field in self.user_model._meta.concrete_fields if field.attname in claims]
+        user = self.user_model.from_db('default', names, [claims[name] for name in names])
+        user.from_claims = True
+        return user
+
+    def get_full_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None or not cache_is_out_of_db():
+            return self.get_user(validated_token)
+        key = (user_id, get_auth_version(user_id))
+        values = user_cache.get(key)
+        if values is None:
+            user = self.get_user(validated_token)
+            user_cache.set(key, {field.attname: getattr(user, field.attname) for field in user._meta.concrete_fields})
+            return user
+        return self.user_model.from_db('default', list(values), list(values.values()))
@@ -0,0 +1,144 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags, quote_etag
+from functools import wraps
+from rest_framework import status
+from rest_framework.response import Response
+import hashlib
+import time
+
+# namespaces are invalidated by bumping their version (see requestAPI.signals), old entries are never
+# deleted, they just stop being read and fall out of the cache on their own
+DASHBOARD = 'dashboard'
+BUILDINGS = 'buildings'
+
+CACHE_HEADER = 'X-Cache'
+
+# backends whose entries only exist in the process that wrote them
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+# shared, but every read is a query of its own
+DATABASE_BACKENDS = (
+    'django.core.cache.backends.db.DatabaseCache',
+)
+
+
+def cache_is_shared():
+    """
+    Whether every worker reads the same default cache. A version bumped in one process of a per-process backend
+    never reaches the others, so nothing that relies on versions for correctness may trust it.
+    CACHE_SHARED overrides the check, e.g. for a single process deployment (or test run) on locmem.
+    """
+    shared = getattr(settings, 'CACHE_SHARED', None)
+    if shared is not None:
+        return shared
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def cache_is_out_of_db():
+    """
+    Shared, and not kept in the database itself. Only then is reading a version cheaper than the row it stands in
+    for - JWT claims (requestAPI.authentication) are only trusted on such a cache (memcached in docker-compose).
+    """
+    return cache_is_shared() and settings.CACHES['default']['BACKEND'] not in DATABASE_BACKENDS
+
+
+def _version_key(namespace):
+    return f'cache_version:{namespace}'
+
+
+def get_cache_versions(*namespaces):
+    keys = [_version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    missing = {key: _initial_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_cache_version(namespace):
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        # version was evicted (or never read), a fresh one can't collide with anything cached before
+        cache.set(_version_key(namespace), _initial_version(), None)
+
+
+def bump_cache_version_on_commit(*namespaces):
+    """
+    Bumps the namespaces once the current transaction commits (straight away outside one). Bumping earlier
+    would let a read racing the write cache the old data under the new version.
+    """
+    def bump():
+        for namespace in namespaces:
+            bump_cache_version(namespace)
+    transaction.on_commit(bump)
+
+
+def _initial_version():
+    # millisecond timestamp rather than 1 so a version lost to eviction never restarts at an old value
+    return int(time.time() * 1000)
+
+
+def _etag_matches(request, etag):
+    # weak comparison, compression middleware weakens the ETags it passes through
+    candidates = parse_etags(request.headers.get('If-None-Match', ''))
+    return '*' in candidates or etag in [candidate[2:] if candidate.startswith('W/') else candidate for candidate in candidates]
+
+
+def cached_action(*namespaces, timeout=300, query_params=(), etag=False, cache_control=None):
+    """
+    Caches a viewset action's 200 response data under the current versions of the given namespaces.
+    Only the listed query params take part in the key. Adds an X-Cache: HIT/MISS header.
+
+    With etag=True the response gets an ETag derived from the key (so it changes whenever a namespace is bumped)
+    and a matching If-None-Match is answered with a 304 without reading the cache. cache_control is sent as is.
+    Only use etag for responses that are the same for every user allowed to see them.
+
+    Without a shared cache (see cache_is_shared) the view runs every time with X-Cache: BYPASS and no ETag,
+    other workers' invalidations would never reach this process's entries.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapped(self, request, *args, **kwargs):
+            if not cache_is_shared():
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code == 200 and cache_control:
+                    response['Cache-Control'] = cache_control
+                response[CACHE_HEADER] = 'BYPASS'
+                return response
+
+            versions = '.'.join(str(version) for version in get_cache_versions(*namespaces))
+            params = '&'.join(f"{param}={request.query_params.get(param, '')}" for param in query_params)
+            key = f"response:{type(self).__name__}.{view_method.__name__}:{versions}:{params}"
+
+            def add_headers(response):
+                if etag:
+                    response['ETag'] = response_etag
+                if cache_control:
+                    response['Cache-Control'] = cache_control
+                return response
+
+            if etag:
+                response_etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+                if _etag_matches(request, response_etag):
+                    return add_headers(Response(status=status.HTTP_304_NOT_MODIFIED))
+
+            data = cache.get(key)
+            if data is not None:
+                response = Response(data)
+                response[CACHE_HEADER] = 'HIT'
+                return add_headers(response)
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout)
+                add_headers(response)
+            response[CACHE_HEADER] = 'MISS'
+            return response
+        return wrapped
+    return decorator
@@ -0,0 +1,221 @@
+from channels.db import database_sync_to_async
+from channels.layers import BaseChannelLayer
+from datetime import timedelta
+from django.db import connections
+from django.utils import timezone
+from .models import ChannelGroupMembership
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7999
+
+
+class PostgresChannelLayer(BaseChannelLayer):
+    """
+    Channel layer that works across processes and hosts using the PostgreSQL database we already run.
+
+    Every process LISTENs on its own notification channel and only hands out process-specific channel
+    names ("specific.<process>!<id>"), so sending to a channel is a NOTIFY to the owning process.
+    Group membership lives in the ChannelGroupMembership table and group_send issues one NOTIFY per
+    process that has members in the group, carrying the list of its local channels.
+
+    Messages travel as JSON so they must be JSON serialisable and small enough for a NOTIFY payload.
+    new_channel only returns once this process is LISTENing, so nothing sent to the channel can be missed.
+    """
+
+    extensions = ['groups', 'flush']
+
+    def __init__(self, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None, database='default',
+                 listen_timeout=10, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity, **kwargs)
+        self.group_expiry = group_expiry
+        self.database = database
+        self.listen_timeout = listen_timeout
+        self.process = uuid.uuid4().hex
+        # channel name -> (event loop, asyncio.Queue) for channels owned by this process
+        self.channels = {}
+        self._listener = None
+        self._stopping = threading.Event()
+        # set while the listener connection has LISTEN in place
+        self._listening = threading.Event()
+
+    # Channel naming
+
+    @staticmethod
+    def pg_channel(process):
+        return f"channels_{process}"
+
+    @staticmethod
+    def channel_process(channel):
+        # "specific.<process>!<id>" -> "<process>"
+        return channel.split('!', 1)[0].rsplit('.', 1)[-1]
+
+    # Channel layer API
+
+    async def new_channel(self, prefix='specific'):
+        channel = f"{prefix}.{self.process}!{uuid.uuid4().hex}"
+        await self._ensure_listener()
+        # create the queue now so messages arriving before the first receive() are kept
+        self._queue_for(channel)
+        return channel
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        assert self.valid_channel_name(channel), 'Channel name not valid'
+        assert '!' in channel, 'PostgresChannelLayer only supports process-specific channels'
+        await self._notify({self.channel_process(channel): [channel]}, message)
+
+    async def receive(self, channel):
+        assert self.valid_channel_name(channel), 'Channel name not valid'
+        _, queue = self._queue_for(channel)
+        try:
+            while True:
+                expires, message = await queue.get()
+                if expires >= time.time():
+                    return message
+        except asyncio.CancelledError:
+            # the consumer has gone, nothing will read this channel again
+            self.channels.pop(channel, None)
+            raise
+
+    async def group_add(self, group, channel):
+        assert self.valid_group_name(group), 'Group name not valid'
+        assert self.valid_channel_name(channel), 'Channel name not valid'
+        await database_sync_to_async(ChannelGroupMembership.objects.using(self.database).update_or_create)(
+            group=group,
+            channel_name=channel,
+            defaults={'process': self.channel_process(channel), 'joined_date': timezone.now()}
+        )
+
+    async def group_discard(self, group, channel):
+        assert self.valid_group_name(group), 'Group name not valid'
+        assert self.valid_channel_name(channel), 'Channel name not valid'
+        await database_sync_to_async(self._discard)(group, channel)
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        assert self.valid_group_name(group), 'Group name not valid'
+        members = await database_sync_to_async(self._group_members)(group)
+        if members:
+            await self._notify(members, message)
+
+    async def flush(self):
+        await database_sync_to_async(self._flush)()
+        self.channels = {}
+
+    async def close(self):
+        self._stopping.set()
+
+    # Membership queries - run in a worker thread through database_sync_to_async
+
+    def _discard(self, group, channel):
+        ChannelGroupMembership.objects.using(self.database).filter(group=group, channel_name=channel).delete()
+
+    def _flush(self):
+        ChannelGroupMembership.objects.using(self.database).all().delete()
+
+    def _group_members(self, group):
+        # returns {process: [channel, ...]} for the unexpired members of a group
+        cutoff = timezone.now() - timedelta(seconds=self.group_expiry)
+        rows = ChannelGroupMembership.objects.using(self.database).filter(
+            group=group,
+            joined_date__gte=cutoff
+        ).values_list('process', 'channel_name')
+        members = {}
+        for process, channel in rows:
+            members.setdefault(process, []).append(channel)
+        return members
+
+    # Publishing
+
+    async def _notify(self, members, message):
+        notifications = []
+        for process, channels in members.items():
+            payload = json.dumps({'channels': channels, 'message': message}, separators=(',', ':'))
+            if len(payload.encode('utf-8')) > MAX_PAYLOAD_BYTES:
+                raise ValueError(f"Channel message too large for NOTIFY ({len(payload)} bytes)")
+            notifications.append((self.pg_channel(process), payload))
+        await database_sync_to_async(self._publish)(notifications)
+
+    def _publish(self, notifications):
+        # one round trip regardless of how many processes are involved
+        sql = 'SELECT ' + ', '.join(['pg_notify(%s, %s)'] * len(notifications))
+        params = [value for notification in notifications for value in notification]
+        with connections[self.database].cursor() as cursor:
+            cursor.execute(sql, params)
+
+    # Receiving
+
+    def _queue_for(self, channel):
+        if channel not in self.channels:
+            self.channels[channel] = (asyncio.get_running_loop(), asyncio.Queue())
+        return self.channels[channel]
+
+    def _deliver(self, payload):
+        # called from the listener thread, hands messages to the loop that owns each channel
+        data = json.loads(payload)
+        expires = time.time() + self.expiry
+        for channel in data['channels']:
+            entry = self.channels.get(channel)
+            if entry is None:
+                continue
+            loop, queue = entry
+            loop.call_soon_threadsafe(self._put, channel, queue, (expires, data['message']))
+
+    def _put(self, channel, queue, item):
+        if queue.qsize() >= self.get_capacity(channel):
+            logger.warning(f"Dropping message for full channel {channel}")
+            return
+        queue.put_nowait(item)
+
+    async def _ensure_listener(self):
+        if self._listener is None or not self._listener.is_alive():
+            self._stopping.clear()
+            self._listener = threading.Thread(target=self._listen, name='channels-pg-listener', daemon=True)
+            self._listener.start()
+        if self._listening.is_set():
+            return
+        # a NOTIFY sent before LISTEN is in place is lost, so the caller can't be handed a channel until then
+        listening = await asyncio.get_running_loop().run_in_executor(None, self._listening.wait, self.listen_timeout)
+        if not listening:
+            raise RuntimeError(f"Channel layer could not LISTEN within {self.listen_timeout}s")
+
+    def _connect(self):
+        import psycopg2
+        wrapper = connections[self.database]
+        conn = psycopg2.connect(**wrapper.get_connection_params())
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.pg_channel(self.process)}"')
+        return conn
+
+    def _listen(self):
+        # dedicated connection outside of Django's connection handling, reconnects with backoff
+        delay = 1
+        while not self._stopping.is_set():
+            try:
+                conn = self._connect()
+                self._listening.set()
+                delay = 1
+                try:
+                    while not self._stopping.is_set():
+                        if select.select([conn], [], [], 1.0) == ([], [], []):
+                            continue
+                        conn.poll()
+                        while conn.notifies:
+                            self._deliver(conn.notifies.pop(0).payload)
+                finally:
+                    self._listening.clear()
+                    conn.close()
+            except Exception as e:
+                logger.error(f"Channel layer listener error, reconnecting in {delay}s: {str(e)}")
+                self._stopping.wait(delay)
+                delay = min(delay * 2, 30)
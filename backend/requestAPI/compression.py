@@ -0,0 +1,182 @@
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+import re
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Response compression for the HTTP API - see CompressionMiddleware. Websockets never pass through Django
+# middleware, the JSON lists (service-requests, users, buildings) are what this is for.
+
+DEFAULTS = {
+    # server preference when the client accepts several equally, codings whose library isn't installed are skipped
+    'ENCODINGS': ['br', 'zstd', 'gzip'],
+    # smaller bodies aren't worth the CPU (or the header)
+    'MIN_SIZE': 1024,
+    # prefixes of the content types worth compressing, images/archives are already compressed
+    'CONTENT_TYPES': ['application/json', 'text/', 'application/javascript', 'application/xml', 'image/svg+xml'],
+    # fast levels, responses are compressed per request rather than once ahead of time
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 4,
+    'ZSTD_LEVEL': 3,
+}
+
+_accept_encoding_re = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*(?:,|$)')
+
+
+def compression_settings():
+    return {**DEFAULTS, **getattr(settings, 'COMPRESSION', {})}
+
+
+class GzipEncoder:
+    name = 'gzip'
+
+    def __init__(self, level):
+        self.level = level
+
+    def compressobj(self):
+        # wbits 31 - deflate with a gzip header and trailer
+        return zlib.compressobj(self.level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        compressor = self.compressobj()
+        return compressor.compress(data) + compressor.flush()
+
+    def stream(self, chunks):
+        compressor = self.compressobj()
+        for chunk in chunks:
+            # sync flush so every chunk reaches the client as soon as it was produced
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+class BrotliEncoder:
+    name = 'br'
+
+    def __init__(self, quality):
+        self.quality = quality
+
+    def compress(self, data):
+        return brotli.compress(data, quality=self.quality)
+
+    def stream(self, chunks):
+        compressor = brotli.Compressor(quality=self.quality)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+
+
+class ZstdEncoder:
+    name = 'zstd'
+
+    def __init__(self, level):
+        self.compressor = zstandard.ZstdCompressor(level=level)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def stream(self, chunks):
+        compressor = self.compressor.compressobj()
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def available_encoders(options=None):
+    """Encoders for the configured codings whose library is installed, in preference order."""
+    options = options or compression_settings()
+    encoders = {'gzip': lambda: GzipEncoder(options['GZIP_LEVEL'])}
+    if brotli is not None:
+        encoders['br'] = lambda: BrotliEncoder(options['BROTLI_QUALITY'])
+    if zstandard is not None:
+        encoders['zstd'] = lambda: ZstdEncoder(options['ZSTD_LEVEL'])
+    return [encoders[name]() for name in options['ENCODINGS'] if name in encoders]
+
+
+def choose_encoder(accept_encoding, encoders):
+    """The accepted encoder with the highest q value, ties going to the earlier (preferred) one."""
+    accepted = {}
+    for coding, quality in _accept_encoding_re.findall(accept_encoding.lower()):
+        try:
+            accepted[coding] = float(quality) if quality else 1.0
+        except ValueError:
+            continue
+    best, best_quality = None, 0
+    for encoder in encoders:
+        quality = accepted.get(encoder.name, accepted.get('*', 0))
+        if quality > best_quality:
+            best, best_quality = encoder, quality
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with gzip, or brotli/zstd when their library is installed and the client prefers them.
+
+    Skipped for upgrade (websocket) requests, responses that already have a Content-Encoding or say no-transform,
+    partial/empty responses, content types outside CONTENT_TYPES and bodies under MIN_SIZE. Streaming responses
+    are compressed chunk by chunk (and flushed after each) rather than buffered. ETags are weakened, the bytes
+    differ from the uncompressed ones - requestAPI.cache compares them weakly.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.options = compression_settings()
+        self.encoders = available_encoders(self.options)
+        self.content_types = tuple(self.options['CONTENT_TYPES'])
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def should_compress(self, request, response):
+        if 'upgrade' in request.headers or response.has_header('Content-Encoding'):
+            return False
+        if response.status_code in (204, 206, 304) or request.method == 'HEAD':
+            return False
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if not content_type.startswith(self.content_types):
+            return False
+        # the size of a streaming body isn't known up front, it is always worth it for the lists that stream
+        return response.streaming or len(response.content) >= self.options['MIN_SIZE']
+
+    def process_response(self, request, response):
+        # the body depends on Accept-Encoding whether or not this one gets compressed
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not self.should_compress(request, response):
+            return response
+        encoder = choose_encoder(request.headers.get('Accept-Encoding', ''), self.encoders)
+        if encoder is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = encoder.stream(response.streaming_content)
+            del response['Content-Length']
+        else:
+            compressed = encoder.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoder.name
+        return response
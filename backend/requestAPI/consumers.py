@@ -1,11 +1,28 @@
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from urllib.parse import parse_qs
+from .dispatcher import BatchedEventsMixin
+from .models import Update, ServiceRequest
+from .read_markers import get_unread_count
+from .utils import ADMIN_FEED_GROUP, admin_building_group, request_timeline_group
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+@database_sync_to_async
+def get_missed_notifications(user_id, last_seen_id, limit):
+    # same rows as UpdateViewSet.notifications, backed by update_replay_idx
+    return list(
+        Update.objects.unread_for(user_id).filter(id__gt=last_seen_id)
+        .exclude(created_by_id=user_id)
+        .order_by('id')
+        .values('id', 'title', 'message', 'service_request_id', 'type')[:limit]
+    )
+
 # used during web socket connections
-class NotificationConsumer(AsyncWebsocketConsumer):
+class NotificationConsumer(BatchedEventsMixin, AsyncWebsocketConsumer):
     # only regular users require this connection, therefore check user auth and role before excepting
     async def connect(self):
         user = self.scope['user']
@@ -15,9 +32,27 @@ class NotificationConsumer(AsyncWebsocketConsumer):
                 self.channel_name
             )
             await self.accept()
+            await self.replay_missed(user)
         else:
             await self.close()
 
+    async def replay_missed(self, user):
+        # a reconnecting client passes the last notification id it saw and gets only the ones after it, the group
+        # is joined first so nothing can fall in between - ids replayed here are skipped if they also arrive live
+        self.replayed_ids = set()
+        last_seen_id = parse_qs(self.scope['query_string'].decode()).get('last_seen_id', [None])[0]
+        if last_seen_id is None or not last_seen_id.isdigit():
+            return
+        limit = getattr(settings, 'NOTIFICATION_REPLAY_LIMIT', 50)
+        missed = await get_missed_notifications(user.id, int(last_seen_id), limit + 1)
+        unread_count = await database_sync_to_async(get_unread_count)(user.id) if missed else None
+        for notification in missed[:limit]:
+            self.replayed_ids.add(notification['id'])
+            await self.send_notification_json(notification, unread_count)
+        if len(missed) > limit:
+            # more than we're willing to replay, the client should reload its notification list instead
+            await self.send(text_data=json.dumps({'type': 'resync'}))
+
     async def disconnect(self, close_code):
         user = self.scope['user']
         if user.is_authenticated:
@@ -29,7 +64,77 @@ class NotificationConsumer(AsyncWebsocketConsumer):
     # send notification  to user as json
     async def send_notification(self, event):
         notification = event['notification']
-        await self.send(text_data=json.dumps({
+        if notification['id'] in getattr(self, 'replayed_ids', ()):
+            return
+        await self.send_notification_json(notification, event.get('unread_count'))
+
+    # badge update without a notification, see utils.send_unread_count
+    async def unread_count(self, event):
+        await self.send(text_data=json.dumps({'type': 'unread_count', 'unread_count': event['unread_count']}))
+
+    async def send_notification_json(self, notification, unread_count=None):
+        message = {
             'type': 'notification',
             'notification': notification
-        }))
\ No newline at end of file
+        }
+        # badge count after this notification, see UnreadNotificationCounter
+        if unread_count is not None:
+            message['unread_count'] = unread_count
+        await self.send(text_data=json.dumps(message))
+
+
+# live deltas for admin pages (dashboard, request lists) - see utils.send_admin_event
+class AdminFeedConsumer(BatchedEventsMixin, AsyncWebsocketConsumer):
+    # ?buildings=1,2 follows just those buildings, without it the admin gets the global feed
+    async def connect(self):
+        user = self.scope['user']
+        if not (user.is_authenticated and user.is_staff):
+            await self.close()
+            return
+
+        building_ids = parse_qs(self.scope['query_string'].decode()).get('buildings', [''])[0]
+        self.feed_groups = [
+            admin_building_group(int(building_id)) for building_id in building_ids.split(',') if building_id.isdigit()
+        ] or [ADMIN_FEED_GROUP]
+        for group in self.feed_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        for group in getattr(self, 'feed_groups', []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def admin_event(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'admin_event',
+            'event': event['event']
+        }))
+
+
+
+@database_sync_to_async
+def is_request_owner(user_id, service_request_id):
+    return ServiceRequest.objects.filter(id=service_request_id, created_by_id=user_id).exists()
+
+# live timeline for an open request detail page, same access rule as ServiceRequestViewSet.retrieve
+class RequestTimelineConsumer(BatchedEventsMixin, AsyncWebsocketConsumer):
+    async def connect(self):
+        user = self.scope['user']
+        service_request_id = int(self.scope['url_route']['kwargs']['service_request_id'])
+        if not user.is_authenticated or not (user.is_superuser or await is_request_owner(user.id, service_request_id)):
+            await self.close()
+            return
+
+        self.timeline_group = request_timeline_group(service_request_id)
+        await self.channel_layer.group_add(self.timeline_group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        if hasattr(self, 'timeline_group'):
+            await self.channel_layer.group_discard(self.timeline_group, self.channel_name)
+
+    async def timeline_update(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'timeline_update',
+            'update': event['update']
+        }))
@@ -0,0 +1,181 @@
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from django.conf import settings
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# events for the same group are coalesced into one channel layer message of at most this many events
+# (keeps each message well under the postgres layer's NOTIFY payload limit)
+MAX_EVENTS_PER_MESSAGE = 20
+
+
+class NotificationDispatcher:
+    """
+    Bounded, in-process queue that delivers channel layer group events from an event loop.
+
+    Views enqueue events (normally from transaction.on_commit) and return straight away - the HTTP
+    thread never waits on the channel layer. Events queued for the same group before the loop gets to
+    them are sent as a single "event.batch" message which consumers unpack with BatchedEventsMixin.
+    When the queue is full new events are dropped and counted rather than blocking the caller.
+
+    Under an ASGI server (see DispatcherLoopMiddleware) events are sent from the server's own loop, the
+    one the consumers run on. Without one (gunicorn, management commands) a private loop on a background
+    thread is used, which only works for layers that leave the process - InMemoryChannelLayer's queues
+    belong to the server loop, so events for it are dropped there instead, no consumer could receive them.
+    """
+
+    def __init__(self, max_queue=None, channel_layer=None):
+        self.max_queue = max_queue or getattr(settings, 'NOTIFICATION_QUEUE_SIZE', 1000)
+        self._channel_layer = channel_layer
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # group name -> list of events, insertion ordered so groups are served first come first served
+        self._pending = {}
+        self._depth = 0
+        self._in_flight = 0
+        self._loop = None
+        self._wakeup = None
+        self._thread = None
+        self._server_loop = None
+        self._server_worker = None
+        self._stats = {'enqueued': 0, 'sent': 0, 'messages': 0, 'dropped': 0, 'failed': 0, 'max_queue_depth': 0}
+
+    @property
+    def channel_layer(self):
+        if self._channel_layer is None:
+            self._channel_layer = get_channel_layer()
+        return self._channel_layer
+
+    def enqueue(self, group, event):
+        """Queues an event for a channel layer group. Returns False if it was dropped."""
+        return self.enqueue_many([(group, event)]) == 1
+
+    def enqueue_many(self, events):
+        """
+        Queues (group, event) pairs together, so the events for one group always leave in the same message(s)
+        rather than depending on when the loop wakes up. Returns how many were queued, the rest were dropped.
+        """
+        queued = 0
+        with self._lock:
+            if self._server_loop is not None and self._server_loop.is_closed():
+                # the server shut down (or a test's loop finished), its worker went with it
+                self._server_loop = self._server_worker = None
+            if self._server_loop is None and isinstance(self.channel_layer, InMemoryChannelLayer):
+                events = list(events)
+                self._stats['dropped'] += len(events)
+                logger.error(f"No ASGI server loop to send {len(events)} event(s) through the in-memory channel layer, dropping them")
+                return 0
+            for group, event in events:
+                if self._depth >= self.max_queue:
+                    self._stats['dropped'] += 1
+                    logger.warning(f"Notification queue full ({self._depth}), dropping event for {group}")
+                    continue
+                self._pending.setdefault(group, []).append(event)
+                self._depth += 1
+                queued += 1
+            if not queued:
+                return 0
+            self._stats['enqueued'] += queued
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._depth)
+            self._ensure_started()
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+        return queued
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, queue_depth=self._depth, in_flight=self._in_flight, max_queue=self.max_queue)
+
+    def flush(self, timeout=5):
+        """Blocks until everything queued so far has been handed to the channel layer - for tests and shutdown."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._depth == 0 and self._in_flight == 0, timeout)
+
+    def attach_loop(self, loop):
+        """Sends from the ASGI server's loop from now on (a new one replaces the last, e.g. between test runs)."""
+        with self._lock:
+            if self._server_loop is loop:
+                return
+            self._server_loop = loop
+            self._server_worker = None
+            if self._depth:
+                # anything queued before is picked up by the worker on the new loop
+                self._ensure_started()
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    # Background loop
+
+    def _ensure_started(self):
+        # called with the lock held
+        if self._server_loop is not None:
+            if self._server_worker is not None and not self._server_worker.done():
+                return
+            self._loop = self._server_loop
+            self._wakeup = asyncio.Event()
+            self._server_worker = asyncio.run_coroutine_threadsafe(self._worker(), self._loop)
+            return
+        # no server loop, a thread started lazily so forked workers each get their own
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._loop = asyncio.new_event_loop()
+        self._wakeup = asyncio.Event()
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), name='notification-dispatcher', daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def _run(self, ready):
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(ready.set)
+        self._loop.run_until_complete(self._worker())
+
+    async def _worker(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._in_flight, self._depth = self._depth, 0
+            if batch:
+                await asyncio.gather(*(self._send(group, events) for group, events in batch.items()))
+            with self._idle:
+                self._in_flight = 0
+                self._idle.notify_all()
+
+    async def _send(self, group, events):
+        for start in range(0, len(events), MAX_EVENTS_PER_MESSAGE):
+            chunk = events[start:start + MAX_EVENTS_PER_MESSAGE]
+            message = chunk[0] if len(chunk) == 1 else {'type': 'event.batch', 'events': chunk}
+            try:
+                await self.channel_layer.group_send(group, message)
+            except Exception as e:
+                with self._lock:
+                    self._stats['failed'] += len(chunk)
+                logger.error(f"Failed to send {len(chunk)} event(s) to {group}: {str(e)}")
+                continue
+            with self._lock:
+                self._stats['sent'] += len(chunk)
+                self._stats['messages'] += 1
+
+
+class DispatcherLoopMiddleware:
+    """Outermost ASGI application, hands the server's event loop to the dispatcher - see NotificationDispatcher."""
+
+    def __init__(self, inner, dispatcher=None):
+        self.inner = inner
+        self.dispatcher = dispatcher
+
+    async def __call__(self, scope, receive, send):
+        (self.dispatcher or notification_dispatcher).attach_loop(asyncio.get_running_loop())
+        return await self.inner(scope, receive, send)
+
+
+class BatchedEventsMixin:
+    # lets a consumer receive events the dispatcher coalesced into a single "event.batch" message
+    async def event_batch(self, event):
+        for inner in event['events']:
+            await self.dispatch(inner)
+
+
+notification_dispatcher = NotificationDispatcher()
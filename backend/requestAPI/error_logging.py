@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from .models import ErrorLog
+from .upsert import update_or_insert
+import atexit
+import hashlib
+import logging
+import random
+import threading
+import traceback
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # responses below this status code are not logged unless listed in INCLUDE_STATUS_CODES
+    'MIN_STATUS_CODE': 500,
+    'INCLUDE_STATUS_CODES': [],
+    'EXCLUDE_STATUS_CODES': [],
+    # write from a background thread in batches, synchronous writes are used in tests
+    'ASYNC': True,
+    'FLUSH_INTERVAL': 5,
+    'MAX_BUFFER': 200,
+    # chance that a repeat occurrence replaces the stored traceback
+    'SAMPLE_RATE': 0.1,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'ERROR_LOGGING', {})}
+
+
+def should_log(status_code, config=None):
+    config = config or get_config()
+    if status_code in config['EXCLUDE_STATUS_CODES']:
+        return False
+    return status_code >= config['MIN_STATUS_CODE'] or status_code in config['INCLUDE_STATUS_CODES']
+
+
+def fingerprint(endpoint, exc):
+    # endpoint + exception type + the innermost frame (file and function, not line, so it survives small edits)
+    frames = traceback.extract_tb(exc.__traceback__) if exc.__traceback__ else []
+    top_frame = f"{frames[-1].filename}:{frames[-1].name}" if frames else ''
+    exception_type = f"{type(exc).__module__}.{type(exc).__qualname__}"
+    return hashlib.sha1(f"{endpoint}|{exception_type}|{top_frame}".encode()).hexdigest(), exception_type
+
+
+class ErrorLogWriter:
+    """Aggregates errors by fingerprint in memory and writes one counter row per fingerprint in batches."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buffer = {}
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def record(self, request, exc, status_code):
+        config = get_config()
+        if not should_log(status_code, config):
+            return
+
+        # group by the resolved view rather than the raw path so /buildings/1/ and /buildings/2/ aggregate
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.view_name if match and match.view_name else request.path
+        key, exception_type = fingerprint(endpoint, exc)
+        now = timezone.now()
+
+        with self._lock:
+            entry = self._buffer.get(key)
+            if entry is None:
+                self._buffer[key] = {
+                    'endpoint': request.path[:255],
+                    'exception_type': exception_type[:255],
+                    'status_code': status_code,
+                    'error_message': f"{str(exc)}\n{''.join(traceback.format_exception(type(exc), exc, exc.__traceback__))}",
+                    'count': 1,
+                    'last_seen': now,
+                }
+            else:
+                entry['count'] += 1
+                entry['last_seen'] = now
+            buffered = len(self._buffer)
+
+        if not config['ASYNC']:
+            self.flush()
+            return
+        self._ensure_started()
+        if buffered >= config['MAX_BUFFER']:
+            self._wakeup.set()
+
+    def flush(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, {}
+        if not batch:
+            return
+        sample_rate = get_config()['SAMPLE_RATE']
+        for key, entry in batch.items():
+            try:
+                self._write(key, entry, sample_rate)
+            except Exception as e:
+                logger.error(f"Failed to write error log {key}: {str(e)}")
+
+    def _write(self, key, entry, sample_rate):
+        updates = {'occurrences': F('occurrences') + entry['count'], 'last_seen': entry['last_seen']}
+        if random.random() < sample_rate:
+            updates['error_message'] = entry['error_message']
+        update_or_insert(ErrorLog, {'fingerprint': key}, updates, {
+            'endpoint': entry['endpoint'],
+            'exception_type': entry['exception_type'],
+            'status_code': entry['status_code'],
+            'error_message': entry['error_message'],
+            'occurrences': entry['count'],
+            'last_seen': entry['last_seen'],
+        })
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='error-log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(get_config()['FLUSH_INTERVAL'])
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+error_log_writer = ErrorLogWriter()
+# don't lose the last few seconds of errors on a clean shutdown
+atexit.register(error_log_writer.flush)
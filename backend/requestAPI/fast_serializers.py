@@ -0,0 +1,161 @@
+from collections import defaultdict
+from functools import lru_cache
+from django.conf import settings
+from rest_framework.response import Response
+from .models import Building, ServiceType
+from .serializers import BuildingSerializer, ServiceRequestSerializer, clean_media_url
+
+# Read-only list serialization straight from values_list() rows, for list endpoints returning thousands of rows.
+# DRF builds every row field by field (get_attribute + to_representation per field, per nested serializer), these
+# build the same dicts from tuples. The serializers' own field objects are reused wherever they change a value
+# (datetimes, decimals) so the rendered JSON is byte for byte the same - the column lists have to be kept in step
+# with the serializers, tests/test_fast_serializers compares both paths. Nested buildings and service types are
+# built once per distinct id rather than once per row.
+
+
+@lru_cache(maxsize=None)
+def _formatters():
+    request_fields = ServiceRequestSerializer().fields
+    building_fields = BuildingSerializer().fields
+    return {
+        name: fields[name].to_representation for fields, name in (
+            (request_fields, 'created_date'),
+            (request_fields, 'updated_date'),
+            (request_fields, 'service_level_agreement_date'),
+            (building_fields, 'latitude'),
+            (building_fields, 'longitude'),
+        )
+    }
+
+
+def _format(formatter, value):
+    # serializers skip to_representation for None
+    return None if value is None else formatter(value)
+
+
+def _user_type(is_superuser):
+    return 'admin' if is_superuser else 'regular'
+
+
+def _simple_user(id, first_name, last_name, email, is_superuser):
+    # UserSimpleSerializer
+    return {'id': id, 'first_name': first_name, 'last_name': last_name, 'email': email, 'user_type': _user_type(is_superuser)}
+
+
+def service_type_details(ids):
+    """ServiceTypeSerializer data by id."""
+    storage = ServiceType._meta.get_field('service_icon').storage
+    return {
+        id: {
+            'id': id,
+            'name': name,
+            'description': description,
+            'service_icon': clean_media_url(storage.url(icon)) if icon else None,
+            'is_active': is_active
+        }
+        for id, name, description, icon, is_active in ServiceType.objects.filter(id__in=ids).values_list(
+            'id', 'name', 'description', 'service_icon', 'is_active'
+        )
+    }
+
+
+def building_details(ids):
+    """BuildingSerializer data by id, users in id order like ServiceRequestQuerySet.with_details."""
+    formatters = _formatters()
+    users = defaultdict(list)
+    for building_id, *user in Building.users.through.objects.filter(building_id__in=ids).order_by('user_id').values_list(
+        'building_id', 'user_id', 'user__first_name', 'user__last_name', 'user__email', 'user__is_superuser'
+    ):
+        users[building_id].append(_simple_user(*user))
+    return {
+        id: {
+            'id': id,
+            'name': name,
+            'address_line1': address_line1,
+            'address_line2': address_line2,
+            'city': city,
+            'postcode': postcode,
+            'country': country,
+            'latitude': _format(formatters['latitude'], latitude),
+            'longitude': _format(formatters['longitude'], longitude),
+            'users': users[id]
+        }
+        for id, name, address_line1, address_line2, city, postcode, country, latitude, longitude in Building.objects.filter(
+            id__in=ids
+        ).values_list('id', 'name', 'address_line1', 'address_line2', 'city', 'postcode', 'country', 'latitude', 'longitude')
+    }
+
+
+def serialize_service_requests(queryset):
+    """ServiceRequestSerializer(queryset, many=True).data, for reading only."""
+    formatters = _formatters()
+    created_date, updated_date, sla_date = (
+        formatters['created_date'], formatters['updated_date'], formatters['service_level_agreement_date']
+    )
+    # values_list() doesn't need (and can't take) with_details' prefetches, its filters and ordering are kept
+    rows = list(queryset.prefetch_related(None).values_list(
+        'id', 'customer_notes', 'status', 'priority', 'created_date', 'updated_date', 'service_level_agreement_date',
+        'created_by_id', 'created_by__first_name', 'created_by__last_name', 'created_by__email', 'created_by__is_superuser',
+        'service_request_item_id', 'building_id'
+    ))
+    service_types = service_type_details({row[12] for row in rows})
+    buildings = building_details({row[13] for row in rows})
+    return [
+        {
+            'id': id,
+            'customer_notes': customer_notes,
+            'status': status,
+            'priority': priority,
+            'created_date': _format(created_date, created),
+            'updated_date': _format(updated_date, updated),
+            'created_by': _simple_user(*created_by),
+            'service_request_item_detail': service_types[service_type_id],
+            'building_detail': buildings[building_id],
+            'service_level_agreement_date': _format(sla_date, sla),
+        }
+        for id, customer_notes, status, priority, created, updated, sla, *created_by, service_type_id, building_id in rows
+    ]
+
+
+def serialize_users(queryset):
+    """UserSerializer(queryset, many=True).data, for reading only. Buildings in id order like UserViewSet."""
+    rows = list(queryset.prefetch_related(None).values_list('id', 'username', 'email', 'first_name', 'last_name', 'is_superuser'))
+    buildings = defaultdict(list)
+    # UserSerializer.get_buildings - raw values, no field formatting
+    for user_id, *building in Building.users.through.objects.filter(user_id__in=[row[0] for row in rows]).order_by('building_id').values_list(
+        'user_id', 'building_id', 'building__name', 'building__address_line1', 'building__address_line2', 'building__city',
+        'building__postcode', 'building__latitude', 'building__longitude'
+    ):
+        buildings[user_id].append(dict(zip(
+            ('id', 'name', 'address_line1', 'address_line2', 'city', 'postcode', 'latitude', 'longitude'), building
+        )))
+    return [
+        {
+            'id': id,
+            'username': username,
+            'email': email,
+            'first_name': first_name,
+            'last_name': last_name,
+            'buildings': buildings[id],
+            'user_type': _user_type(is_superuser),
+        }
+        for id, username, email, first_name, last_name, is_superuser in rows
+    ]
+
+
+class ValuesListMixin:
+    """
+    ViewSet list() that builds its response with values_list_serializer (a function from the filtered queryset
+    to the response data) instead of the serializer class, unless something needs the full serializer -
+    a paginated page, ?fields=/?expand=, or FAST_LIST_SERIALIZATION turned off.
+    """
+    values_list_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        if not getattr(settings, 'FAST_LIST_SERIALIZATION', True) or 'fields' in request.query_params or 'expand' in request.query_params:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(type(self).values_list_serializer(queryset))
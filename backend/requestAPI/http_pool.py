@@ -0,0 +1,74 @@
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgiInstance
+from concurrent.futures import ThreadPoolExecutor
+from django.core.wsgi import get_wsgi_application
+
+
+def _closing(wsgi_application):
+    # WSGI servers call close() on the response once it has been sent, Django fires request_finished
+    # (which returns the thread's database connection) from there - asgiref's adapter never does
+    def application(environ, start_response):
+        response = wsgi_application(environ, start_response)
+        try:
+            yield from response
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+    return application
+
+
+class ThreadPoolHTTPApplication:
+    """
+    ASGI application that runs Django's WSGI handler on a bounded pool of threads.
+
+    get_asgi_application() runs every sync view through asgiref's thread-sensitive executor, so one
+    process serves one HTTP request at a time. Here each request gets a thread from the pool instead, the
+    same model as gunicorn's gthread worker - size it together with the database's connection limit since
+    every thread keeps its own connection.
+    """
+
+    def __init__(self, max_threads, wsgi_application=None):
+        self.max_threads = max_threads
+        self.wsgi_application = _closing(wsgi_application or get_wsgi_application())
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix='http')
+
+    async def __call__(self, scope, receive, send):
+        await ThreadPoolWsgiInstance(self.wsgi_application, self.executor)(scope, receive, send)
+
+
+class ThreadPoolWsgiInstance(WsgiToAsgiInstance):
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def run_wsgi_app(self, body):
+        await sync_to_async(self.run_wsgi_app_sync, thread_sensitive=False, executor=self.executor)(body)
+
+    def run_wsgi_app_sync(self, body):
+        """
+        The body of asgiref's run_wsgi_app, kept here rather than reached through its sync_to_async wrapper.
+        Runs on a pool thread, start_response is called on the same thread.
+        """
+        try:
+            environ = self.build_environ(self.scope, body)
+        except ValueError:
+            # too many duplicate headers
+            self.sync_send({'type': 'http.response.start', 'status': 400, 'headers': [(b'content-type', b'text/plain')]})
+            self.sync_send({'type': 'http.response.body', 'body': b'Bad Request: Too many duplicate headers'})
+            return
+        bytes_sent = 0
+        for output in self.wsgi_application(environ, self.start_response):
+            if not self.response_started:
+                self.response_started = True
+                self.sync_send(self.response_start)
+            # never send more than the Content-Length the application declared
+            if self.response_content_length is not None:
+                output = output[:self.response_content_length - bytes_sent]
+            self.sync_send({'type': 'http.response.body', 'body': output, 'more_body': True})
+            bytes_sent += len(output)
+            if bytes_sent == self.response_content_length:
+                break
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+        self.sync_send({'type': 'http.response.body'})
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from requestAPI.rollups import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the DailyRequestStats rollup table from every ServiceRequest.'
+
+    def handle(self, *args, **options):
+        rows = rebuild_daily_stats()
+        self.stdout.write(f"Wrote {rows} daily rollup row(s)")
@@ -0,0 +1,105 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+from channels.layers import channel_layers, DEFAULT_CHANNEL_LAYER
+from asgiref.sync import async_to_sync
+import asyncio
+import multiprocessing
+import statistics
+import time
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+
+def _worker(groups, expected, timeout, ready, results):
+    # each worker is a separate process with its own layer instance, like a Daphne worker
+    connections.close_all()
+    layer = channel_layers.make_backend(DEFAULT_CHANNEL_LAYER)
+
+    async def run():
+        channels = []
+        for group in groups:
+            channel = await layer.new_channel()
+            await layer.group_add(group, channel)
+            channels.append(channel)
+        ready.put(True)
+
+        latencies = []
+
+        async def drain(channel):
+            while len(latencies) < expected:
+                message = await layer.receive(channel)
+                latencies.append(time.time() - message['sent'])
+
+        tasks = [asyncio.ensure_future(drain(channel)) for channel in channels]
+        try:
+            await asyncio.wait_for(_until(lambda: len(latencies) >= expected), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        for task in tasks:
+            task.cancel()
+        for group, channel in zip(groups, channels):
+            await layer.group_discard(group, channel)
+        return latencies
+
+    results.put(async_to_sync(run)())
+
+
+async def _until(condition):
+    while not condition():
+        await asyncio.sleep(0.01)
+
+
+class Command(BaseCommand):
+    help = 'Measures group fan-out latency and throughput of the configured channel layer across several worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of worker processes subscribing to every group.')
+        parser.add_argument('--groups', type=int, default=50, help='Number of user_{id} groups.')
+        parser.add_argument('--messages', type=int, default=1000, help='Number of group_send calls, spread across the groups.')
+        parser.add_argument('--timeout', type=float, default=30, help='Seconds each worker waits for its deliveries.')
+
+    def handle(self, *args, **options):
+        workers, group_count, message_count = options['workers'], options['groups'], options['messages']
+        groups = [f"benchmark_user_{i}" for i in range(group_count)]
+        backend = channel_layers.configs[DEFAULT_CHANNEL_LAYER]['BACKEND']
+        self.stdout.write(f"Layer {backend}: {workers} workers, {group_count} groups, {message_count} messages")
+
+        context = multiprocessing.get_context('fork')
+        ready, results = context.Queue(), context.Queue()
+        connections.close_all()
+        processes = [context.Process(target=_worker, args=(groups, message_count, options['timeout'], ready, results)) for _ in range(workers)]
+        for process in processes:
+            process.start()
+        for _ in processes:
+            ready.get(timeout=60)
+
+        layer = channel_layers.make_backend(DEFAULT_CHANNEL_LAYER)
+
+        async def publish():
+            for i in range(message_count):
+                await layer.group_send(groups[i % group_count], {'type': 'benchmark', 'sent': time.time()})
+
+        started = time.perf_counter()
+        async_to_sync(publish)()
+        publish_seconds = time.perf_counter() - started
+
+        latencies = []
+        for _ in processes:
+            latencies.extend(results.get(timeout=options['timeout'] + 60))
+        total_seconds = time.perf_counter() - started
+        for process in processes:
+            process.join()
+
+        expected = message_count * workers
+        self.stdout.write(f"group_send rate:  {message_count / publish_seconds:,.0f} msg/s")
+        self.stdout.write(f"deliveries:       {len(latencies)}/{expected} in {total_seconds:.2f}s ({len(latencies) / total_seconds:,.0f} msg/s)")
+        if latencies:
+            self.stdout.write(
+                f"latency ms:       mean {statistics.mean(latencies) * 1000:.2f}  "
+                f"p50 {_percentile(latencies, 50) * 1000:.2f}  "
+                f"p95 {_percentile(latencies, 95) * 1000:.2f}  "
+                f"p99 {_percentile(latencies, 99) * 1000:.2f}"
+            )
@@ -0,0 +1,58 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from requestAPI.compression import BrotliEncoder, GzipEncoder, ZstdEncoder, brotli, compression_settings, zstandard
+from requestAPI.models import Building, ServiceRequest
+from requestAPI.renderers import ORJSONRenderer
+from requestAPI.serializers import BuildingSerializer, ServiceRequestSerializer, UserSerializer
+import time
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Measures bytes on the wire and compression time for the service-requests, users and buildings list payloads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000,
+                            help='Rows per payload, the serialized database rows are repeated to reach it.')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per encoder.')
+
+    def handle(self, *args, **options):
+        settings = compression_settings()
+        # every installed encoder, not only the configured ones, so the settings can be picked from the output
+        encoders = [GzipEncoder(1), GzipEncoder(settings['GZIP_LEVEL']), GzipEncoder(9)]
+        if brotli is not None:
+            encoders.append(BrotliEncoder(settings['BROTLI_QUALITY']))
+        else:
+            self.stderr.write('brotli is not installed, skipping br')
+        if zstandard is not None:
+            encoders.append(ZstdEncoder(settings['ZSTD_LEVEL']))
+        else:
+            self.stderr.write('zstandard is not installed, skipping zstd')
+
+        # the same serializer output the list endpoints hand to the renderer
+        payloads = {
+            'service-requests': ServiceRequestSerializer(ServiceRequest.objects.with_details()[:options['rows']], many=True).data,
+            'users': UserSerializer(User.objects.prefetch_related('buildings')[:options['rows']], many=True).data,
+            'buildings': BuildingSerializer(Building.objects.prefetch_related('users')[:options['rows']], many=True).data,
+        }
+        self.stdout.write(f"{'payload':>17} {'encoding':>9} {'rows':>6} {'raw bytes':>11} {'wire bytes':>11} {'ratio':>6} {'p50 ms':>8} {'MB/s':>7}")
+        for name, rows in payloads.items():
+            if not rows:
+                raise CommandError(f'No rows to build the {name} payload from')
+            body = ORJSONRenderer().render([rows[i % len(rows)] for i in range(options['rows'])])
+            for encoder in encoders:
+                samples = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    compressed = encoder.compress(body)
+                    samples.append(time.perf_counter() - started)
+                p50 = _percentile(samples, 50)
+                label = encoder.name if encoder.name != 'gzip' else f'gzip-{encoder.level}'
+                self.stdout.write(
+                    f"{name:>17} {label:>9} {options['rows']:>6} {len(body):>11,} {len(compressed):>11,} "
+                    f"{len(body) / len(compressed):>5.1f}x {p50 * 1000:>8.2f} {len(body) / p50 / 1e6:>7.0f}"
+                )
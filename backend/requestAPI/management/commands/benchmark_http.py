@@ -0,0 +1,131 @@
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from asgiref.sync import async_to_sync
+from requestAPI.http_pool import ThreadPoolHTTPApplication
+import asyncio
+import time
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+
+def _add_latency(seconds):
+    # simulates the network round trip to a remote database on every query a connection runs
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
+    return install
+
+
+async def _request(application, path, query_string, headers):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query_string.encode(),
+        'root_path': '',
+        'headers': headers,
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+    disconnected = asyncio.Event()
+    sent_body = False
+    status = None
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    try:
+        await application(scope, receive, send)
+    finally:
+        disconnected.set()
+    return status
+
+
+class Command(BaseCommand):
+    help = 'Measures HTTP throughput of the ASGI application in-process for different ASGI_HTTP_THREADS values.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/service-requests/', help='GET path to request, may include a query string.')
+        parser.add_argument('--username', help='User to authenticate as, defaults to the first superuser.')
+        parser.add_argument('--threads', default='0,2,4,8', help='Comma separated thread counts, 0 is the default ASGI handler.')
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight at once.')
+        parser.add_argument('--requests', type=int, default=400, help='Requests per run.')
+        parser.add_argument('--db-latency', type=float, default=0,
+                            help='Milliseconds added to every query, to model a database on another host.')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first() if options['username'] else \
+            User.objects.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError('No user to authenticate as, create a superuser or pass --username')
+        token = str(RefreshToken.for_user(user).access_token)
+        headers = [(b'host', b'localhost'), (b'authorization', f'Bearer {token}'.encode())]
+        path, _, query_string = options['path'].partition('?')
+        total, concurrency = options['requests'], options['concurrency']
+        connections.close_all()
+        if options['db_latency']:
+            # weak=False, the receiver is a closure that would otherwise be collected straight away
+            connection_created.connect(_add_latency(options['db_latency'] / 1000), weak=False)
+
+        self.stdout.write(
+            f"GET {options['path']} as {user.username}: {total} requests, concurrency {concurrency}, "
+            f"+{options['db_latency']}ms per query"
+        )
+        self.stdout.write(f"{'threads':>8} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for threads in [int(value) for value in options['threads'].split(',')]:
+            application = ThreadPoolHTTPApplication(threads) if threads > 0 else get_asgi_application()
+            with override_settings(ALLOWED_HOSTS=['localhost']):
+                seconds, latencies, errors = async_to_sync(self.run)(application, path, query_string, headers, total, concurrency)
+            if threads > 0:
+                application.executor.shutdown()
+            self.stdout.write(
+                f"{threads or 'default':>8} {total / seconds:>10,.1f} "
+                f"{_percentile(latencies, 50) * 1000:>9.1f} {_percentile(latencies, 95) * 1000:>9.1f} "
+                f"{_percentile(latencies, 99) * 1000:>9.1f} {errors:>7}"
+            )
+
+    async def run(self, application, path, query_string, headers, total, concurrency):
+        # warm up so url resolving, imports and the first connection aren't timed
+        await _request(application, path, query_string, headers)
+        latencies = []
+        errors = 0
+        remaining = iter(range(total))
+
+        async def client():
+            nonlocal errors
+            for _ in remaining:
+                started = time.perf_counter()
+                status = await _request(application, path, query_string, headers)
+                latencies.append(time.perf_counter() - started)
+                if status != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return time.perf_counter() - started, latencies, errors
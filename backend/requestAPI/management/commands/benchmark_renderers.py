@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from requestAPI.models import Building, ServiceRequest
+from requestAPI.renderers import ORJSONRenderer, ORJSONParser, orjson
+from requestAPI.serializers import BuildingSerializer, ServiceRequestSerializer
+import io
+import time
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Compares encode/decode time of DRF\'s JSONRenderer/JSONParser and the orjson ones on service-requests and buildings payloads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000,
+                            help='Rows per payload, the serialized database rows are repeated to reach it.')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per renderer.')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write('orjson is not installed, ORJSONRenderer is falling back to the stdlib')
+        # the same serializer output the list endpoints hand to the renderer
+        payloads = {
+            'service-requests': ServiceRequestSerializer(ServiceRequest.objects.with_details()[:options['rows']], many=True).data,
+            'buildings': BuildingSerializer(Building.objects.prefetch_related('users')[:options['rows']], many=True).data,
+        }
+        self.stdout.write(f"{'payload':>17} {'step':>7} {'rows':>6} {'bytes':>11} {'drf ms':>8} {'orjson ms':>10} {'speedup':>8} {'same':>5}")
+        for name, rows in payloads.items():
+            if not rows:
+                raise CommandError(f'No rows to build the {name} payload from')
+            data = [rows[i % len(rows)] for i in range(options['rows'])]
+            expected = JSONRenderer().render(data)
+            rendered = ORJSONRenderer().render(data)
+            self.report(name, 'encode', data, len(expected), expected == rendered, options['repeat'],
+                        lambda: JSONRenderer().render(data), lambda: ORJSONRenderer().render(data))
+            context = {'encoding': 'utf-8'}
+            self.report(name, 'decode', data, len(expected),
+                        JSONParser().parse(io.BytesIO(expected), None, context) == ORJSONParser().parse(io.BytesIO(expected), None, context),
+                        options['repeat'],
+                        lambda: JSONParser().parse(io.BytesIO(expected), None, context),
+                        lambda: ORJSONParser().parse(io.BytesIO(expected), None, context))
+
+    def report(self, name, step, data, size, same, repeat, drf, fast):
+        timings = {}
+        for label, run in (('drf', drf), ('orjson', fast)):
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                run()
+                samples.append(time.perf_counter() - started)
+            timings[label] = _percentile(samples, 50)
+        self.stdout.write(
+            f"{name:>17} {step:>7} {len(data):>6} {size:>11,} {timings['drf'] * 1000:>8.2f} "
+            f"{timings['orjson'] * 1000:>10.2f} {timings['drf'] / timings['orjson']:>7.1f}x {'yes' if same else 'NO':>5}"
+        )
@@ -0,0 +1,91 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from requestAPI.fast_serializers import serialize_service_requests, serialize_users
+from requestAPI.models import Building, ServiceRequest, ServiceType
+from requestAPI.serializers import ServiceRequestSerializer, UserSerializer
+import time
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Compares rows/second of the DRF list serializers against requestAPI.fast_serializers (queries and rendering included).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Temporary service requests to create.')
+        parser.add_argument('--users', type=int, default=500, help='Temporary users to create, they own the requests.')
+        parser.add_argument('--buildings', type=int, default=20, help='Temporary buildings the users are spread across.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per path.')
+
+    def handle(self, *args, **options):
+        if min(options['requests'], options['users'], options['buildings'], options['repeat']) < 1:
+            raise CommandError('--requests, --users, --buildings and --repeat must be at least 1')
+        renderer = JSONRenderer()
+        # temporary rows, deleted again at the end. bulk_create so the rollup signals never see them
+        service_type = ServiceType.objects.create(name='benchmark_serializers', description='Benchmark')
+        try:
+            self.create_rows(service_type, options)
+            requests = ServiceRequest.objects.filter(service_request_item=service_type).order_by('id')
+            users = User.objects.filter(username__startswith='benchmark_serializers_').order_by('id')
+            paths = (
+                ('requests', 'serializer', lambda: ServiceRequestSerializer(requests.with_details(), many=True).data),
+                ('requests', 'values', lambda: serialize_service_requests(requests.with_details())),
+                ('users', 'serializer', lambda: UserSerializer(users.prefetch_related('buildings'), many=True).data),
+                ('users', 'values', lambda: serialize_users(users)),
+            )
+            self.stdout.write(f"{'list':>9} {'path':>11} {'rows':>7} {'p50 ms':>9} {'rows/s':>10} {'bytes':>10}")
+            rendered = {}
+            for name, path, build in paths:
+                timings = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    content = renderer.render(build())
+                    timings.append(time.perf_counter() - started)
+                rendered[name, path] = content
+                rows = options['requests'] if name == 'requests' else options['users']
+                self.stdout.write(
+                    f"{name:>9} {path:>11} {rows:>7} {_percentile(timings, 50) * 1000:>9.1f} "
+                    f"{rows / _percentile(timings, 50):>10,.0f} {len(content):>10,}"
+                )
+            for name in ('requests', 'users'):
+                if rendered[name, 'serializer'] != rendered[name, 'values']:
+                    self.stderr.write(f"{name}: values output differs from the serializer")
+        finally:
+            User.objects.filter(username__startswith='benchmark_serializers_').delete()
+            Building.objects.filter(name__startswith='benchmark_serializers_').delete()
+            service_type.delete()
+
+    def create_rows(self, service_type, options):
+        Building.objects.bulk_create([
+            Building(name=f'benchmark_serializers_{i}', address_line1=f'{i} Benchmark St', city='Benchmark City',
+                     postcode='B3 NCH', latitude='51.5074', longitude='-0.1278')
+            for i in range(options['buildings'])
+        ])
+        buildings = list(Building.objects.filter(name__startswith='benchmark_serializers_'))
+        User.objects.bulk_create([
+            User(username=f'benchmark_serializers_{i}', email=f'benchmark_serializers_{i}@example.com',
+                 first_name='Bench', last_name=f'User {i}')
+            for i in range(options['users'])
+        ])
+        users = list(User.objects.filter(username__startswith='benchmark_serializers_'))
+        Building.users.through.objects.bulk_create([
+            Building.users.through(building_id=buildings[i % len(buildings)].id, user_id=user.id)
+            for i, user in enumerate(users)
+        ])
+        sla_date = timezone.now() + timedelta(days=3)
+        ServiceRequest.objects.bulk_create([
+            ServiceRequest(
+                created_by=users[i % len(users)],
+                building=buildings[i % len(users) % len(buildings)],
+                service_request_item=service_type,
+                customer_notes=f'Benchmark request {i}',
+                service_level_agreement_date=sla_date
+            )
+            for i in range(options['requests'])
+        ], batch_size=500)
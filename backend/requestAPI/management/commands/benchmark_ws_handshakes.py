@@ -0,0 +1,76 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from asgiref.sync import async_to_sync
+from rest_framework_simplejwt.tokens import RefreshToken
+from requestAPI.authentication import ClaimsRefreshToken, user_cache
+from requestAPI.middleware import JWTAuthMiddlewareStack
+from requestAPI.routing import websocket_urlpatterns
+import asyncio
+import time
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Opens many concurrent notification sockets through the JWT middleware and reports handshake throughput.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--handshakes', type=int, default=5000, help='Number of sockets to open at once.')
+        # every user has an auth version in the cache, the default locmem cache only holds 300 entries and
+        # evicted versions send handshakes down the database path
+        parser.add_argument('--users', type=int, default=200, help='Distinct (temporary) users the sockets are spread across.')
+        parser.add_argument('--timeout', type=float, default=60, help='Seconds each handshake may take.')
+
+    def handle(self, *args, **options):
+        application = JWTAuthMiddlewareStack(URLRouter(websocket_urlpatterns))
+        self.stdout.write(f"{options['handshakes']} concurrent handshakes across {options['users']} users")
+        self.stdout.write(f"{'tokens':>10} {'conn/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'failed':>7} {'queries':>8}")
+        # temporary users, deleted again at the end (not a transaction - database_sync_to_async closes
+        # connections that are inside one)
+        User.objects.bulk_create([
+            User(username=f"benchmark_socket_{i}", email=f"benchmark_socket_{i}@example.com")
+            for i in range(options['users'])
+        ])
+        users = list(User.objects.filter(username__startswith='benchmark_socket_'))
+        try:
+            for label, token_class in (('claims', ClaimsRefreshToken), ('no claims', RefreshToken)):
+                tokens = [str(token_class.for_user(users[i % len(users)]).access_token) for i in range(options['handshakes'])]
+                user_cache.clear()
+                # one process, so the default locmem cache is as good as shared - without this claims are never
+                # trusted and both rows would measure the database path (see requestAPI.cache.cache_is_shared)
+                with override_settings(CACHE_SHARED=True), CaptureQueriesContext(connection) as queries:
+                    seconds, latencies, failed = async_to_sync(self.run)(application, tokens, options['timeout'])
+                self.stdout.write(
+                    f"{label:>10} {len(tokens) / seconds:>10,.0f} "
+                    f"{_percentile(latencies, 50) * 1000:>9.1f} {_percentile(latencies, 95) * 1000:>9.1f} "
+                    f"{_percentile(latencies, 99) * 1000:>9.1f} {failed:>7} {len(queries):>8}"
+                )
+        finally:
+            User.objects.filter(username__startswith='benchmark_socket_').delete()
+
+    async def run(self, application, tokens, timeout):
+        latencies = []
+        failed = 0
+
+        async def handshake(token):
+            nonlocal failed
+            communicator = WebsocketCommunicator(application, f'/ws/notifications/?token={token}')
+            started = time.perf_counter()
+            connected, _ = await communicator.connect(timeout=timeout)
+            latencies.append(time.perf_counter() - started)
+            if not connected:
+                failed += 1
+            return communicator
+
+        started = time.perf_counter()
+        communicators = await asyncio.gather(*(handshake(token) for token in tokens))
+        seconds = time.perf_counter() - started
+        await asyncio.gather(*(communicator.disconnect() for communicator in communicators))
+        return seconds, latencies, failed
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from requestAPI import outbox
+import time
+
+
+class Command(BaseCommand):
+    help = 'Delivers queued notifications from the outbox table to SQS in batches of 10, retrying failures with backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the rows that are currently due and exit.')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when the outbox is empty.')
+
+    def handle(self, *args, **options):
+        if not outbox.QUEUE_URL:
+            raise CommandError('SQS_NOTIFICATION_QUEUE_URL environment variable is not set')
+
+        while True:
+            delivered, failed = outbox.dispatch_pending()
+            if delivered or failed:
+                self.stdout.write(f"Delivered {delivered}, failed {failed}")
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -1,23 +1,29 @@
-from channels.auth import AuthMiddlewareStack
-from django.db import close_old_connections
+from channels.db import database_sync_to_async
+from django.contrib.auth.models import AnonymousUser
 from urllib.parse import parse_qs
-from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+from .authentication import ClaimsJWTAuthentication
 
 # custom middleware - required for web sockets tow work using JWT tokens from current implementation
 # gets connecting users auth token and validates it to ensure only right users can access - connection is one way also
-@sync_to_async
-def get_user(token_key):
+# the user is built from the token's claims so a handshake normally needs no database query at all (only a cache
+# read), only tokens without claims (or whose claims were revoked, see requestAPI.authentication) load the user
+authentication = ClaimsJWTAuthentication()
+
+
+@database_sync_to_async
+def load_user(access_token):
+    # the claims check reads the auth version from the shared cache, which is blocking I/O too - neither may run
+    # on the event loop
+    return authentication.get_claims_user(access_token) or authentication.get_full_user(access_token)
+
+
+async def get_user(token_key):
     try:
-        from django.contrib.auth import get_user_model
-        from django.contrib.auth.models import AnonymousUser
-        
-        User = get_user_model() 
-        from rest_framework_simplejwt.tokens import AccessToken
-        access_token = AccessToken(token_key)
-        user_id = access_token['user_id']
-        return User.objects.get(id=user_id)
-    except (InvalidToken, TokenError, User.DoesNotExist):
+        return await load_user(AccessToken(token_key))
+    except (InvalidToken, TokenError, AuthenticationFailed):
         return AnonymousUser()
 
 class JWTAuthMiddleware:
@@ -25,7 +31,6 @@ class JWTAuthMiddleware:
         self.inner = inner
 
     async def __call__(self, scope, receive, send):
-        close_old_connections()
         query_string = scope['query_string'].decode()
         query_params = parse_qs(query_string)
         token = query_params.get('token', [None])[0]
@@ -33,10 +38,10 @@ class JWTAuthMiddleware:
         if token:
             scope['user'] = await get_user(token)
         else:
-            from django.contrib.auth.models import AnonymousUser
             scope['user'] = AnonymousUser()
-            
+
         return await self.inner(scope, receive, send)
 
 def JWTAuthMiddlewareStack(inner):
-    return JWTAuthMiddleware(AuthMiddlewareStack(inner))
\ No newline at end of file
+    # no session/cookie middleware, the token is the only credential sockets use
+    return JWTAuthMiddleware(inner)
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:01
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requestAPI', '0047_errorlog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.JSONField()),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+                ('next_attempt_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('delivered_date', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='notificationoutbox',
+            index=models.Index(fields=['delivered_date', 'next_attempt_date'], name='outbox_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requestAPI', '0048_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChannelGroupMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group', models.CharField(max_length=100)),
+                ('channel_name', models.CharField(max_length=255)),
+                ('process', models.CharField(max_length=32)),
+                ('joined_date', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'unique_together': {('group', 'channel_name')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requestAPI', '0049_channelgroupmembership'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['service_level_agreement_date', 'id'], name='sr_sla_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['created_by', 'created_date', 'id'], name='sr_customer_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requestAPI', '0050_servicerequest_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['status', 'service_level_agreement_date'], name='sr_status_sla_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(condition=models.Q(('status__in', ['open', 'in_progress'])), fields=['service_level_agreement_date'], name='sr_active_sla_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='update',
+            index=models.Index(fields=['associated_to', 'is_read', 'created_date'], name='update_notifications_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='update',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['associated_to', 'created_date'], name='update_unread_idx'),
+        ),
+    ]
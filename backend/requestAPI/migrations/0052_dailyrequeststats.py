@@ -0,0 +1,49 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:11
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def backfill_daily_stats(apps, schema_editor):
+    ServiceRequest = apps.get_model('requestAPI', 'ServiceRequest')
+    DailyRequestStats = apps.get_model('requestAPI', 'DailyRequestStats')
+    rows = ServiceRequest.objects.annotate(
+        day=TruncDate('created_date', tzinfo=timezone.get_current_timezone())
+    ).values('day', 'building_id', 'service_request_item_id', 'status').annotate(total=Count('id')).order_by()
+    DailyRequestStats.objects.bulk_create([
+        DailyRequestStats(
+            day=row['day'],
+            building_id=row['building_id'],
+            service_type_id=row['service_request_item_id'],
+            status=row['status'],
+            count=row['total']
+        ) for row in rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requestAPI', '0051_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRequestStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('open', 'Open'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='requestAPI.building')),
+                ('service_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='requestAPI.servicetype')),
+            ],
+            options={
+                'unique_together': {('day', 'building', 'service_type', 'status')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
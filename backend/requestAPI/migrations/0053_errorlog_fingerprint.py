@@ -0,0 +1,39 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:14
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requestAPI', '0052_dailyrequeststats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='errorlog',
+            name='exception_type',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='errorlog',
+            name='fingerprint',
+            field=models.CharField(blank=True, max_length=40, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='errorlog',
+            name='last_seen',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='errorlog',
+            name='occurrences',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='errorlog',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requestAPI', '0053_errorlog_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='update',
+            index=models.Index(fields=['associated_to', 'id'], name='update_replay_idx'),
+        ),
+    ]
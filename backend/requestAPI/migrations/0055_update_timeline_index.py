@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requestAPI', '0054_update_replay_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='update',
+            index=models.Index(fields=['service_request', 'created_date', 'id'], name='update_timeline_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('requestAPI', '0055_update_timeline_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationReadMarker',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_id', models.BigIntegerField(default=0)),
+                ('updated_date', models.DateTimeField(auto_now=True)),
+                ('service_request', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='read_markers', to='requestAPI.servicerequest')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_markers', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='notificationreadmarker',
+            constraint=models.UniqueConstraint(fields=('user', 'service_request'), name='read_marker_request_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='notificationreadmarker',
+            constraint=models.UniqueConstraint(condition=models.Q(('service_request__isnull', True)), fields=('user',), name='read_marker_global_unique'),
+        ),
+    ]
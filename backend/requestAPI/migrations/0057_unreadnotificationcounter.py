@@ -0,0 +1,22 @@
+# Generated by Django 3.2.25 on 2026-10-18 08:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('requestAPI', '0056_notificationreadmarker'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadNotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='unread_counter', serialize=False, to='auth.user')),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
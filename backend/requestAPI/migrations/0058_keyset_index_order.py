@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:11
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requestAPI', '0057_unreadnotificationcounter'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='servicerequest',
+            name='sr_customer_keyset_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='update',
+            name='update_timeline_idx',
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(django.db.models.expressions.F('created_by'), django.db.models.expressions.OrderBy(django.db.models.expressions.F('created_date'), descending=True), django.db.models.expressions.OrderBy(django.db.models.expressions.F('id'), descending=True), name='sr_customer_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='update',
+            index=models.Index(django.db.models.expressions.F('service_request'), django.db.models.expressions.OrderBy(django.db.models.expressions.F('created_date'), descending=True), django.db.models.expressions.OrderBy(django.db.models.expressions.F('id'), descending=True), name='update_timeline_idx'),
+        ),
+    ]
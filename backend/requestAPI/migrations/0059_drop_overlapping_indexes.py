@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:28
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requestAPI', '0058_keyset_index_order'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='servicerequest',
+            name='sr_status_sla_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='update',
+            name='update_notifications_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='update',
+            name='update_unread_idx',
+        ),
+        migrations.AddIndex(
+            model_name='update',
+            index=models.Index(django.db.models.expressions.F('associated_to'), django.db.models.expressions.OrderBy(django.db.models.expressions.F('created_date'), descending=True), django.db.models.expressions.OrderBy(django.db.models.expressions.F('id'), descending=True), condition=models.Q(('is_read', False)), name='update_unread_idx'),
+        ),
+    ]
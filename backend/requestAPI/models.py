@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Exists, F, OuterRef, Prefetch, Q, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from datetime import timedelta
 from django.utils import timezone
@@ -28,6 +30,22 @@ class ServiceType(models.Model):
         return self.name
 
 
+class ServiceRequestQuerySet(models.QuerySet):
+    def with_details(self, relations=None):
+        # everything ServiceRequestSerializer nests - created_by, building (and its users) and the service type -
+        # in a fixed number of queries however many requests are serialized. relations limits it to the ones
+        # a sparse request asked for (ServiceRequestSerializer.expanded_relations). Users are in id order,
+        # the same order requestAPI.fast_serializers lists them in
+        related = [name for name in ('created_by', 'building', 'service_request_item') if relations is None or name in relations]
+        # select_related() without arguments would follow every foreign key
+        queryset = self.select_related(*related) if related else self
+        if 'building' in related:
+            queryset = queryset.prefetch_related(
+                Prefetch('building__users', queryset=User.objects.only('id', 'first_name', 'last_name', 'email', 'is_superuser').order_by('id'))
+            )
+        return queryset
+
+
 class ServiceRequest(models.Model):
     STATUS_CHOICES = [
         ('open', 'Open'),
@@ -52,6 +70,26 @@ class ServiceRequest(models.Model):
     building = models.ForeignKey('Building', on_delete=models.CASCADE)
     service_level_agreement_date = models.DateTimeField(null=True, blank=True)
 
+    objects = ServiceRequestQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # keyset pagination keys - admins page by SLA, customers by their own newest first, in the same
+            # direction KeysetPagination sorts them
+            models.Index(fields=['service_level_agreement_date', 'id'], name='sr_sla_keyset_idx'),
+            models.Index(
+                F('created_by'), F('created_date').desc(), F('id').desc(),
+                name='sr_customer_keyset_idx'
+            ),
+            # DashboardViewSet.action_required - open work ordered by SLA, the partial index only holds
+            # the active requests so it stays small as completed/cancelled requests pile up
+            models.Index(
+                fields=['service_level_agreement_date'],
+                name='sr_active_sla_idx',
+                condition=models.Q(status__in=['open', 'in_progress'])
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.service_level_agreement_date:
             current_datetime = timezone.now()
@@ -67,6 +105,31 @@ class ServiceRequest(models.Model):
     def __str__(self):
         return self.status
 
+class UpdateQuerySet(models.QuerySet):
+    def unread_for(self, user_id):
+        # unread = not individually marked read and newer than both the user's global read watermark and the
+        # watermark for its request (see NotificationReadMarker) - an id range on update_replay_idx
+        global_marker = NotificationReadMarker.objects.filter(
+            user_id=user_id, service_request__isnull=True
+        ).values('last_read_id')[:1]
+        request_marker = NotificationReadMarker.objects.filter(
+            user_id=user_id, service_request=OuterRef('service_request'), last_read_id__gte=OuterRef('id')
+        )
+        return self.filter(
+            associated_to_id=user_id,
+            is_read=False,
+            id__gt=Coalesce(Subquery(global_marker), Value(0))
+        ).exclude(Exists(request_marker))
+
+    def read_state_for(self, user_id, is_read):
+        # is_read as the user sees it - their own updates under a read watermark are read even though the
+        # column still says otherwise, updates associated to anyone else only go by the column
+        unread = Q(is_read=False) & (
+            ~Q(associated_to_id=user_id) | Q(id__in=self.model.objects.unread_for(user_id).values('id'))
+        )
+        return self.exclude(unread) if is_read else self.filter(unread)
+
+
 class Update(models.Model):
     TYPE_CHOICES = [
         ('message', 'Message'),
@@ -81,19 +144,121 @@ class Update(models.Model):
     type = models.TextField(max_length=100, choices=TYPE_CHOICES, default='event')
     is_read = models.BooleanField(default=False)
 
+    objects = UpdateQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # UpdateViewSet.notifications - a user's unread updates newest first, in the (created_date, id)
+            # order its pages are read in
+            models.Index(
+                F('associated_to'), F('created_date').desc(), F('id').desc(),
+                name='update_unread_idx',
+                condition=models.Q(is_read=False)
+            ),
+            # NotificationConsumer replay - a user's updates after the last id their socket saw
+            models.Index(fields=['associated_to', 'id'], name='update_replay_idx'),
+            # service_request_updates timeline pages
+            models.Index(
+                F('service_request'), F('created_date').desc(), F('id').desc(),
+                name='update_timeline_idx'
+            ),
+        ]
+
     def __str__(self):
         return f'Comment by {self.created_by.username} on Request {self.service_request.id}'
     
 
+class NotificationReadMarker(models.Model):
+    # per-user read watermark - every update associated to the user with an id up to last_read_id counts as
+    # read, so mark all as read moves one row instead of updating every unread Update. A marker with a
+    # service_request only covers that request's updates
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='read_markers')
+    service_request = models.ForeignKey(ServiceRequest, on_delete=models.CASCADE, null=True, blank=True, related_name='read_markers')
+    last_read_id = models.BigIntegerField(default=0)
+    updated_date = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'service_request'], name='read_marker_request_unique'),
+            # nulls never collide in a unique index, so the global marker needs its own
+            models.UniqueConstraint(fields=['user'], condition=models.Q(service_request__isnull=True), name='read_marker_global_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} read up to {self.last_read_id}"
+
+
+class UnreadNotificationCounter(models.Model):
+    # the user's unread notification count (UpdateViewSet.notifications rows), kept in step by
+    # requestAPI.read_markers so the badge and socket events never count Update rows
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='unread_counter')
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.count} unread"
+
+
 class ErrorLog(models.Model):
+    # one row per distinct error (fingerprint), see requestAPI.error_logging - timestamp is when it was first seen
     timestamp = models.DateTimeField(auto_now_add=True)
     endpoint = models.CharField(max_length=255)
+    # sampled traceback of one of the occurrences
     error_message = models.TextField()
+    fingerprint = models.CharField(max_length=40, unique=True, null=True, blank=True)
+    exception_type = models.CharField(max_length=255, blank=True, default='')
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    occurrences = models.PositiveIntegerField(default=1)
+    last_seen = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
         return f"Error at {self.endpoint} on {self.timestamp}"
 
-    
-    
+
+class NotificationOutbox(models.Model):
+    # SQS notifications are written here in the same transaction as the Update that caused them
+    # and delivered later by the dispatch_notifications command - see requestAPI.outbox
+    payload = models.JSONField()
+    created_date = models.DateTimeField(auto_now_add=True)
+    next_attempt_date = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+    delivered_date = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['delivered_date', 'next_attempt_date'], name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"Outbox {self.id} ({'delivered' if self.delivered_date else 'pending'})"
 
 
+class ChannelGroupMembership(models.Model):
+    # group membership for requestAPI.channel_layers.PostgresChannelLayer so every worker process
+    # can see which process owns each channel in a group like user_{id}
+    group = models.CharField(max_length=100)
+    channel_name = models.CharField(max_length=255)
+    process = models.CharField(max_length=32)
+    joined_date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('group', 'channel_name')
+
+    def __str__(self):
+        return f"{self.channel_name} in {self.group}"
+
+
+class DailyRequestStats(models.Model):
+    # pre-aggregated service request counts per day x building x service type x status, kept up to date
+    # by the signals in requestAPI.signals so the dashboard time series never scans ServiceRequest
+    day = models.DateField()
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='daily_stats')
+    service_type = models.ForeignKey(ServiceType, on_delete=models.CASCADE, related_name='daily_stats')
+    status = models.CharField(max_length=20, choices=ServiceRequest.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('day', 'building', 'service_type', 'status')
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.count}"
@@ -0,0 +1,129 @@
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from .models import NotificationOutbox
+import boto3
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+QUEUE_URL = os.environ.get('SQS_NOTIFICATION_QUEUE_URL')
+
+# SQS accepts at most 10 entries per send_message_batch call
+BATCH_SIZE = 10
+# after this many failed attempts a row is left in the table for someone to look at
+MAX_ATTEMPTS = int(os.environ.get('SQS_OUTBOX_MAX_ATTEMPTS', '8'))
+BACKOFF_BASE_SECONDS = 2
+BACKOFF_MAX_SECONDS = 300
+# claimed rows are not due again for this long, so a dispatcher that dies mid-send only delays them
+LEASE_SECONDS = int(os.environ.get('SQS_OUTBOX_LEASE_SECONDS', '60'))
+
+_sqs = None
+
+
+def get_sqs_client():
+    # created lazily so importing this module (or running tests) never builds a boto3 client
+    global _sqs
+    if _sqs is None:
+        _sqs = boto3.client('sqs', region_name='eu-north-1')
+    return _sqs
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    # exponential backoff 2s, 4s, 8s ... capped at BACKOFF_MAX_SECONDS
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0), BACKOFF_MAX_SECONDS))
+
+
+def pending_rows():
+    return NotificationOutbox.objects.filter(
+        delivered_date__isnull=True,
+        attempts__lt=MAX_ATTEMPTS,
+        next_attempt_date__lte=timezone.now()
+    ).order_by('id')
+
+
+def _send_batch(client, queue_url, rows):
+    # returns {row id: error message} for every entry that was not accepted by SQS
+    entries = [{'Id': str(row.id), 'MessageBody': json.dumps(row.payload)} for row in rows]
+    try:
+        response = client.send_message_batch(QueueUrl=queue_url, Entries=entries)
+    except Exception as e:
+        return {row.id: str(e) for row in rows}
+
+    failed = {int(entry['Id']): entry.get('Message', entry.get('Code', 'Unknown error')) for entry in response.get('Failed', [])}
+    # anything SQS didn't mention in either list is treated as failed so it gets retried
+    successful = {int(entry['Id']) for entry in response.get('Successful', [])}
+    for row in rows:
+        if row.id not in successful and row.id not in failed:
+            failed[row.id] = 'Missing from send_message_batch response'
+    return failed
+
+
+def claim_batch():
+    """Leases up to BATCH_SIZE due rows by pushing their next_attempt_date past the lease, in a short
+    transaction of its own so no lock is held while they are sent."""
+    with transaction.atomic():
+        # skip_locked lets several dispatchers run side by side on postgres, sqlite ignores it
+        rows = list(pending_rows().select_for_update(skip_locked=True)[:BATCH_SIZE])
+        if rows:
+            NotificationOutbox.objects.filter(id__in=[row.id for row in rows]).update(
+                next_attempt_date=timezone.now() + timedelta(seconds=LEASE_SECONDS)
+            )
+    return rows
+
+
+def _record_results(rows, failed):
+    """Marks the sent rows delivered and backs off the failed ones. Returns (delivered ids, retried rows)."""
+    now = timezone.now()
+    delivered_ids = [row.id for row in rows if row.id not in failed]
+    retry_rows = [row for row in rows if row.id in failed]
+    for row in retry_rows:
+        row.attempts += 1
+        row.last_error = failed[row.id]
+        row.next_attempt_date = now + backoff_delay(row.attempts)
+        if row.attempts >= MAX_ATTEMPTS:
+            logger.error(f"Giving up on outbox notification {row.id} after {row.attempts} attempts: {row.last_error}")
+    with transaction.atomic():
+        if delivered_ids:
+            NotificationOutbox.objects.filter(id__in=delivered_ids).update(delivered_date=now)
+        if retry_rows:
+            NotificationOutbox.objects.bulk_update(retry_rows, ['attempts', 'last_error', 'next_attempt_date'])
+    return delivered_ids, retry_rows
+
+
+def dispatch_batch(client=None, queue_url=None):
+    """Claims up to BATCH_SIZE pending rows, sends them in one send_message_batch call and records the outcome.
+    Returns (delivered, failed) counts - (0, 0) when the outbox is drained.
+
+    The SQS call runs outside any transaction, between the claim and the result - a crash in between leaves
+    the rows to be sent again once the lease runs out, so delivery is at least once."""
+    client = client or get_sqs_client()
+    queue_url = queue_url or QUEUE_URL
+
+    rows = claim_batch()
+    if not rows:
+        return 0, 0
+    delivered_ids, retry_rows = _record_results(rows, _send_batch(client, queue_url, rows))
+
+    if delivered_ids:
+        logger.info(f"Published {len(delivered_ids)} notification(s) to SQS")
+    if retry_rows:
+        logger.warning(f"Failed to publish {len(retry_rows)} notification(s) to SQS, will retry")
+    return len(delivered_ids), len(retry_rows)
+
+
+def dispatch_pending(client=None, queue_url=None):
+    """Drains every row that is currently due. Returns total (delivered, failed)."""
+    total_delivered = total_failed = 0
+    while True:
+        delivered, failed = dispatch_batch(client, queue_url)
+        if not delivered and not failed:
+            break
+        total_delivered += delivered
+        total_failed += failed
+        # a fully failed batch stays in backoff, stop rather than spin on the remaining rows
+        if not delivered:
+            break
+    return total_delivered, total_failed
@@ -0,0 +1,155 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+import json
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination on (ordering field, id).
+
+    Each page is fetched with a WHERE on the last row's key instead of an OFFSET, so it costs the same at
+    any depth as long as a matching (field, id) index exists. Nulls always sort last: on a nullable field the
+    non-null values are paged first and the null rows after them, in id order, as a separate query. Neither
+    query needs NULLS FIRST/LAST in its ORDER BY, so a plain (field, id) index serves both, in either direction.
+
+    Pagination is opt-in - it only applies when the client sends ?page_size= or ?cursor=, existing callers
+    that expect a plain list are unaffected. Only forward (next) links are provided.
+    """
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    # default key when the client hasn't asked for an ordering, '-' for descending
+    ordering = '-id'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_default_ordering(self, request, view):
+        return self.ordering
+
+    def get_ordering(self, request, queryset, view):
+        # respect ?ordering= when the view allows it, only the first field is used for the key
+        if request.query_params.get(OrderingFilter.ordering_param) and hasattr(view, 'ordering_fields'):
+            ordering = OrderingFilter().remove_invalid_fields(
+                queryset, request.query_params[OrderingFilter.ordering_param].split(','), view, request
+            )
+            if ordering:
+                return ordering[0]
+        return self.get_default_ordering(request, view)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_size_query_param not in request.query_params and self.cursor_query_param not in request.query_params:
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ordering = self.get_ordering(request, queryset, view)
+        descending = ordering.startswith('-')
+        model_field = queryset.model._meta.get_field(ordering.lstrip('-'))
+        field = model_field.attname
+        nullable = field != 'id' and model_field.null
+        self.ordering_token = ordering
+
+        order_by = [f"-{field}" if descending else field]
+        if field != 'id':
+            order_by.append('-id' if descending else 'id')
+        queryset = queryset.order_by(*order_by)
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            page = queryset.filter(self.seek_filter(queryset.model, field, descending, cursor))
+        elif nullable:
+            page = queryset.filter(**{f"{field}__isnull": False})
+        else:
+            page = queryset
+
+        rows = list(page[:self.page_size + 1])
+        if nullable and len(rows) <= self.page_size and (cursor is None or cursor[0] is not None):
+            # ran out of values, the rest of the page comes from the start of the null tail
+            tail = queryset.filter(**{f"{field}__isnull": True})
+            rows += list(tail[:self.page_size + 1 - len(rows)])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        self.field = field
+        return self.page
+
+    def seek_filter(self, model, field, descending, cursor):
+        # rows strictly after (value, id) in (field, id) order - the first condition bounds the index range,
+        # the second only skips the ties already seen. Null values are never matched here, see paginate_queryset
+        value, pk = cursor
+        after = 'lt' if descending else 'gt'
+        if field == 'id':
+            return Q(**{f"id__{after}": pk})
+        if value is None:
+            return Q(**{f"{field}__isnull": True, f"id__{after}": pk})
+        try:
+            value = model._meta.get_field(field).to_python(value)
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+        return Q(**{f"{field}__{after}e": value}) & (Q(**{f"{field}__{after}": value}) | Q(**{f"id__{after}": pk}))
+
+    def encode_cursor(self, row):
+        value = getattr(row, self.field)
+        if value is not None and not isinstance(value, (int, str)):
+            value = value.isoformat()
+        data = json.dumps({'o': self.ordering_token, 'v': value, 'id': row.pk}, separators=(',', ':'))
+        return urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(urlsafe_b64decode(encoded.encode()))
+            if data['o'] != self.ordering_token:
+                raise ValueError('cursor ordering mismatch')
+            return data['v'], int(data['id'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class ServiceRequestCursorPagination(KeysetPagination):
+    # admins work through requests by SLA, customers see their newest first - both backed by composite indexes on ServiceRequest
+    def get_default_ordering(self, request, view):
+        if request.user.is_superuser:
+            return 'service_level_agreement_date'
+        return '-created_date'
+
+
+class UpdateTimelinePagination(KeysetPagination):
+    # request timelines, notifications and today's comments, newest first on (created_date, id)
+    ordering = '-created_date'
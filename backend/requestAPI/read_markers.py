@@ -0,0 +1,102 @@
+from django.db import transaction
+from django.db.models import F, Max, Value
+from django.db.models.functions import Greatest
+from .models import NotificationReadMarker, UnreadNotificationCounter, Update
+from .upsert import update_or_insert
+
+
+def advance_read_marker(user_id, last_read_id, service_request_id=None):
+    """Moves the user's read watermark (global, or for one request) up to last_read_id. Never moves it back."""
+    update_or_insert(
+        NotificationReadMarker,
+        {'user_id': user_id, 'service_request_id': service_request_id},
+        {'last_read_id': Greatest('last_read_id', Value(last_read_id))},
+        {'last_read_id': last_read_id}
+    )
+
+
+@transaction.atomic
+def mark_all_read(user_id, service_request_id=None):
+    """Marks every update currently associated to the user (optionally only one request's) as read."""
+    updates = Update.objects.filter(associated_to_id=user_id)
+    if service_request_id is not None:
+        updates = updates.filter(service_request_id=service_request_id)
+    last_id = updates.aggregate(last=Max('id'))['last']
+    if last_id is None:
+        return None
+    if service_request_id is None:
+        # nothing of theirs is left unread, no need to count
+        advance_read_marker(user_id, last_id)
+        set_unread_count(user_id, 0)
+    else:
+        # only this request's unread updates come off the count
+        unread = count_unread(user_id, service_request_id)
+        advance_read_marker(user_id, last_id, service_request_id)
+        if unread:
+            adjust_unread_count(user_id, -unread)
+    return last_id
+
+
+@transaction.atomic
+def mark_read(user_id, update_id):
+    """Marks one update as read, returns whether it was unread before."""
+    if Update.objects.unread_for(user_id).filter(id=update_id).exclude(created_by_id=user_id).update(is_read=True):
+        adjust_unread_count(user_id, -1)
+        return True
+    # already read (or the user's own update), nothing to count
+    Update.objects.filter(id=update_id).update(is_read=True)
+    return False
+
+
+def count_unread(user_id, service_request_id=None):
+    # the same rows UpdateViewSet.notifications lists
+    updates = Update.objects.unread_for(user_id).exclude(created_by_id=user_id)
+    if service_request_id is not None:
+        updates = updates.filter(service_request_id=service_request_id)
+    return updates.count()
+
+
+def set_unread_count(user_id, count):
+    update_or_insert(UnreadNotificationCounter, {'user_id': user_id}, {'count': count}, {'count': count})
+    return count
+
+
+def refresh_unread_count(user_id):
+    """Recounts the user's unread updates into their UnreadNotificationCounter. Returns the count."""
+    return set_unread_count(user_id, count_unread(user_id))
+
+
+def adjust_unread_count(user_id, delta):
+    # users without a counter yet (e.g. unread updates from before counters existed) get a full recount instead
+    if not UnreadNotificationCounter.objects.filter(user_id=user_id).update(count=F('count') + delta):
+        refresh_unread_count(user_id)
+
+
+def get_unread_count(user_id):
+    count = UnreadNotificationCounter.objects.filter(user_id=user_id).values_list('count', flat=True).first()
+    return refresh_unread_count(user_id) if count is None else count
+
+
+class ReadMarkers:
+    """A user's watermarks, loaded on first use, for reporting is_read on serialized updates."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self._markers = None
+
+    def covers(self, update):
+        if update.associated_to_id != self.user_id:
+            return False
+        if self._markers is None:
+            self._markers = dict(
+                NotificationReadMarker.objects.filter(user_id=self.user_id).values_list('service_request_id', 'last_read_id')
+            )
+        return update.id <= max(self._markers.get(None, 0), self._markers.get(update.service_request_id, 0))
+
+
+def get_unread_counts(user_ids):
+    """get_unread_count for several users, one query for the ones that already have a counter."""
+    counts = dict(UnreadNotificationCounter.objects.filter(user_id__in=user_ids).values_list('user_id', 'count'))
+    for user_id in set(user_ids) - set(counts):
+        counts[user_id] = refresh_unread_count(user_id)
+    return counts
@@ -0,0 +1,61 @@
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+import io
+
+try:
+    import orjson
+except ImportError:
+    # optional - without it both classes behave exactly like DRF's stdlib json ones
+    orjson = None
+
+# DRF's own fallback for everything orjson doesn't encode natively (Decimal -> float, lazy translation strings,
+# QuerySets ...) and for datetimes, which are passed through so they keep DRF's format ('Z' for UTC)
+_default = JSONEncoder().default
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson.
+
+    Output is the same as DRF's compact, unicode, strict JSON, \\u2028/\\u2029 escaping included, apart from
+    float spelling (orjson writes 1e16 where json writes 1e+16) and NaN/Infinity, which orjson writes as null
+    instead of raising. Indented output (the browsable API, ?format=json with indent), non default UNICODE_JSON/
+    COMPACT_JSON/STRICT_JSON settings and anything orjson refuses (e.g. ints over 64 bits) go through DRF's renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact or not self.strict
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # same as DRF, keep the output a strict javascript subset
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSONParser decoding with orjson. Bodies orjson rejects are handed to DRF's parser, so anything the stdlib
+    accepts still parses and errors read the same. Integers over 64 bits come back as floats.
+    """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        body = stream.read()
+        try:
+            return orjson.loads(body if encoding.lower().replace('_', '-') in ('utf-8', 'utf8') else body.decode(encoding))
+        except (orjson.JSONDecodeError, UnicodeDecodeError, LookupError):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
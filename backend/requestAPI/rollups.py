@@ -0,0 +1,62 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import DailyRequestStats, ServiceRequest
+from .upsert import update_or_insert
+
+
+def request_stats_key(created_date, building_id, service_type_id, status):
+    # same day boundaries as TruncDay in the current time zone
+    return (timezone.localtime(created_date).date(), building_id, service_type_id, status)
+
+
+def service_request_key(service_request):
+    return request_stats_key(
+        service_request.created_date,
+        service_request.building_id,
+        service_request.service_request_item_id,
+        service_request.status
+    )
+
+
+def adjust_daily_stats(deltas):
+    """Applies {(day, building_id, service_type_id, status): delta} to the rollup table."""
+    for (day, building_id, service_type_id, status), delta in deltas.items():
+        if not delta:
+            continue
+        key = {'day': day, 'building_id': building_id, 'service_type_id': service_type_id, 'status': status}
+        # a negative delta never creates a row
+        update_or_insert(DailyRequestStats, key, {'count': F('count') + delta}, {'count': delta} if delta > 0 else None)
+
+
+def record_status_changes(service_requests, new_status):
+    """Rollup deltas for requests moved to new_status by a queryset update() that bypasses signals."""
+    deltas = Counter()
+    for service_request in service_requests:
+        if service_request.status == new_status:
+            continue
+        deltas[service_request_key(service_request)] -= 1
+        deltas[request_stats_key(service_request.created_date, service_request.building_id,
+                                 service_request.service_request_item_id, new_status)] += 1
+    adjust_daily_stats(deltas)
+
+
+@transaction.atomic
+def rebuild_daily_stats():
+    """Recomputes the whole rollup table from ServiceRequest. Returns the number of rollup rows written."""
+    DailyRequestStats.objects.all().delete()
+    rows = ServiceRequest.objects.annotate(
+        day=TruncDate('created_date', tzinfo=timezone.get_current_timezone())
+    ).values('day', 'building_id', 'service_request_item_id', 'status').annotate(total=Count('id')).order_by()
+    stats = DailyRequestStats.objects.bulk_create([
+        DailyRequestStats(
+            day=row['day'],
+            building_id=row['building_id'],
+            service_type_id=row['service_request_item_id'],
+            status=row['status'],
+            count=row['total']
+        ) for row in rows
+    ], batch_size=500)
+    return len(stats)
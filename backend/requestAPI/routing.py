@@ -1,7 +1,9 @@
 from django.urls import re_path
-from .consumers import NotificationConsumer
+from .consumers import NotificationConsumer, AdminFeedConsumer, RequestTimelineConsumer
 
 # like standard http url patterns defined for the web socket
 websocket_urlpatterns = [
     re_path(r'^ws/notifications/$', NotificationConsumer.as_asgi()),
+    re_path(r'^ws/admin/$', AdminFeedConsumer.as_asgi()),
+    re_path(r'^ws/requests/(?P<service_request_id>\d+)/$', RequestTimelineConsumer.as_asgi()),
 ]
\ No newline at end of file
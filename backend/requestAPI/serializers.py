@@ -2,9 +2,58 @@ from rest_framework import serializers
 from .models import ServiceType, ServiceRequest, Update, Building
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
+from rest_framework.permissions import SAFE_METHODS
 import mimetypes
 
-class UserSerializer(serializers.ModelSerializer):
+
+def _query_param_set(request, param):
+    value = request.query_params.get(param)
+    return None if value is None else {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Lets read requests trim the serializer with ?fields= and ?expand=.
+
+    Without either parameter the output is unchanged. ?fields=id,status returns only the named fields, and
+    ?expand=building_detail adds nested objects to them. ?expand= on its own keeps every plain field but only
+    the nested objects it names. Nested objects are the keys of expandable_fields, mapped to the relation
+    the view has to load for them (see expanded_relations). Write-only fields are never dropped, and only
+    the top-level serializer (the one given the request in its context) is trimmed.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # write requests (and contexts holding something other than a request) are left alone
+        if getattr(self.context.get('request'), 'method', None) not in SAFE_METHODS:
+            return
+        request = self.context['request']
+        for name in list(self.fields):
+            if not self.fields[name].write_only and not self.includes_field(request, name):
+                self.fields.pop(name)
+
+    @classmethod
+    def includes_field(cls, request, name):
+        fields, expand = _query_param_set(request, 'fields'), _query_param_set(request, 'expand')
+        if fields is None and expand is None:
+            return True
+        if name in (expand or ()):
+            return True
+        if fields is not None:
+            return name in fields
+        return name not in cls.expandable_fields
+
+    @classmethod
+    def expanded_relations(cls, request):
+        """Relations behind the nested objects this request will serialize, for select/prefetch_related."""
+        return {
+            relation for name, relation in cls.expandable_fields.items()
+            if getattr(request, 'method', None) not in SAFE_METHODS or cls.includes_field(request, name)
+        }
+
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # write-only password fields for user creation or update
     password = serializers.CharField(write_only=True, required=False, validators=[validate_password])
     password2 = serializers.CharField(write_only=True, required=False)
@@ -18,6 +67,8 @@ class UserSerializer(serializers.ModelSerializer):
     # method field to determine if the user is an admin or regular user
     user_type = serializers.SerializerMethodField()
 
+    expandable_fields = {'buildings': 'buildings'}
+
     class Meta:
         model = User
         # the fields included in the serializer
@@ -157,6 +208,14 @@ class BuildingSerializer(serializers.ModelSerializer):
         return value
 
 
+def clean_media_url(url):
+    # clean url (removing the line break) - also used by requestAPI.fast_serializers
+    clean_url = url.replace('\n', '').replace('\r', '').strip()
+    if clean_url.startswith('https://https://'):
+        clean_url = clean_url.replace('https://https://', 'https://', 1)
+    return clean_url
+
+
 class ServiceTypeSerializer(serializers.ModelSerializer):
     class Meta:
         model = ServiceType
@@ -184,19 +243,12 @@ class ServiceTypeSerializer(serializers.ModelSerializer):
         representation = super().to_representation(instance)
         # check path
         if hasattr(instance, 'service_icon') and instance.service_icon:
-            # get url of icon
-            service_icon_url = instance.service_icon.url
-            # clean url (removing the line break)
-            clean_url = service_icon_url.replace('\n', '').replace('\r', '').strip()
             # set the URL for frontend
-            if clean_url.startswith('https://https://'):
-                clean_url = clean_url.replace('https://https://', 'https://', 1)
-
-            representation['service_icon'] = clean_url
+            representation['service_icon'] = clean_media_url(instance.service_icon.url)
         return representation
     
     
-class ServiceRequestSerializer(serializers.ModelSerializer):
+class ServiceRequestSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # used when creating - only id needs to be passed rather than whole obj
     service_request_item = serializers.PrimaryKeyRelatedField(
         queryset=ServiceType.objects.all(),
@@ -217,6 +269,13 @@ class ServiceRequestSerializer(serializers.ModelSerializer):
     )
     created_by = UserSimpleSerializer(read_only=True)
 
+    # nested objects ?fields=/?expand= can leave out, and what ServiceRequestQuerySet.with_details loads for them
+    expandable_fields = {
+        'created_by': 'created_by',
+        'service_request_item_detail': 'service_request_item',
+        'building_detail': 'building',
+    }
+
     class Meta:
         model = ServiceRequest
         fields = [
@@ -270,4 +329,12 @@ class UpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Update
         fields = ['id', 'title', 'message', 'created_date', 'created_by', 'associated_to', 'service_request', 'type', 'is_read']
-        read_only_fields = ['id', 'created_date']
\ No newline at end of file
+        read_only_fields = ['id', 'created_date']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # mark all read only moves a watermark (see NotificationReadMarker), is_read still reflects it
+        read_markers = self.context.get('read_markers')
+        if read_markers is not None and not data['is_read'] and read_markers.covers(instance):
+            data['is_read'] = True
+        return data
\ No newline at end of file
@@ -0,0 +1,146 @@
+from collections import Counter
+from django.db.models import F
+from django.db.models.signals import pre_save, pre_delete, post_save, post_delete
+from django.contrib.auth.models import User
+from django.dispatch import receiver
+from .models import ServiceRequest, Building, ServiceType, Update, UnreadNotificationCounter
+from .rollups import adjust_daily_stats, service_request_key
+from .cache import bump_cache_version_on_commit, DASHBOARD, BUILDINGS
+from .authentication import revoke_cached_identity
+from .utils import send_timeline_update, send_unread_count
+from .serializers import UpdateSerializer
+from .read_markers import adjust_unread_count
+
+# keep DailyRequestStats in step with ServiceRequest - note queryset update()/bulk_create() skip these,
+# callers doing bulk writes must adjust the rollup themselves (see requestAPI.rollups)
+
+@receiver(pre_save, sender=ServiceRequest)
+def remember_previous_rollup_key(sender, instance, **kwargs):
+    instance._previous_rollup_key = None
+    if instance.pk:
+        previous = ServiceRequest.objects.filter(pk=instance.pk).only(
+            'created_date', 'building_id', 'service_request_item_id', 'status'
+        ).first()
+        if previous:
+            instance._previous_rollup_key = service_request_key(previous)
+
+
+@receiver(post_save, sender=ServiceRequest)
+def update_daily_stats_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = Counter({service_request_key(instance): 1})
+    previous = getattr(instance, '_previous_rollup_key', None)
+    if previous:
+        deltas[previous] -= 1
+    adjust_daily_stats(deltas)
+
+
+@receiver(post_delete, sender=ServiceRequest)
+def update_daily_stats_on_delete(sender, instance, **kwargs):
+    adjust_daily_stats({service_request_key(instance): -1})
+
+
+# any write to the models the dashboard aggregates over invalidates every cached dashboard response, once committed
+@receiver(post_save, sender=ServiceRequest)
+@receiver(post_delete, sender=ServiceRequest)
+@receiver(post_save, sender=Building)
+@receiver(post_delete, sender=Building)
+@receiver(post_save, sender=ServiceType)
+@receiver(post_delete, sender=ServiceType)
+def invalidate_dashboard_cache(sender, **kwargs):
+    bump_cache_version_on_commit(DASHBOARD)
+
+
+# the public registration list (BuildingViewSet.registration_list) only reads Building's own columns - its ETags
+# come from the version, so bumping before the commit would hand out a new ETag for the old list
+@receiver(post_save, sender=Building)
+@receiver(post_delete, sender=Building)
+def invalidate_building_cache(sender, **kwargs):
+    bump_cache_version_on_commit(BUILDINGS)
+
+
+# claims on already issued tokens (and cached user objects) stop being trusted once the user changes -
+# password updates, profile edits and deletes (bulk_delete included, queryset deletes still send post_delete)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def revoke_user_identity(sender, instance, **kwargs):
+    revoke_cached_identity(instance.pk)
+
+
+# every new Update (comment or event, whichever view created it) is pushed to sockets watching its request,
+# in the same shape service_request_updates returns - bulk_create() skips this, callers must push themselves
+@receiver(post_save, sender=Update)
+def push_timeline_update(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        send_timeline_update(dict(UpdateSerializer(instance).data))
+
+
+# UnreadNotificationCounter follows the user's notifications - a new unread update counts one, an edit only moves
+# the count when it changes who the update is for or whether it is read. Queryset update()/bulk_create() skip
+# these, see requestAPI.read_markers
+UNREAD_STATE_FIELDS = {'associated_to', 'associated_to_id', 'created_by', 'created_by_id', 'is_read'}
+
+
+def unread_state(update):
+    return update.associated_to_id, update.created_by_id, update.is_read
+
+
+def counted_unread(update):
+    # the user whose count the stored row is in, or None - looked up in the database, so call it while the row
+    # in there is the one to check
+    user_id = update.associated_to_id
+    if not user_id or user_id == update.created_by_id or update.is_read:
+        return None
+    return user_id if Update.objects.unread_for(user_id).filter(id=update.id).exists() else None
+
+
+@receiver(pre_save, sender=Update)
+def remember_unread_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    # the previous row is only looked up when the save could change its state, and only counted when it does
+    instance._previously_counted = None
+    instance._unread_state_changed = False
+    if raw or not instance.pk or (update_fields is not None and not UNREAD_STATE_FIELDS & set(update_fields)):
+        return
+    previous = Update.objects.filter(pk=instance.pk).only('associated_to_id', 'created_by_id', 'is_read').first()
+    if previous and unread_state(previous) != unread_state(instance):
+        instance._unread_state_changed = True
+        instance._previously_counted = counted_unread(previous)
+
+
+@receiver(post_save, sender=Update)
+def count_unread_update(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        if instance.associated_to_id and instance.associated_to_id != instance.created_by_id and not instance.is_read:
+            adjust_unread_count(instance.associated_to_id, 1)
+        return
+    if not getattr(instance, '_unread_state_changed', False):
+        # title/message edits, nothing to count
+        return
+    previously_counted, now_counted = instance._previously_counted, counted_unread(instance)
+    if previously_counted == now_counted:
+        return
+    for user_id, delta in ((previously_counted, -1), (now_counted, 1)):
+        if user_id:
+            adjust_unread_count(user_id, delta)
+            send_unread_count(user_id)
+
+
+# a deleted update only changes the count if it was unread - checked before the delete, while the row (and its
+# position against the read watermarks) can still be looked up, so a cascade over N updates never recounts
+@receiver(pre_delete, sender=Update)
+def remember_unread_update(sender, instance, **kwargs):
+    user_id = instance.associated_to_id
+    instance._counted_unread = bool(
+        user_id and user_id != instance.created_by_id and not instance.is_read
+        and Update.objects.unread_for(user_id).filter(id=instance.id).exists()
+    )
+
+
+@receiver(post_delete, sender=Update)
+def uncount_deleted_update(sender, instance, **kwargs):
+    # only an existing counter is touched, a cascade from deleting the user may already have removed it
+    if getattr(instance, '_counted_unread', False):
+        UnreadNotificationCounter.objects.filter(user_id=instance.associated_to_id, count__gt=0).update(count=F('count') - 1)
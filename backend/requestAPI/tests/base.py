@@ -10,3 +10,28 @@ class NoThrottleTestCase(TestCase):
     def setUp(self):
         cache.clear()
         super().setUp()
+
+
+class LocalSQSClient:
+    # in-process stand-in for the boto3 SQS client, only implements what requestAPI.outbox uses
+    # fail_ids - entry ids to report as failed, raise_error - exception raised on every call
+    def __init__(self, fail_ids=None, raise_error=None):
+        self.fail_ids = set(str(i) for i in (fail_ids or []))
+        self.raise_error = raise_error
+        self.batches = []
+        self.messages = []
+
+    def send_message_batch(self, QueueUrl, Entries):
+        if self.raise_error:
+            raise self.raise_error
+        if len(Entries) > 10:
+            raise ValueError('AWS.SimpleQueueService.TooManyEntriesInBatchRequest')
+        self.batches.append(Entries)
+        successful, failed = [], []
+        for entry in Entries:
+            if entry['Id'] in self.fail_ids:
+                failed.append({'Id': entry['Id'], 'SenderFault': False, 'Code': 'InternalError', 'Message': 'Stand-in failure'})
+            else:
+                self.messages.append(entry['MessageBody'])
+                successful.append({'Id': entry['Id'], 'MessageId': f"local-{entry['Id']}"})
+        return {'Successful': successful, 'Failed': failed}
@@ -0,0 +1,126 @@
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.request import Request
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from unittest import mock
+import tempfile
+from requestAPI.authentication import ClaimsJWTAuthentication, ClaimsRefreshToken, user_cache
+
+# one test process, locmem is as good as shared
+@override_settings(CACHE_SHARED=True)
+class ClaimsJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.client = APIClient()
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user('claimsuser', 'claims@test.com', 'claimspass123', first_name='Claire')
+        self.admin_user = User.objects.create_superuser('admin', 'admin@test.com', 'adminpass')
+
+    def login(self, username='claimsuser', password='claimspass123'):
+        response = self.client.post(reverse('auth-login'), {'username': username, 'password': password})
+        return response.data['access']
+
+    def authenticate(self, token, method='get'):
+        request = Request(getattr(self.factory, method)('/', HTTP_AUTHORIZATION=f'Bearer {token}'))
+        return ClaimsJWTAuthentication().authenticate(request)[0]
+
+    def test_read_requests_use_claims_without_a_query(self):
+        token = self.login()
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+        self.assertTrue(user.from_claims)
+        self.assertEqual((user.id, user.username, user.first_name, user.is_superuser), (self.user.id, 'claimsuser', 'Claire', False))
+        # fields the token doesn't carry are loaded on demand rather than left blank
+        self.assertTrue(user.check_password('claimspass123'))
+
+    def test_write_requests_load_the_user_once(self):
+        token = self.login()
+        with self.assertNumQueries(1):
+            user = self.authenticate(token, 'post')
+        self.assertFalse(hasattr(user, 'from_claims'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(token, 'post'), self.user)
+
+    def test_user_change_stops_trusting_claims(self):
+        token = self.login()
+        self.user.is_superuser = True
+        self.user.save()
+        with self.assertNumQueries(1):
+            user = self.authenticate(token)
+        self.assertTrue(user.is_superuser)
+
+    def test_password_change_revokes_cached_identity(self):
+        token = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.authenticate(token, 'post')
+        response = self.client.post(reverse('auth-update-password'), {
+            'current_password': 'claimspass123', 'new_password1': 'newclaimspass456', 'new_password2': 'newclaimspass456'
+        })
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(1):
+            self.assertFalse(hasattr(self.authenticate(token), 'from_claims'))
+
+    def test_bulk_delete_revokes_tokens(self):
+        token = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get(reverse('user-me')).status_code, 200)
+
+        admin_client = APIClient()
+        admin_client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.login('admin', 'adminpass')}")
+        response = admin_client.delete(reverse('user-bulk-delete'), {'user_ids': [self.user.id]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(reverse('user-me')).status_code, 401)
+
+    def test_refresh_restamps_claims(self):
+        refresh = ClaimsRefreshToken.for_user(self.user)
+        self.user.first_name = 'Clara'
+        self.user.save()
+        response = self.client.post(reverse('auth-refresh-token'), {'refresh': str(refresh)})
+        with self.assertNumQueries(0):
+            user = self.authenticate(response.data['access'])
+        self.assertEqual(user.first_name, 'Clara')
+
+    def test_tokens_without_claims_still_work(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+        token = str(RefreshToken.for_user(self.user).access_token)
+        self.assertEqual(self.authenticate(token), self.user)
+
+    def deactivate_in_another_process(self, other_cache):
+        # the revocation bump lands in the other worker's cache only
+        with mock.patch('requestAPI.cache.cache', other_cache):
+            self.user.is_active = False
+            self.user.save()
+
+    @override_settings(CACHE_SHARED=None)
+    def test_per_process_cache_always_loads_the_user(self):
+        token = self.login()
+        with self.assertNumQueries(1):
+            self.assertFalse(hasattr(self.authenticate(token), 'from_claims'))
+        self.deactivate_in_another_process(LocMemCache('other-worker', {}))
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_database_cache_loads_the_user(self):
+        token = self.login()
+        database_cache = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'auth_cache'}}
+        # shared, but reading the version would be a query just like loading the user - the cache isn't even read
+        with override_settings(CACHES=database_cache, CACHE_SHARED=None), self.assertNumQueries(1):
+            self.assertFalse(hasattr(self.authenticate(token), 'from_claims'))
+
+    def test_revocation_reaches_other_processes(self):
+        with tempfile.TemporaryDirectory() as location:
+            shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+            with override_settings(CACHES=shared, CACHE_SHARED=None):
+                this_worker, other_worker = FileBasedCache(location, {}), FileBasedCache(location, {})
+                with mock.patch('requestAPI.cache.cache', this_worker):
+                    token = self.login()
+                    self.assertTrue(self.authenticate(token).from_claims)
+                self.deactivate_in_another_process(other_worker)
+                with mock.patch('requestAPI.cache.cache', this_worker), self.assertRaises(AuthenticationFailed):
+                    self.authenticate(token)
@@ -0,0 +1,101 @@
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from django.urls import reverse
+from decimal import Decimal
+from unittest import mock
+from rest_framework.test import APIClient
+from requestAPI.models import Building, ServiceType, ServiceRequest
+from requestAPI.cache import get_cache_versions, bump_cache_version, DASHBOARD
+
+# one test process, locmem is as good as shared
+@override_settings(CACHE_SHARED=True)
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin_user = User.objects.create_superuser('admin', 'admin@test.com', 'adminpass')
+        self.client.force_authenticate(user=self.admin_user)
+        self.building = Building.objects.create(
+            name="Test Building",
+            address_line1="123 Test St",
+            city="Test City",
+            postcode="12345",
+            latitude=Decimal('51.5074'),
+            longitude=Decimal('-0.1278')
+        )
+        self.service_type = ServiceType.objects.create(name="Test Service", description="Test Description")
+        self.service_request = ServiceRequest.objects.create(
+            created_by=self.admin_user,
+            service_request_item=self.service_type,
+            building=self.building
+        )
+
+    def get(self, name, query=''):
+        return self.client.get(reverse(name) + query)
+
+    def test_second_request_is_a_hit(self):
+        for name in ['dashboard-requests-by-building', 'dashboard-requests-by-service-type',
+                     'dashboard-general-stats', 'dashboard-requests-over-time']:
+            first = self.get(name)
+            with self.assertNumQueries(0):
+                second = self.get(name)
+            self.assertEqual(first['X-Cache'], 'MISS')
+            self.assertEqual(second['X-Cache'], 'HIT')
+            self.assertEqual(first.data, second.data)
+
+    def test_query_params_are_part_of_the_key(self):
+        self.get('dashboard-requests-over-time', '?timeframe=7days')
+        self.assertEqual(self.get('dashboard-requests-over-time', '?timeframe=30days')['X-Cache'], 'MISS')
+        self.assertEqual(self.get('dashboard-requests-over-time', '?timeframe=7days')['X-Cache'], 'HIT')
+
+    def test_service_request_changes_invalidate(self):
+        self.get('dashboard-general-stats')
+        self.service_request.status = 'completed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service_request.save()
+        response = self.get('dashboard-general-stats')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['stats']['completed_requests']['value'], 1)
+
+    def test_building_and_service_type_changes_invalidate(self):
+        self.get('dashboard-requests-by-building')
+        self.building.name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.building.save()
+        response = self.get('dashboard-requests-by-building')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['requests_by_building'][0]['building__name'], 'Renamed')
+
+        self.get('dashboard-requests-by-service-type')
+        with self.captureOnCommitCallbacks(execute=True):
+            ServiceType.objects.create(name="Other", description="Other").delete()
+        self.assertEqual(self.get('dashboard-requests-by-service-type')['X-Cache'], 'MISS')
+
+    def test_invalidated_once_committed(self):
+        before = get_cache_versions(DASHBOARD)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service_request.status = 'completed'
+            self.service_request.save()
+            # a read before the commit would still see the old rows, it must not cache them under a new version
+            self.assertEqual(get_cache_versions(DASHBOARD)[0], before)
+        self.assertEqual(get_cache_versions(DASHBOARD)[0], before + 1)
+
+    @override_settings(CACHE_SHARED=False)
+    def test_bypassed_without_a_shared_cache(self):
+        self.get('dashboard-general-stats')
+        # a write this process never hears about, as if another worker had made it
+        ServiceRequest.objects.update(status='completed')
+        response = self.get('dashboard-general-stats')
+        self.assertEqual(response['X-Cache'], 'BYPASS')
+        self.assertEqual(response.data['stats']['completed_requests']['value'], 1)
+
+    def test_version_survives_eviction(self):
+        before = get_cache_versions(DASHBOARD)[0]
+        bump_cache_version(DASHBOARD)
+        self.assertEqual(get_cache_versions(DASHBOARD)[0], before + 1)
+        cache.clear()
+        # a later clock reading, the same millisecond would otherwise hand out the same version again
+        with mock.patch('requestAPI.cache.time.time', return_value=before / 1000 + 1):
+            bump_cache_version(DASHBOARD)
+        self.assertNotEqual(get_cache_versions(DASHBOARD)[0], before)
@@ -0,0 +1,152 @@
+from django.test import TestCase
+from django.utils import timezone
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from requestAPI.channel_layers import PostgresChannelLayer
+from requestAPI.models import ChannelGroupMembership
+import asyncio
+import socket
+import threading
+
+class LoopbackChannelLayer(PostgresChannelLayer):
+    # stands in for LISTEN/NOTIFY (sqlite in tests) by handing each payload straight to the
+    # layer instance that owns the target process, so several "processes" can share one test
+    processes = {}
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.processes[self.pg_channel(self.process)] = self
+
+    async def _ensure_listener(self):
+        pass
+
+    def _publish(self, notifications):
+        self.published = getattr(self, 'published', 0) + 1
+        for pg_channel, payload in notifications:
+            self.processes[pg_channel]._deliver(payload)
+
+
+class SocketConnection:
+    # stands in for the listener's psycopg2 connection, select() only needs a real file descriptor
+    def __init__(self):
+        self.sock, self.peer = socket.socketpair()
+        self.notifies = []
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def poll(self):
+        pass
+
+    def close(self):
+        self.sock.close()
+        self.peer.close()
+
+
+class SlowListenChannelLayer(PostgresChannelLayer):
+    # LISTEN is only in place once `ready` is set
+    def __init__(self, ready, **kwargs):
+        super().__init__(**kwargs)
+        self.ready = ready
+
+    def _connect(self):
+        if not self.ready.wait(5):
+            raise ConnectionError('no database')
+        return SocketConnection()
+
+
+class ListenerStartupTests(TestCase):
+    def test_new_channel_waits_for_listen(self):
+        ready = threading.Event()
+        layer = SlowListenChannelLayer(ready)
+
+        async def run():
+            task = asyncio.ensure_future(layer.new_channel())
+            await asyncio.sleep(0.2)
+            waited = not task.done()
+            ready.set()
+            channel = await asyncio.wait_for(task, 1)
+            # the listener is up now, later channels don't wait
+            await asyncio.wait_for(layer.new_channel(), 0.1)
+            return waited, channel
+
+        try:
+            waited, channel = async_to_sync(run)()
+        finally:
+            async_to_sync(layer.close)()
+        self.assertTrue(waited)
+        self.assertTrue(channel.startswith(f"specific.{layer.process}!"))
+
+    def test_new_channel_fails_when_listen_never_succeeds(self):
+        layer = SlowListenChannelLayer(threading.Event(), listen_timeout=0.2)
+        try:
+            with self.assertRaises(RuntimeError):
+                async_to_sync(layer.new_channel)()
+        finally:
+            async_to_sync(layer.close)()
+        self.assertEqual(layer.channels, {})
+
+
+class PostgresChannelLayerTests(TestCase):
+    def setUp(self):
+        self.worker_a = LoopbackChannelLayer()
+        self.worker_b = LoopbackChannelLayer()
+
+    def test_channel_process(self):
+        channel = f"specific.{self.worker_a.process}!abc123"
+        self.assertEqual(PostgresChannelLayer.channel_process(channel), self.worker_a.process)
+
+    def test_group_send_fans_out_across_processes(self):
+        async def run():
+            channel_a = await self.worker_a.new_channel()
+            channel_b = await self.worker_b.new_channel()
+            await self.worker_a.group_add('user_1', channel_a)
+            await self.worker_b.group_add('user_1', channel_b)
+
+            await self.worker_a.group_send('user_1', {'type': 'send_notification', 'notification': {'id': 1}})
+
+            message_a = await asyncio.wait_for(self.worker_a.receive(channel_a), 1)
+            message_b = await asyncio.wait_for(self.worker_b.receive(channel_b), 1)
+            return message_a, message_b
+
+        message_a, message_b = async_to_sync(run)()
+        self.assertEqual(message_a['notification'], {'id': 1})
+        self.assertEqual(message_b['notification'], {'id': 1})
+        # both processes were reached in a single publish round trip
+        self.assertEqual(self.worker_a.published, 1)
+
+    def test_send_to_specific_channel_in_other_process(self):
+        async def run():
+            channel_b = await self.worker_b.new_channel()
+            await self.worker_a.send(channel_b, {'type': 'ping'})
+            return await asyncio.wait_for(self.worker_b.receive(channel_b), 1)
+
+        self.assertEqual(async_to_sync(run)(), {'type': 'ping'})
+
+    def test_group_discard_removes_membership(self):
+        async def run():
+            channel = await self.worker_a.new_channel()
+            await self.worker_a.group_add('user_1', channel)
+            await self.worker_a.group_discard('user_1', channel)
+            await self.worker_a.group_send('user_1', {'type': 'ping'})
+
+        async_to_sync(run)()
+        self.assertFalse(ChannelGroupMembership.objects.exists())
+        self.assertFalse(hasattr(self.worker_a, 'published'))
+
+    def test_expired_membership_is_ignored(self):
+        ChannelGroupMembership.objects.create(
+            group='user_1',
+            channel_name=f"specific.{self.worker_a.process}!old",
+            process=self.worker_a.process,
+            joined_date=timezone.now() - timedelta(seconds=self.worker_a.group_expiry + 1)
+        )
+        self.assertEqual(self.worker_a._group_members('user_1'), {})
+
+    def test_oversized_message_is_rejected(self):
+        async def run():
+            channel = await self.worker_a.new_channel()
+            await self.worker_a.send(channel, {'type': 'ping', 'body': 'x' * 8000})
+
+        with self.assertRaises(ValueError):
+            async_to_sync(run)()
@@ -0,0 +1,103 @@
+from django.test import TestCase, RequestFactory, override_settings
+from django.contrib.auth.models import User
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from rest_framework.test import APIClient
+from requestAPI.compression import CompressionMiddleware, GzipEncoder, choose_encoder, available_encoders, brotli, zstandard
+import gzip
+import json
+import os
+import unittest
+
+
+class CompressionMiddlewareTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.body = json.dumps([{'id': i, 'status': 'open', 'priority': 'low'} for i in range(200)]).encode()
+
+    def respond(self, response, **headers):
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(self.factory.get('/service-requests/', **headers))
+
+    def json_response(self, body=None, **kwargs):
+        return HttpResponse(self.body if body is None else body, content_type='application/json', **kwargs)
+
+    def test_compresses_large_json(self):
+        response = self.respond(self.json_response(), HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertLess(len(response.content), len(self.body) / 5)
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_skipped_responses(self):
+        skipped = {
+            'not accepted': (self.json_response(), {}),
+            'refused': (self.json_response(), {'HTTP_ACCEPT_ENCODING': 'gzip;q=0'}),
+            'small': (self.json_response(b'{"id": 1}'), {'HTTP_ACCEPT_ENCODING': 'gzip'}),
+            'image': (HttpResponse(self.body, content_type='image/png'), {'HTTP_ACCEPT_ENCODING': 'gzip'}),
+            'websocket upgrade': (self.json_response(), {'HTTP_ACCEPT_ENCODING': 'gzip', 'HTTP_UPGRADE': 'websocket'}),
+            'no-transform': (self.json_response(headers={'Cache-Control': 'no-transform'}), {'HTTP_ACCEPT_ENCODING': 'gzip'}),
+        }
+        for name, (response, headers) in skipped.items():
+            with self.subTest(name):
+                body = response.content
+                response = self.respond(response, **headers)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(response.content, body)
+
+        encoded = self.json_response(b'already encoded', headers={'Content-Encoding': 'identity'})
+        self.assertEqual(self.respond(encoded, HTTP_ACCEPT_ENCODING='gzip')['Content-Encoding'], 'identity')
+
+    @override_settings(COMPRESSION={'MIN_SIZE': 100})
+    def test_min_size_setting(self):
+        response = self.respond(self.json_response(json.dumps(['open'] * 30).encode()), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_kept_uncompressed_when_not_smaller(self):
+        body = os.urandom(2048)
+        response = self.respond(self.json_response(body), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, body)
+
+    def test_streaming_is_compressed_chunk_by_chunk(self):
+        chunks = [self.body[i:i + 1000] for i in range(0, len(self.body), 1000)]
+        response = self.respond(StreamingHttpResponse(iter(chunks), content_type='application/json'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        compressed = list(response.streaming_content)
+        # flushed after every chunk rather than buffered until the end
+        self.assertGreaterEqual(len(compressed), len(chunks))
+        self.assertEqual(gzip.decompress(b''.join(compressed)), self.body)
+
+    def test_etag_is_weakened(self):
+        response = self.respond(self.json_response(headers={'ETag': '"abc"'}), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+
+    def test_choose_encoder(self):
+        gzip_encoder = GzipEncoder(6)
+        self.assertIs(choose_encoder('gzip, deflate, br', [gzip_encoder]), gzip_encoder)
+        self.assertIs(choose_encoder('*', [gzip_encoder]), gzip_encoder)
+        self.assertIsNone(choose_encoder('deflate', [gzip_encoder]))
+        self.assertIsNone(choose_encoder('*;q=0', [gzip_encoder]))
+        self.assertIsNone(choose_encoder('', [gzip_encoder]))
+
+    @unittest.skipUnless(brotli and zstandard, 'brotli and zstandard are optional')
+    def test_preference_order(self):
+        encoders = available_encoders()
+        self.assertEqual([encoder.name for encoder in encoders], ['br', 'zstd', 'gzip'])
+        self.assertEqual(choose_encoder('gzip, br, zstd', encoders).name, 'br')
+        self.assertEqual(choose_encoder('gzip, br;q=0.5, zstd', encoders).name, 'zstd')
+        for encoder in encoders:
+            self.assertLess(len(encoder.compress(self.body)), len(self.body))
+
+    def test_api_response(self):
+        client = APIClient()
+        admin_user = User.objects.create_superuser('admin', 'admin@test.com', 'adminpass')
+        for i in range(30):
+            User.objects.create_user(f'user{i}', f'user{i}@test.com', 'pass')
+        client.force_authenticate(user=admin_user)
+        plain = client.get(reverse('user-list'))
+        compressed = client.get(reverse('user-list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
@@ -0,0 +1,274 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User, AnonymousUser
+from django.urls import reverse
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from rest_framework.test import APIClient
+from unittest.mock import patch
+from asgiref.sync import async_to_sync
+from decimal import Decimal
+from requestAPI.consumers import NotificationConsumer, AdminFeedConsumer
+from requestAPI.routing import websocket_urlpatterns
+from requestAPI.utils import ADMIN_FEED_GROUP, admin_building_group, request_timeline_group
+from requestAPI.models import Building, ServiceType, ServiceRequest, Update
+import json
+
+class NotificationConsumerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('socketuser', 'socket@test.com', 'socketpass123')
+        self.admin_user = User.objects.create_superuser('admin', 'admin@test.com', 'adminpass')
+        building = Building.objects.create(
+            name="Test Building",
+            address_line1="123 Test St",
+            city="Test City",
+            postcode="12345",
+            latitude=Decimal('51.5074'),
+            longitude=Decimal('-0.1278')
+        )
+        service_type = ServiceType.objects.create(name="Test Service", description="Test Description")
+        self.service_request = ServiceRequest.objects.create(
+            created_by=self.user, service_request_item=service_type, building=building
+        )
+        self.updates = [
+            Update.objects.create(
+                title=f"Update {i}",
+                created_by=self.admin_user,
+                associated_to=self.user,
+                service_request=self.service_request
+            ) for i in range(5)
+        ]
+
+    def receive_on_connect(self, query_string=''):
+        async def run():
+            communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), f'/ws/notifications/?{query_string}')
+            communicator.scope['user'] = self.user
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            messages = []
+            while not await communicator.receive_nothing(timeout=0.2):
+                messages.append(json.loads(await communicator.receive_from()))
+            await communicator.disconnect()
+            return messages
+        return async_to_sync(run)()
+
+    def test_no_replay_without_last_seen_id(self):
+        self.assertEqual(self.receive_on_connect(), [])
+
+    def test_replays_only_unseen_unread_notifications(self):
+        self.updates[3].is_read = True
+        self.updates[3].save()
+        messages = self.receive_on_connect(f'last_seen_id={self.updates[1].id}')
+        self.assertEqual([message['notification']['id'] for message in messages], [self.updates[2].id, self.updates[4].id])
+        self.assertEqual(messages[0], {
+            'type': 'notification',
+            'notification': {
+                'id': self.updates[2].id,
+                'title': 'Update 2',
+                'message': None,
+                'service_request_id': self.service_request.id,
+                'type': 'event'
+            },
+            'unread_count': 4
+        })
+
+    @override_settings(NOTIFICATION_REPLAY_LIMIT=2)
+    def test_replay_is_capped(self):
+        messages = self.receive_on_connect('last_seen_id=0')
+        self.assertEqual([message['notification']['id'] for message in messages[:2]], [self.updates[0].id, self.updates[1].id])
+        self.assertEqual(messages[2], {'type': 'resync'})
+
+    def test_replayed_notification_is_not_sent_twice(self):
+        consumer = NotificationConsumer()
+        sent = []
+
+        async def send(text_data=None, **kwargs):
+            sent.append(json.loads(text_data))
+        consumer.send = send
+        consumer.replayed_ids = {self.updates[4].id}
+        async_to_sync(consumer.send_notification)({'notification': {'id': self.updates[4].id}})
+        async_to_sync(consumer.send_notification)({'notification': {'id': 999}})
+        self.assertEqual(sent, [{'type': 'notification', 'notification': {'id': 999}}])
+
+    def test_live_notification_carries_unread_count(self):
+        consumer = NotificationConsumer()
+        sent = []
+
+        async def send(text_data=None, **kwargs):
+            sent.append(json.loads(text_data))
+        consumer.send = send
+        async_to_sync(consumer.send_notification)({'notification': {'id': 999}, 'unread_count': 6})
+        self.assertEqual(sent, [{'type': 'notification', 'notification': {'id': 999}, 'unread_count': 6}])
+
+    def test_unread_count_event(self):
+        consumer = NotificationConsumer()
+        sent = []
+
+        async def send(text_data=None, **kwargs):
+            sent.append(json.loads(text_data))
+        consumer.send = send
+        async_to_sync(consumer.unread_count)({'type': 'unread_count', 'unread_count': 2})
+        self.assertEqual(sent, [{'type': 'unread_count', 'unread_count': 2}])
+
+
+class AdminFeedConsumerTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = User.objects.create_superuser('admin', 'admin@test.com', 'adminpass')
+        self.regular_user = User.objects.create_user('regular', 'regular@test.com', 'regularpass')
+        self.building = Building.objects.create(
+            name="Test Building",
+            address_line1="123 Test St",
+            city="Test City",
+            postcode="12345",
+            latitude=Decimal('51.5074'),
+            longitude=Decimal('-0.1278')
+        )
+        self.service_type = ServiceType.objects.create(name="Test Service", description="Test Description")
+        self.service_request = ServiceRequest.objects.create(
+            created_by=self.regular_user, service_request_item=self.service_type, building=self.building
+        )
+
+    def connect(self, user, query_string=''):
+        async def run():
+            communicator = WebsocketCommunicator(AdminFeedConsumer.as_asgi(), f'/ws/admin/?{query_string}')
+            communicator.scope['user'] = user
+            connected, _ = await communicator.connect()
+            if connected:
+                await communicator.disconnect()
+            return connected
+        return async_to_sync(run)()
+
+    def test_only_admins_can_connect(self):
+        self.assertTrue(self.connect(self.admin_user))
+        self.assertFalse(self.connect(self.regular_user))
+        self.assertFalse(self.connect(AnonymousUser()))
+
+    def test_feed_groups(self):
+        layer = get_channel_layer()
+
+        async def run():
+            everything = WebsocketCommunicator(AdminFeedConsumer.as_asgi(), '/ws/admin/')
+            one_building = WebsocketCommunicator(AdminFeedConsumer.as_asgi(), f'/ws/admin/?buildings={self.building.id}')
+            other_building = WebsocketCommunicator(AdminFeedConsumer.as_asgi(), '/ws/admin/?buildings=999')
+            communicators = [everything, one_building, other_building]
+            for communicator in communicators:
+                communicator.scope['user'] = self.admin_user
+                await communicator.connect()
+
+            event = {'type': 'admin_event', 'event': {'type': 'status_changed', 'request_id': 1}}
+            await layer.group_send(ADMIN_FEED_GROUP, event)
+            await layer.group_send(admin_building_group(self.building.id), event)
+            received = [await everything.receive_json_from(), await one_building.receive_json_from()]
+            nothing = await other_building.receive_nothing()
+            for communicator in communicators:
+                await communicator.disconnect()
+            return received, nothing
+
+        received, nothing = async_to_sync(run)()
+        self.assertEqual(received, [{'type': 'admin_event', 'event': {'type': 'status_changed', 'request_id': 1}}] * 2)
+        self.assertTrue(nothing)
+
+    def queued_events(self, dispatcher):
+        return [(group, event['event']) for group, event in (call[0] for call in dispatcher.enqueue.call_args_list)
+                if event['type'] == 'admin_event']
+
+    @patch('requestAPI.utils.notification_dispatcher')
+    def test_status_change_and_comment_deltas(self, dispatcher):
+        self.client.force_authenticate(user=self.admin_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                reverse('service-request-update-status', kwargs={'pk': self.service_request.id}),
+                {"status": "in_progress", "comment": "On it"}
+            )
+        events = self.queued_events(dispatcher)
+        self.assertEqual([group for group, _ in events], [ADMIN_FEED_GROUP, admin_building_group(self.building.id)] * 2)
+        status_changed, comment_added = events[0][1], events[2][1]
+        self.assertEqual(status_changed['type'], 'status_changed')
+        self.assertEqual((status_changed['status'], status_changed['previous_status']), ('in_progress', 'open'))
+        self.assertEqual(comment_added['type'], 'comment_added')
+        self.assertEqual(comment_added['request_id'], self.service_request.id)
+
+    @patch('requestAPI.utils.notification_dispatcher')
+    def test_request_created_delta(self, dispatcher):
+        self.client.force_authenticate(user=self.regular_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('service-request-list'), {
+                'service_request_item': self.service_type.id,
+                'building': self.building.id,
+                'customer_notes': 'Leaking tap'
+            })
+        self.assertEqual(response.status_code, 201)
+        event = self.queued_events(dispatcher)[0][1]
+        self.assertEqual(event['type'], 'request_created')
+        self.assertEqual((event['request_id'], event['created_by_id']), (response.data['id'], self.regular_user.id))
+
+
+class RequestTimelineConsumerTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = User.objects.create_superuser('admin', 'admin@test.com', 'adminpass')
+        self.regular_user = User.objects.create_user('regular', 'regular@test.com', 'regularpass')
+        self.other_user = User.objects.create_user('other', 'other@test.com', 'otherpass')
+        building = Building.objects.create(
+            name="Test Building",
+            address_line1="123 Test St",
+            city="Test City",
+            postcode="12345",
+            latitude=Decimal('51.5074'),
+            longitude=Decimal('-0.1278')
+        )
+        service_type = ServiceType.objects.create(name="Test Service", description="Test Description")
+        self.service_request = ServiceRequest.objects.create(
+            created_by=self.regular_user, service_request_item=service_type, building=building
+        )
+
+    def communicator(self, user, service_request_id=None):
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns), f'/ws/requests/{service_request_id or self.service_request.id}/'
+        )
+        communicator.scope['user'] = user
+        return communicator
+
+    def connect(self, user, service_request_id=None):
+        async def run():
+            communicator = self.communicator(user, service_request_id)
+            connected, _ = await communicator.connect()
+            if connected:
+                await communicator.disconnect()
+            return connected
+        return async_to_sync(run)()
+
+    def test_only_owner_and_superusers_can_subscribe(self):
+        self.assertTrue(self.connect(self.regular_user))
+        self.assertTrue(self.connect(self.admin_user))
+        self.assertFalse(self.connect(self.other_user))
+        self.assertFalse(self.connect(AnonymousUser()))
+        self.assertFalse(self.connect(self.regular_user, 999))
+
+    @patch('requestAPI.utils.notification_dispatcher')
+    def test_new_updates_are_pushed_after_commit(self, dispatcher):
+        self.client.force_authenticate(user=self.regular_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('update-service-request-updates'), {
+                'service_request_id': self.service_request.id, 'message': 'Any news?'
+            })
+        timeline = [call[0] for call in dispatcher.enqueue.call_args_list if call[0][1]['type'] == 'timeline_update']
+        self.assertEqual(len(timeline), 1)
+        group, event = timeline[0]
+        self.assertEqual(group, request_timeline_group(self.service_request.id))
+        # same shape as the timeline endpoint returns
+        self.assertEqual(event['update'], response.data)
+
+    def test_subscriber_receives_timeline_updates(self):
+        layer = get_channel_layer()
+
+        async def run():
+            communicator = self.communicator(self.regular_user)
+            await communicator.connect()
+            await layer.group_send(request_timeline_group(self.service_request.id), {'type': 'timeline_update', 'update': {'id': 1}})
+            message = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return message
+
+        self.assertEqual(async_to_sync(run)(), {'type': 'timeline_update', 'update': {'id': 1}})
@@ -0,0 +1,199 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+from decimal import Decimal
+from unittest.mock import patch
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from rest_framework_simplejwt.tokens import RefreshToken
+from requestAPI.dispatcher import NotificationDispatcher, BatchedEventsMixin, DispatcherLoopMiddleware
+from requestAPI.middleware import JWTAuthMiddlewareStack
+from requestAPI.routing import websocket_urlpatterns
+from requestAPI.models import Building, ServiceType, ServiceRequest
+from requestAPI.utils import send_notification_to_user
+from asgiref.sync import async_to_sync
+import asyncio
+import json
+import threading
+import time
+
+class RecordingChannelLayer:
+    def __init__(self, block=None, error=None):
+        self.sent = []
+        self.block = block
+        self.error = error
+
+    async def group_send(self, group, message):
+        if self.block:
+            await asyncio.get_running_loop().run_in_executor(None, self.block.wait)
+        if self.error:
+            raise self.error
+        self.sent.append((group, message))
+
+
+class NotificationDispatcherTests(TestCase):
+    def event(self, notification_id):
+        return {"type": "send_notification", "notification": {"id": notification_id}}
+
+    def test_events_are_delivered(self):
+        layer = RecordingChannelLayer()
+        dispatcher = NotificationDispatcher(channel_layer=layer)
+        dispatcher.enqueue('user_1', self.event(1))
+        self.assertTrue(dispatcher.flush())
+        self.assertEqual(layer.sent, [('user_1', self.event(1))])
+        self.assertEqual(dispatcher.stats()['sent'], 1)
+
+    def test_events_for_same_group_are_coalesced(self):
+        release = threading.Event()
+        layer = RecordingChannelLayer(block=release)
+        dispatcher = NotificationDispatcher(channel_layer=layer)
+
+        # first event keeps the loop busy so the rest pile up behind it
+        dispatcher.enqueue('user_1', self.event(0))
+        for i in range(1, 4):
+            dispatcher.enqueue('user_2', self.event(i))
+        release.set()
+        dispatcher.flush()
+
+        self.assertEqual(len(layer.sent), 2)
+        group, message = layer.sent[1]
+        self.assertEqual(group, 'user_2')
+        self.assertEqual(message['type'], 'event.batch')
+        self.assertEqual([e['notification']['id'] for e in message['events']], [1, 2, 3])
+        self.assertEqual(dispatcher.stats()['messages'], 2)
+
+    def test_enqueue_many_sends_each_group_together(self):
+        layer = RecordingChannelLayer()
+        dispatcher = NotificationDispatcher(max_queue=3, channel_layer=layer)
+        queued = dispatcher.enqueue_many([('request_1', self.event(1)), ('request_2', self.event(2)), ('request_1', self.event(3)), ('request_2', self.event(4))])
+        dispatcher.flush()
+        self.assertEqual(queued, 3)
+        self.assertEqual(dispatcher.stats()['dropped'], 1)
+        self.assertEqual(layer.sent, [
+            ('request_1', {'type': 'event.batch', 'events': [self.event(1), self.event(3)]}),
+            ('request_2', self.event(2)),
+        ])
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        release = threading.Event()
+        dispatcher = NotificationDispatcher(max_queue=2, channel_layer=RecordingChannelLayer(block=release))
+        dispatcher.enqueue('user_1', self.event(0))
+        dispatcher.flush(timeout=0.2)
+
+        results = [dispatcher.enqueue('user_1', self.event(i)) for i in range(1, 5)]
+        stats = dispatcher.stats()
+        release.set()
+        dispatcher.flush()
+
+        self.assertEqual(results, [True, True, False, False])
+        self.assertEqual(stats['dropped'], 2)
+        self.assertEqual(stats['queue_depth'], 2)
+
+    def test_send_errors_are_counted(self):
+        dispatcher = NotificationDispatcher(channel_layer=RecordingChannelLayer(error=RuntimeError('layer down')))
+        dispatcher.enqueue('user_1', self.event(1))
+        dispatcher.flush()
+        self.assertEqual(dispatcher.stats()['failed'], 1)
+
+    def test_batch_mixin_dispatches_each_event(self):
+        class Consumer(BatchedEventsMixin):
+            def __init__(self):
+                self.received = []
+
+            async def dispatch(self, message):
+                self.received.append(message)
+
+        consumer = Consumer()
+        async_to_sync(consumer.event_batch)({'type': 'event.batch', 'events': [self.event(1), self.event(2)]})
+        self.assertEqual(consumer.received, [self.event(1), self.event(2)])
+
+
+class InMemoryLayerDeliveryTests(TestCase):
+    # nothing mocked - the real in-memory layer, auth middleware and consumer, as the ASGI server runs them
+    def setUp(self):
+        self.user = User.objects.create_user('socketuser', 'socket@test.com', 'socketpass123')
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.layer = get_channel_layer()
+        self.assertIsInstance(self.layer, InMemoryChannelLayer)
+        self.dispatcher = NotificationDispatcher()
+        self.application = DispatcherLoopMiddleware(JWTAuthMiddlewareStack(URLRouter(websocket_urlpatterns)), dispatcher=self.dispatcher)
+
+    def event(self, notification_id):
+        return {"type": "send_notification", "notification": {"id": notification_id}}
+
+    def test_event_enqueued_from_a_worker_thread_reaches_the_socket(self):
+        async def run():
+            communicator = WebsocketCommunicator(self.application, f'/ws/notifications/?token={self.token}')
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            started = time.monotonic()
+            # enqueued the way a view's on_commit callback does it, off the server loop
+            queued = await asyncio.get_running_loop().run_in_executor(
+                None, self.dispatcher.enqueue, f'user_{self.user.id}', self.event(1)
+            )
+            message = json.loads(await communicator.receive_from(timeout=1))
+            elapsed = time.monotonic() - started
+            await communicator.disconnect()
+            return queued, message, elapsed
+
+        queued, message, elapsed = async_to_sync(run)()
+        self.assertTrue(queued)
+        self.assertEqual(message, {'type': 'notification', 'notification': {'id': 1}})
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(self.dispatcher.stats()['sent'], 1)
+
+    def test_in_memory_layer_without_a_server_loop_drops(self):
+        self.assertFalse(self.dispatcher.enqueue(f'user_{self.user.id}', self.event(1)))
+        self.assertEqual(self.dispatcher.stats()['dropped'], 1)
+        self.assertIsNone(self.dispatcher._thread)
+
+
+class NotificationOnCommitTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = User.objects.create_superuser('admin', 'admin@test.com', 'adminpass')
+        self.regular_user = User.objects.create_user('regular', 'regular@test.com', 'regularpass')
+        self.building = Building.objects.create(
+            name="Test Building",
+            address_line1="123 Test St",
+            city="Test City",
+            postcode="12345",
+            latitude=Decimal('51.5074'),
+            longitude=Decimal('-0.1278')
+        )
+        self.service_type = ServiceType.objects.create(name="Test Service", description="Test Description")
+        self.service_request = ServiceRequest.objects.create(
+            created_by=self.regular_user,
+            service_request_item=self.service_type,
+            building=self.building
+        )
+
+    @patch('requestAPI.utils.notification_dispatcher')
+    def test_notification_queued_only_after_commit(self, dispatcher):
+        self.client.force_authenticate(user=self.admin_user)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.client.patch(reverse('service-request-update-status', kwargs={'pk': self.service_request.id}), {"status": "completed"})
+            dispatcher.enqueue.assert_not_called()
+
+        # the dashboard cache bump, the request timeline push, the customer's notification and the admin feed delta
+        self.assertEqual(len(callbacks), 4)
+        notifications = [call[0] for call in dispatcher.enqueue.call_args_list if call[0][0].startswith('user_')]
+        self.assertEqual(len(notifications), 1)
+        group, event = notifications[0]
+        self.assertEqual(group, f"user_{self.regular_user.id}")
+        self.assertEqual(event['notification']['service_request_id'], self.service_request.id)
+
+    @patch('requestAPI.utils.notification_dispatcher')
+    def test_rolled_back_notification_is_never_queued(self, dispatcher):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    send_notification_to_user(self.regular_user.id, {"id": 1})
+                    raise RuntimeError()
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        dispatcher.enqueue.assert_not_called()
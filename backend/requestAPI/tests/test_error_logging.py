@@ -0,0 +1,66 @@
+from django.test import TestCase, RequestFactory, override_settings
+from unittest import mock
+from requestAPI.models import ErrorLog
+from requestAPI.error_logging import ErrorLogWriter, fingerprint, should_log
+
+def raise_error(exc):
+    try:
+        raise exc
+    except Exception as e:
+        return e
+
+@override_settings(ERROR_LOGGING={'ASYNC': False, 'SAMPLE_RATE': 0})
+class ErrorLoggingTests(TestCase):
+    def setUp(self):
+        self.writer = ErrorLogWriter()
+        self.request = RequestFactory().get('/api/buildings/1/')
+
+    def test_client_errors_are_not_logged_by_default(self):
+        self.writer.record(self.request, raise_error(ValueError('bad')), 404)
+        self.assertEqual(ErrorLog.objects.count(), 0)
+
+    def test_server_errors_are_logged(self):
+        self.writer.record(self.request, raise_error(ValueError('bad')), 500)
+        log = ErrorLog.objects.get()
+        self.assertEqual(log.status_code, 500)
+        self.assertEqual(log.exception_type, 'builtins.ValueError')
+        self.assertIn('Traceback', log.error_message)
+
+    def test_same_error_aggregates_into_one_row(self):
+        for _ in range(3):
+            self.writer.record(self.request, raise_error(ValueError('bad')), 500)
+        self.writer.record(self.request, raise_error(KeyError('other')), 500)
+        self.assertEqual(ErrorLog.objects.count(), 2)
+        self.assertEqual(ErrorLog.objects.get(exception_type='builtins.ValueError').occurrences, 3)
+
+    def test_fingerprint_ignores_message(self):
+        # same endpoint, type and frame with different messages is the same error
+        first, _ = fingerprint('building-detail', raise_error(ValueError('a')))
+        second, _ = fingerprint('building-detail', raise_error(ValueError('b')))
+        other, _ = fingerprint('building-list', raise_error(ValueError('a')))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+
+    def test_include_and_exclude_status_codes(self):
+        config = {'MIN_STATUS_CODE': 500, 'INCLUDE_STATUS_CODES': [403], 'EXCLUDE_STATUS_CODES': [503]}
+        self.assertTrue(should_log(403, config))
+        self.assertFalse(should_log(404, config))
+        self.assertFalse(should_log(503, config))
+        self.assertTrue(should_log(500, config))
+
+    def test_traceback_is_sampled_on_repeats(self):
+        self.writer.record(self.request, raise_error(ValueError('first')), 500)
+        with override_settings(ERROR_LOGGING={'ASYNC': False, 'SAMPLE_RATE': 1}):
+            self.writer.record(self.request, raise_error(ValueError('second')), 500)
+        self.assertTrue(ErrorLog.objects.get().error_message.startswith('second'))
+        self.writer.record(self.request, raise_error(ValueError('third')), 500)
+        self.assertTrue(ErrorLog.objects.get().error_message.startswith('second'))
+
+    @override_settings(ERROR_LOGGING={'ASYNC': True, 'FLUSH_INTERVAL': 60})
+    def test_async_errors_are_buffered_until_flush(self):
+        with mock.patch.object(ErrorLogWriter, '_ensure_started'):
+            for _ in range(2):
+                self.writer.record(self.request, raise_error(ValueError('bad')), 500)
+        self.assertEqual(ErrorLog.objects.count(), 0)
+        self.writer.flush()
+        self.assertEqual(ErrorLog.objects.get().occurrences, 2)
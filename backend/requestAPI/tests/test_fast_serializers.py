@@ -0,0 +1,85 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from requestAPI.models import Building, ServiceType, ServiceRequest
+from requestAPI.fast_serializers import serialize_service_requests, serialize_users
+from requestAPI.serializers import ServiceRequestSerializer, UserSerializer
+
+
+class FastSerializerTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = User.objects.create_superuser('admin', 'admin@test.com', 'adminpass')
+        self.customers = [
+            User.objects.create_user('customer', 'customer@test.com', 'pass', first_name='Zoë', last_name='O Brien'),
+            User.objects.create_user('other', 'other@test.com', 'pass'),
+        ]
+        buildings = [
+            Building.objects.create(name="Test Building", address_line1="123 Test St", city="Test City", postcode="12345",
+                                    latitude='51.5', longitude='-0.127812'),
+            Building.objects.create(name=None, address_line1="456 B St", address_line2="Flat 2", city="B City", postcode="22222",
+                                    latitude='-1', longitude='179.999999'),
+        ]
+        buildings[0].users.add(self.customers[1], self.admin_user, self.customers[0])
+        self.customers[0].buildings.add(buildings[1])
+        service_types = [
+            ServiceType.objects.create(name="Plumbing", description="Leaks", service_icon='service_icons/tap icon.png'),
+            ServiceType.objects.create(name="Cleaning", description="", is_active=False),
+        ]
+        for i in range(6):
+            ServiceRequest.objects.create(
+                created_by=self.customers[i % 2],
+                service_request_item=service_types[i % 2],
+                building=buildings[i % 2],
+                priority=['low', 'medium', 'high'][i % 3],
+                customer_notes=None if i % 2 else f"Note {i} \"quoted\" é"
+            )
+
+    def assertSameJSON(self, url, params=None):
+        with override_settings(FAST_LIST_SERIALIZATION=False):
+            expected = self.client.get(url, params)
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, expected.content)
+        return response
+
+    def test_service_request_list_is_identical(self):
+        self.client.force_authenticate(user=self.admin_user)
+        self.assertSameJSON(reverse('service-request-list'))
+        self.assertSameJSON(reverse('service-request-list'), {'ordering': '-priority', 'status': 'open'})
+        self.client.force_authenticate(user=self.customers[0])
+        self.assertSameJSON(reverse('service-request-list'))
+
+    def test_user_list_is_identical(self):
+        self.client.force_authenticate(user=self.admin_user)
+        self.assertSameJSON(reverse('user-list'))
+        self.assertSameJSON(reverse('user-list'), {'query': 'o'})
+
+    def test_matches_serializers_directly(self):
+        queryset = ServiceRequest.objects.with_details().order_by('id')
+        self.assertEqual(
+            JSONRenderer().render(serialize_service_requests(queryset)),
+            JSONRenderer().render(ServiceRequestSerializer(queryset, many=True).data)
+        )
+        self.assertEqual(
+            JSONRenderer().render(serialize_users(User.objects.order_by('id'))),
+            JSONRenderer().render(UserSerializer(User.objects.order_by('id'), many=True).data)
+        )
+
+    def test_query_count_is_constant(self):
+        self.client.force_authenticate(user=self.admin_user)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('service-request-list'))
+        # requests, service types, buildings, building users
+        self.assertEqual(len(context.captured_queries), 4)
+
+    def test_paginated_and_sparse_lists_use_the_serializer(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.assertSameJSON(reverse('service-request-list'), {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(reverse('service-request-list'), {'fields': 'id'})
+        self.assertEqual(list(response.data[0]), ['id'])
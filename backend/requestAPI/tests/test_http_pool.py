@@ -0,0 +1,75 @@
+from django.test import SimpleTestCase
+from asgiref.testing import ApplicationCommunicator
+from asgiref.sync import async_to_sync
+from requestAPI.http_pool import ThreadPoolHTTPApplication
+import asyncio
+import threading
+
+async def get(application, path='/'):
+    # like channels' HttpCommunicator, which insists on a body key the ASGI spec makes optional
+    communicator = ApplicationCommunicator(application, {
+        'type': 'http', 'http_version': '1.1', 'method': 'GET', 'path': path, 'query_string': b'',
+        'headers': [(b'host', b'testserver')], 'server': ('testserver', 80),
+    })
+    await communicator.send_input({'type': 'http.request', 'body': b''})
+    start = await communicator.receive_output(5)
+    body = b''
+    while True:
+        message = await communicator.receive_output(5)
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    await communicator.wait(5)
+    return {'status': start['status'], 'body': body}
+
+class ThreadPoolHTTPApplicationTests(SimpleTestCase):
+    def test_serves_django_views(self):
+        application = ThreadPoolHTTPApplication(2)
+        response = async_to_sync(get)(application, '/service-requests/')
+        self.assertEqual(response['status'], 401)
+        self.assertIn(b'Authentication credentials were not provided', response['body'])
+
+    def test_requests_run_in_parallel(self):
+        # both requests have to be inside the app at once to get past the barrier
+        barrier = threading.Barrier(2, timeout=5)
+        threads = set()
+
+        def wsgi_application(environ, start_response):
+            threads.add(threading.current_thread().name)
+            barrier.wait()
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [b'ok']
+
+        application = ThreadPoolHTTPApplication(2, wsgi_application=wsgi_application)
+
+        async def both():
+            return await asyncio.gather(*(get(application) for _ in range(2)))
+
+        responses = async_to_sync(both)()
+        self.assertEqual([response['status'] for response in responses], [200, 200])
+        self.assertEqual(len(threads), 2)
+        self.assertTrue(all(name.startswith('http') for name in threads))
+
+    def test_response_is_closed(self):
+        # closing the response is what fires request_finished and releases the thread's db connection
+        closed = []
+
+        class Body(list):
+            def close(self):
+                closed.append(True)
+
+        def wsgi_application(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return Body([b'ok'])
+
+        application = ThreadPoolHTTPApplication(1, wsgi_application=wsgi_application)
+        async_to_sync(get)(application)
+        self.assertEqual(closed, [True])
+
+    def test_body_is_cut_at_content_length(self):
+        def wsgi_application(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain'), ('Content-Length', '6')])
+            return [b'four', b'more', b'never sent']
+
+        response = async_to_sync(get)(ThreadPoolHTTPApplication(1, wsgi_application=wsgi_application))
+        self.assertEqual(response, {'status': 200, 'body': b'fourmo'})
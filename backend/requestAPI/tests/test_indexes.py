@@ -0,0 +1,144 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+from requestAPI.models import Building, ServiceType, ServiceRequest, Update
+
+class QueryPlanTests(TestCase):
+    # runs EXPLAIN on each hot query shape against a seeded database and fails if the planner
+    # falls back to reading the whole table instead of using one of the composite indexes
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f'user{i}', f'user{i}@test.com', 'pass') for i in range(10)]
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@test.com', 'adminpass')
+        building = Building.objects.create(
+            name="Test Building",
+            address_line1="123 Test St",
+            city="Test City",
+            postcode="12345",
+            latitude=Decimal('51.5074'),
+            longitude=Decimal('-0.1278')
+        )
+        service_type = ServiceType.objects.create(name="Test Service", description="Test Description")
+        statuses = ['open', 'in_progress', 'completed', 'cancelled']
+        ServiceRequest.objects.bulk_create([
+            ServiceRequest(
+                created_by=cls.users[i % 10],
+                service_request_item=service_type,
+                building=building,
+                status=statuses[i % 4],
+                service_level_agreement_date=timezone.now() + timedelta(hours=i)
+            ) for i in range(400)
+        ])
+        service_request = ServiceRequest.objects.first()
+        Update.objects.bulk_create([
+            Update(
+                title="Update",
+                created_by=cls.admin_user,
+                associated_to=cls.users[i % 10],
+                service_request=service_request,
+                is_read=i % 3 == 0
+            ) for i in range(400)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def explain(self, query):
+        # a queryset, or the SQL a view actually ran (as captured, with its parameters inlined)
+        if not isinstance(query, str):
+            return query.explain()
+        prefix = 'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {query}')
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+
+    def view_query(self, user, url, table, limited=False):
+        # the SQL a view runs against table (the one query that does, with a LIMIT if limited)
+        client = APIClient()
+        client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(client.get(url).status_code, 200)
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if f'FROM "{table}"' in query['sql'] and (not limited or 'LIMIT' in query['sql'])
+        ]
+        self.assertEqual(len(queries), 1, queries)
+        return queries[0]
+
+    def page_query(self, user, url, table):
+        # the SQL behind the page after the first one, i.e. the seek on the first page's last row
+        client = APIClient()
+        client.force_authenticate(user=user)
+        next_url = client.get(url).data['next']
+        self.assertIsNotNone(next_url)
+        return self.view_query(user, next_url, table, limited=True)
+
+    def assertUsesIndex(self, query, table, indexes):
+        if connection.vendor == 'postgresql':
+            # tiny test tables are always cheaper to seq scan, so only fail when no index could be used at all
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+            try:
+                plan = self.explain(query)
+            finally:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET enable_seqscan = on')
+            self.assertNotIn('Seq Scan', plan, plan)
+            # the seek walks the index in ORDER BY order rather than sorting what it found
+            self.assertNotIn('Sort Key', plan, plan)
+        elif connection.vendor == 'sqlite':
+            plan = self.explain(query)
+            # SEARCH means an index lookup, a bare SCAN of the table is a full read
+            self.assertIn(f'SEARCH {table} USING', plan, plan)
+            self.assertNotRegex(plan, rf'SCAN {table}(?! USING)', plan)
+            # and that it is one of the composite indexes built for this shape rather than a lone FK index
+            self.assertTrue(any(f'INDEX {index} ' in plan for index in indexes), plan)
+            self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan, plan)
+        else:
+            self.skipTest(f'No plan check for {connection.vendor}')
+
+    def test_action_required(self):
+        sql = self.view_query(self.admin_user, reverse('dashboard-action-required'), ServiceRequest._meta.db_table)
+        self.assertUsesIndex(sql, ServiceRequest._meta.db_table, ['sr_active_sla_idx'])
+
+    def test_customer_listing(self):
+        queryset = ServiceRequest.objects.filter(created_by=self.users[0]).order_by('-created_date', '-id')
+        self.assertUsesIndex(queryset, ServiceRequest._meta.db_table, ['sr_customer_keyset_idx'])
+
+    def test_admin_sla_keyset_page(self):
+        queryset = ServiceRequest.objects.filter(
+            service_level_agreement_date__gt=timezone.now() + timedelta(hours=200)
+        ).order_by('service_level_agreement_date', 'id')
+        self.assertUsesIndex(queryset, ServiceRequest._meta.db_table, ['sr_sla_keyset_idx'])
+
+    def test_admin_sla_second_page(self):
+        sql = self.page_query(self.admin_user, reverse('service-request-list') + '?page_size=20', ServiceRequest._meta.db_table)
+        self.assertUsesIndex(sql, ServiceRequest._meta.db_table, ['sr_sla_keyset_idx'])
+
+    def test_customer_second_page(self):
+        sql = self.page_query(self.users[0], reverse('service-request-list') + '?page_size=10', ServiceRequest._meta.db_table)
+        self.assertUsesIndex(sql, ServiceRequest._meta.db_table, ['sr_customer_keyset_idx'])
+
+    def test_timeline_second_page(self):
+        url = reverse('update-service-request-updates') + f'?service_request_id={ServiceRequest.objects.first().id}&page_size=20'
+        sql = self.page_query(self.admin_user, url, Update._meta.db_table)
+        self.assertUsesIndex(sql, Update._meta.db_table, ['update_timeline_idx'])
+
+    def test_notifications(self):
+        sql = self.view_query(self.users[0], reverse('update-notifications'), Update._meta.db_table)
+        self.assertUsesIndex(sql, Update._meta.db_table, ['update_unread_idx'])
+
+    def test_notifications_second_page(self):
+        sql = self.page_query(self.users[0], reverse('update-notifications') + '?page_size=5', Update._meta.db_table)
+        self.assertUsesIndex(sql, Update._meta.db_table, ['update_unread_idx'])
+
+    def test_notification_replay(self):
+        queryset = Update.objects.filter(
+            associated_to=self.users[0], id__gt=100, is_read=False
+        ).exclude(created_by=self.users[0]).order_by('id')
+        self.assertUsesIndex(queryset, Update._meta.db_table, ['update_replay_idx', 'update_unread_idx'])
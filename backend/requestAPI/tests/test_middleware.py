@@ -0,0 +1,116 @@
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.contrib.auth.models import User
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from asgiref.sync import async_to_sync
+from rest_framework_simplejwt.tokens import RefreshToken
+from unittest import mock
+from requestAPI.authentication import get_auth_version as real_get_auth_version
+from requestAPI.authentication import ClaimsRefreshToken, user_cache
+from requestAPI.middleware import JWTAuthMiddlewareStack
+from requestAPI.routing import websocket_urlpatterns
+import asyncio
+import tempfile
+
+users = []
+
+async def record_user(scope, receive, send):
+    users.append(scope['user'])
+    return await URLRouter(websocket_urlpatterns)(scope, receive, send)
+
+application = JWTAuthMiddlewareStack(record_user)
+
+# one test process, locmem is as good as shared
+@override_settings(CACHE_SHARED=True)
+class JWTAuthMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        users.clear()
+        self.user = User.objects.create_user('socketuser', 'socket@test.com', 'socketpass123')
+
+    def token(self, user=None):
+        return str(ClaimsRefreshToken.for_user(user or self.user).access_token)
+
+    def connect(self, token):
+        async def run():
+            communicator = WebsocketCommunicator(application, f'/ws/notifications/?token={token}')
+            connected, _ = await communicator.connect()
+            await communicator.disconnect()
+            return connected, users[-1]
+        return async_to_sync(run)()
+
+    def test_handshake_uses_claims_without_a_query(self):
+        token = self.token()
+        with self.assertNumQueries(0):
+            connected, user = self.connect(token)
+        self.assertTrue(connected)
+        self.assertEqual(user.id, self.user.id)
+        self.assertTrue(user.from_claims)
+
+    def test_rejects_invalid_and_missing_tokens(self):
+        self.assertFalse(self.connect('not-a-token')[0])
+        self.assertFalse(self.connect('')[0])
+
+    def test_staff_users_are_rejected(self):
+        staff = User.objects.create_user('staff', 'staff@test.com', 'staffpass123', is_staff=True)
+        self.assertFalse(self.connect(self.token(staff))[0])
+
+    def test_revoked_claims_fall_back_to_the_database(self):
+        token = self.token()
+        self.user.first_name = 'Changed'
+        self.user.save()
+        with self.assertNumQueries(1):
+            connected, user = self.connect(token)
+        self.assertTrue(connected)
+        self.assertEqual(user.first_name, 'Changed')
+
+    def test_deleted_user_is_rejected(self):
+        token = self.token()
+        self.user.delete()
+        self.assertFalse(self.connect(token)[0])
+
+    @override_settings(CACHE_SHARED=None)
+    def test_per_process_cache_loads_the_user(self):
+        token = self.token()
+        # deactivated by another worker, whose revocation never reaches this process's locmem
+        with mock.patch('requestAPI.cache.cache', LocMemCache('other-worker', {})):
+            self.user.is_active = False
+            self.user.save()
+        self.assertFalse(self.connect(token)[0])
+
+    def test_shared_cache_is_read_off_the_event_loop(self):
+        loops = []
+
+        def get_auth_version(user_id):
+            try:
+                loops.append(asyncio.get_running_loop())
+            except RuntimeError:
+                loops.append(None)
+            return real_get_auth_version(user_id)
+
+        with tempfile.TemporaryDirectory() as location:
+            shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+            with override_settings(CACHES=shared, CACHE_SHARED=None), \
+                    mock.patch('requestAPI.authentication.get_auth_version', get_auth_version):
+                token = self.token()
+                connected, user = self.connect(token)
+        self.assertTrue(connected)
+        self.assertTrue(user.from_claims)
+        # stamping the token, then the handshake's version check - never from a running loop
+        self.assertEqual(loops, [None, None])
+
+    def test_database_cache_handshake(self):
+        token = self.token()
+        database_cache = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'socket_cache'}}
+        with override_settings(CACHES=database_cache, CACHE_SHARED=None):
+            connected, user = self.connect(token)
+        self.assertTrue(connected)
+        self.assertFalse(hasattr(user, 'from_claims'))
+
+    def test_tokens_without_claims_still_connect(self):
+        connected, user = self.connect(str(RefreshToken.for_user(self.user).access_token))
+        self.assertTrue(connected)
+        self.assertEqual(user, self.user)
@@ -0,0 +1,118 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from decimal import Decimal
+from requestAPI.models import Building, ServiceType, ServiceRequest, NotificationOutbox
+from requestAPI.utils import publish_notification
+from requestAPI import outbox
+from .base import LocalSQSClient
+import json
+
+QUEUE_URL = 'https://sqs.local/queue'
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = User.objects.create_superuser('admin', 'admin@test.com', 'adminpass')
+        self.regular_user = User.objects.create_user('regular', 'regular@test.com', 'regularpass')
+        self.building = Building.objects.create(
+            name="Test Building",
+            address_line1="123 Test St",
+            city="Test City",
+            postcode="12345",
+            latitude=Decimal('51.5074'),
+            longitude=Decimal('-0.1278')
+        )
+        self.service_type = ServiceType.objects.create(name="Test Service", description="Test Description")
+        self.service_request = ServiceRequest.objects.create(
+            created_by=self.regular_user,
+            service_request_item=self.service_type,
+            building=self.building
+        )
+
+    def test_update_status_writes_outbox_rows(self):
+        self.client.force_authenticate(user=self.admin_user)
+        data = {"status": "in_progress", "comment": "On our way"}
+        self.client.patch(reverse('service-request-update-status', kwargs={'pk': self.service_request.id}), data)
+
+        types = [row.payload['type'] for row in NotificationOutbox.objects.order_by('id')]
+        self.assertEqual(types, ['STATUS_CHANGED', 'COMMENT_ADDED'])
+        self.assertFalse(NotificationOutbox.objects.filter(delivered_date__isnull=False).exists())
+
+    def test_rolled_back_transaction_leaves_no_row(self):
+        try:
+            with transaction.atomic():
+                publish_notification({"requestId": self.service_request.id})
+                raise RuntimeError()
+        except RuntimeError:
+            pass
+        self.assertEqual(NotificationOutbox.objects.count(), 0)
+
+    def test_dispatch_sends_batches_of_ten(self):
+        for i in range(25):
+            publish_notification({"requestId": i})
+        sqs = LocalSQSClient()
+
+        delivered, failed = outbox.dispatch_pending(sqs, QUEUE_URL)
+
+        self.assertEqual((delivered, failed), (25, 0))
+        self.assertEqual([len(batch) for batch in sqs.batches], [10, 10, 5])
+        self.assertEqual(json.loads(sqs.messages[0]), {"requestId": 0})
+        self.assertFalse(outbox.pending_rows().exists())
+
+    def test_failed_entries_are_retried_with_backoff(self):
+        rows = [NotificationOutbox.objects.create(payload={"requestId": i}) for i in range(3)]
+        sqs = LocalSQSClient(fail_ids=[rows[1].id])
+
+        delivered, failed = outbox.dispatch_pending(sqs, QUEUE_URL)
+        self.assertEqual((delivered, failed), (2, 1))
+
+        rows[1].refresh_from_db()
+        self.assertIsNone(rows[1].delivered_date)
+        self.assertEqual(rows[1].attempts, 1)
+        self.assertGreater(rows[1].next_attempt_date, timezone.now())
+        # still backing off, so nothing is due
+        self.assertEqual(outbox.dispatch_pending(sqs, QUEUE_URL), (0, 0))
+
+        NotificationOutbox.objects.filter(id=rows[1].id).update(next_attempt_date=timezone.now())
+        self.assertEqual(outbox.dispatch_pending(LocalSQSClient(), QUEUE_URL), (1, 0))
+
+    def test_client_error_backs_off_whole_batch(self):
+        publish_notification({"requestId": 1})
+        publish_notification({"requestId": 2})
+
+        delivered, failed = outbox.dispatch_pending(LocalSQSClient(raise_error=ConnectionError('down')), QUEUE_URL)
+
+        self.assertEqual((delivered, failed), (0, 2))
+        self.assertTrue(all(row.last_error == 'down' for row in NotificationOutbox.objects.all()))
+
+    def test_rows_past_max_attempts_are_not_retried(self):
+        NotificationOutbox.objects.create(payload={"requestId": 1}, attempts=outbox.MAX_ATTEMPTS)
+        self.assertEqual(outbox.dispatch_pending(LocalSQSClient(), QUEUE_URL), (0, 0))
+
+    def test_rows_are_leased_and_sent_outside_the_claim_transaction(self):
+        publish_notification({"requestId": 1})
+        depth = len(connection.savepoint_ids)
+        seen = {}
+
+        class CheckingSQSClient(LocalSQSClient):
+            def send_message_batch(self, QueueUrl, Entries):
+                seen['depth'] = len(connection.savepoint_ids)
+                # a second dispatcher running meanwhile finds nothing due
+                seen['other'] = outbox.dispatch_batch(LocalSQSClient(), QUEUE_URL)
+                return super().send_message_batch(QueueUrl, Entries)
+
+        self.assertEqual(outbox.dispatch_batch(CheckingSQSClient(), QUEUE_URL), (1, 0))
+        self.assertEqual(seen, {'depth': depth, 'other': (0, 0)})
+        self.assertIsNotNone(NotificationOutbox.objects.get().delivered_date)
+
+    def test_expired_lease_is_claimed_again(self):
+        publish_notification({"requestId": 1})
+        self.assertEqual(len(outbox.claim_batch()), 1)
+        # the dispatcher that claimed it never reported back
+        self.assertEqual(outbox.claim_batch(), [])
+        NotificationOutbox.objects.update(next_attempt_date=timezone.now())
+        self.assertEqual(outbox.dispatch_pending(LocalSQSClient(), QUEUE_URL), (1, 0))
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from unittest.mock import patch
+from requestAPI.models import Building, ServiceType, ServiceRequest
+from requestAPI.renderers import ORJSONRenderer, ORJSONParser
+import io
+import uuid
+
+
+class ORJSONRendererTests(TestCase):
+    def assertSameAsDRF(self, data, accepted_media_type=None):
+        self.assertEqual(
+            ORJSONRenderer().render(data, accepted_media_type),
+            JSONRenderer().render(data, accepted_media_type)
+        )
+
+    def test_matches_drf(self):
+        self.assertSameAsDRF([
+            OrderedDict([('id', 1), ('latitude', Decimal('51.507400')), ('name', None), ('active', True)]),
+            {
+                'utc': datetime(2024, 3, 1, 12, 30, 5, 123456, tzinfo=dt_timezone.utc),
+                'offset': datetime(2024, 3, 1, 12, 30, tzinfo=dt_timezone(timedelta(hours=1))),
+                'naive': datetime(2024, 3, 1, 12, 30),
+                'date': date(2024, 3, 1),
+                'time': time(9, 15),
+                'lazy': gettext_lazy('Open'),
+                'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+                'text': 'Zoë "quoted" \\ \n \u2028 \u2029 \U0001F600',
+                'numbers': (0, -1, 2.5, 2 ** 63 - 1),
+                1: 'int key',
+            },
+        ])
+
+    def test_falls_back_to_drf(self):
+        # indented output and ints orjson can't encode
+        self.assertSameAsDRF({'a': [1, 2]}, 'application/json; indent=4')
+        self.assertSameAsDRF({'big': 2 ** 70})
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+        with patch('requestAPI.renderers.orjson', None):
+            self.assertSameAsDRF({'latitude': Decimal('1.5')})
+
+    def test_api_responses_match_drf(self):
+        client = APIClient()
+        admin_user = User.objects.create_superuser('admin', 'admin@test.com', 'adminpass')
+        building = Building.objects.create(
+            name="Test Building", address_line1="123 Test St", city="Test City", postcode="12345",
+            latitude=Decimal('51.5074'), longitude=Decimal('-0.1278')
+        )
+        building.users.add(admin_user)
+        ServiceRequest.objects.create(
+            created_by=admin_user, building=building, customer_notes="Leak \u2028 under sink",
+            service_request_item=ServiceType.objects.create(name="Plumbing", description="Leaks")
+        )
+        client.force_authenticate(user=admin_user)
+        for url in (reverse('service-request-list'), reverse('building-list'), reverse('user-list')):
+            response = client.get(url)
+            self.assertEqual(response['Content-Type'], 'application/json')
+            self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+
+class ORJSONParserTests(TestCase):
+    def parse(self, parser, body, encoding='utf-8'):
+        return parser.parse(io.BytesIO(body), 'application/json', {'encoding': encoding})
+
+    def test_parses_like_drf(self):
+        body = '{"ids": [1, 2], "status": "completed", "comment": "Zoë", "nested": {"a": null, "b": 1.5}}'.encode()
+        self.assertEqual(self.parse(ORJSONParser(), body), self.parse(JSONParser(), body))
+        latin = '{"comment": "café"}'.encode('latin-1')
+        self.assertEqual(self.parse(ORJSONParser(), latin, 'latin-1'), {'comment': 'café'})
+
+    def test_errors_match_drf(self):
+        for body in (b'{"a": ', b'[NaN]', b'not json'):
+            with self.assertRaises(ParseError) as expected:
+                self.parse(JSONParser(), body)
+            with self.assertRaises(ParseError) as error:
+                self.parse(ORJSONParser(), body)
+            self.assertEqual(str(error.exception), str(expected.exception))
+
+    def test_json_request_bodies(self):
+        client = APIClient()
+        admin_user = User.objects.create_superuser('admin', 'admin@test.com', 'adminpass')
+        client.force_authenticate(user=admin_user)
+        response = client.post(reverse('building-list'), {
+            'name': 'JSON Building', 'address_line1': '1 JSON St', 'city': 'City', 'postcode': '12345',
+            'latitude': '51.5', 'longitude': '-0.12'
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        response = client.post(reverse('building-list'), data=b'{"name": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.data['detail'].startswith('JSON parse error'))
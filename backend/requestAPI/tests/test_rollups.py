@@ -0,0 +1,96 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from django.db.models import Count
+from django.db.models.functions import TruncDay
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+from rest_framework.test import APIClient
+from requestAPI.models import Building, ServiceType, ServiceRequest, DailyRequestStats
+from requestAPI.rollups import rebuild_daily_stats, record_status_changes
+
+class DailyRequestStatsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        # dashboard responses are cached, keep tests independent
+        cache.clear()
+        self.admin_user = User.objects.create_superuser('admin', 'admin@test.com', 'adminpass')
+        self.building = Building.objects.create(
+            name="Test Building",
+            address_line1="123 Test St",
+            city="Test City",
+            postcode="12345",
+            latitude=Decimal('51.5074'),
+            longitude=Decimal('-0.1278')
+        )
+        self.service_type = ServiceType.objects.create(name="Test Service", description="Test Description")
+
+    def create_request(self, **kwargs):
+        return ServiceRequest.objects.create(
+            created_by=self.admin_user,
+            service_request_item=self.service_type,
+            building=self.building,
+            **kwargs
+        )
+
+    def rollup(self):
+        return {
+            (row.day, row.building_id, row.service_type_id, row.status): row.count
+            for row in DailyRequestStats.objects.filter(count__gt=0)
+        }
+
+    def test_create_status_change_and_delete(self):
+        today = timezone.localdate()
+        first = self.create_request()
+        self.create_request()
+        key = (today, self.building.id, self.service_type.id, 'open')
+        self.assertEqual(self.rollup(), {key: 2})
+
+        first.status = 'completed'
+        first.save()
+        self.assertEqual(self.rollup(), {key: 1, key[:3] + ('completed',): 1})
+
+        first.delete()
+        self.assertEqual(self.rollup(), {key: 1})
+
+    def test_backfill_matches_incremental(self):
+        for request_status in ['open', 'open', 'in_progress', 'cancelled']:
+            self.create_request(status=request_status)
+        # rows written behind the signals' back, e.g. by a queryset update
+        ServiceRequest.objects.filter(status='cancelled').update(created_date=timezone.now() - timedelta(days=2))
+        incremental = self.rollup()
+
+        rebuild_daily_stats()
+
+        self.assertNotEqual(self.rollup(), incremental)
+        expected = {}
+        for service_request in ServiceRequest.objects.all():
+            key = (timezone.localtime(service_request.created_date).date(), self.building.id, self.service_type.id, service_request.status)
+            expected[key] = expected.get(key, 0) + 1
+        self.assertEqual(self.rollup(), expected)
+
+    def test_record_status_changes_for_bulk_updates(self):
+        requests = [self.create_request() for _ in range(3)]
+        record_status_changes(requests, 'completed')
+        ServiceRequest.objects.filter(id__in=[r.id for r in requests]).update(status='completed')
+        rebuilt = self.rollup()
+        rebuild_daily_stats()
+        self.assertEqual(rebuilt, self.rollup())
+
+    def test_requests_over_time_reads_rollup(self):
+        for _ in range(3):
+            self.create_request()
+        old = self.create_request()
+        ServiceRequest.objects.filter(id=old.id).update(created_date=timezone.now() - timedelta(days=20))
+        rebuild_daily_stats()
+
+        self.client.force_authenticate(user=self.admin_user)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('dashboard-requests-over-time') + '?timeframe=30days')
+
+        expected = list(ServiceRequest.objects.annotate(day=TruncDay('created_date')).values('day').annotate(count=Count('id')).order_by('day'))
+        self.assertEqual(list(response.data['requests_over_time']), expected)
+        week = self.client.get(reverse('dashboard-requests-over-time') + '?timeframe=7days')
+        self.assertEqual([row['count'] for row in week.data['requests_over_time']], [3])
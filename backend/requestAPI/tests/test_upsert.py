@@ -0,0 +1,38 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db.models import F, QuerySet
+from unittest.mock import patch
+from requestAPI.models import UnreadNotificationCounter
+from requestAPI.upsert import update_or_insert
+
+class UpdateOrInsertTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('regular', 'regular@test.com', 'regularpass')
+        self.key = {'user_id': self.user.id}
+
+    def increment(self, defaults={'count': 1}):
+        return update_or_insert(UnreadNotificationCounter, self.key, {'count': F('count') + 1}, defaults)
+
+    def test_inserts_then_updates(self):
+        self.assertFalse(self.increment())
+        self.assertTrue(self.increment())
+        self.assertEqual(UnreadNotificationCounter.objects.get(**self.key).count, 2)
+
+    def test_without_defaults_never_inserts(self):
+        self.assertFalse(self.increment(defaults=None))
+        self.assertFalse(UnreadNotificationCounter.objects.exists())
+
+    def test_lost_insert_race_updates_the_winner(self):
+        UnreadNotificationCounter.objects.create(count=1, **self.key)
+        update = QuerySet.update
+        calls = []
+
+        def racing_update(queryset, **kwargs):
+            # the first update runs before the other request's insert commits, so it matches nothing
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else update(queryset, **kwargs)
+
+        with patch.object(QuerySet, 'update', racing_update):
+            self.assertTrue(self.increment())
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(UnreadNotificationCounter.objects.get(**self.key).count, 2)
@@ -1,10 +1,15 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from unittest import mock
 from requestAPI.models import Building, ErrorLog
+from requestAPI.api.views.building_views import BuildingViewSet
 
 class BuildingViewSetTests(TestCase):
     def setUp(self):
@@ -38,11 +43,26 @@ class BuildingViewSetTests(TestCase):
         )
         self.building.users.add(self.regular_user)
 
+    @override_settings(ERROR_LOGGING={'INCLUDE_STATUS_CODES': [403], 'ASYNC': False})
     def test_error_log(self):
         # first test of all units, so quickly check error is logging correctly through custom exception handler
         self.client.force_authenticate(user=self.regular_user)
-        response = self.client.get(reverse('building-available-users', kwargs={'pk': self.building.pk}))
+        self.client.get(reverse('building-available-users', kwargs={'pk': self.building.pk}))
+        self.client.get(reverse('building-available-users', kwargs={'pk': self.building.pk}))
+        # repeats of the same error are counted on one row
         self.assertEqual(ErrorLog.objects.count(), 1)
+        self.assertEqual(ErrorLog.objects.get().occurrences, 2)
+
+    @override_settings(ERROR_LOGGING={'ASYNC': False})
+    def test_unhandled_errors_are_logged_as_500(self):
+        client = APIClient(raise_request_exception=False)
+        client.force_authenticate(user=self.admin_user)
+        with mock.patch.object(BuildingViewSet, 'list', side_effect=RuntimeError('boom')):
+            response = client.get(reverse('building-list'))
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        log = ErrorLog.objects.get()
+        self.assertEqual((log.status_code, log.exception_type), (500, 'builtins.RuntimeError'))
+        self.assertTrue(log.error_message.startswith('boom'))
 
     def test_list_buildings(self):
         self.client.force_authenticate(user=self.admin_user)
@@ -55,6 +75,39 @@ class BuildingViewSetTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 3)
 
+    def test_registration_list_bypasses_a_per_process_cache(self):
+        response = self.client.get(reverse('building-registration-list'))
+        self.assertEqual(response['X-Cache'], 'BYPASS')
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_registration_list_is_slim(self):
+        response = self.client.get(reverse('building-registration-list'))
+        self.assertEqual(response.json()[0], {'id': self.building.id, 'name': 'Test Building', 'city': 'Test City', 'postcode': '12345'})
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+
+    @override_settings(CACHE_SHARED=True)
+    def test_registration_list_revalidates(self):
+        cache.clear()
+        url = reverse('building-registration-list')
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(len(context.captured_queries), 0)
+        # compression middleware hands back a weak ETag
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=f'W/{etag}').status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.building2.name = "Renamed Building"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.building2.save()
+            # still the old list (and ETag) until the rename is committed
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn("Renamed Building", [building['name'] for building in response.data])
+
     def test_list_buildings_unauthorized(self):
         response = self.client.get(reverse('building-list'))
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1,16 +1,21 @@
 from django.test import TestCase
+from django.core.cache import cache
 from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.utils import timezone
 from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from requestAPI.models import ServiceRequest, Update, Building, ServiceType
 
 class DashboardViewSetTests(TestCase):
     def setUp(self):
 
         self.client = APIClient()
+        # dashboard responses are cached, keep tests independent
+        cache.clear()
         self.admin_user = User.objects.create_superuser('admin', 'admin@test.com', 'adminpass')
         self.regular_user = User.objects.create_user('regular', 'regular@test.com', 'regularpass')
         
@@ -66,6 +71,42 @@ class DashboardViewSetTests(TestCase):
         today_updates_count = Update.objects.filter(created_date__date=today, type="message").count()
         self.assertEqual(len(response.data['updates_today']), today_updates_count)
 
+    def test_todays_updates_apply_read_marker(self):
+        self.client.force_authenticate(user=self.admin_user)
+        update = Update.objects.create(
+            title="Reply", created_by=self.regular_user, service_request=ServiceRequest.objects.first(),
+            associated_to=self.admin_user, type='message'
+        )
+        self.client.post(reverse('update-mark-all-read'))
+        updates = self.client.get(reverse('dashboard-todays-updates')).data['updates_today']
+        self.assertTrue(next(row for row in updates if row['id'] == update.id)['is_read'])
+
+    def test_todays_updates_pages(self):
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('dashboard-todays-updates')
+        all_updates = [update['id'] for update in self.client.get(url).data['updates_today']]
+        response = self.client.get(url, {'page_size': 1})
+        self.assertEqual([update['id'] for update in response.data['updates_today']], all_updates[:1])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_todays_updates_query_count_is_constant(self):
+        self.client.force_authenticate(user=self.admin_user)
+
+        def comments(count):
+            for i in range(count):
+                author = User.objects.create_user(f'commenter{User.objects.count()}', f'c{i}@test.com', 'pass')
+                Update.objects.create(title="Comment", created_by=author, service_request=ServiceRequest.objects.first(), type="message")
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(reverse('dashboard-todays-updates'))
+            return len(context.captured_queries)
+
+        comments(2)
+        small = count_queries()
+        comments(15)
+        self.assertEqual(count_queries(), small)
+
     def test_action_required(self):
         self.client.force_authenticate(user=self.admin_user)
         
@@ -107,6 +148,33 @@ class DashboardViewSetTests(TestCase):
         )
         self.assertNotIn(far_future_request.id, request_ids)
 
+    def test_action_required_query_count_is_constant(self):
+        self.client.force_authenticate(user=self.admin_user)
+
+        def urgent_requests(count):
+            for i in range(count):
+                building = Building.objects.create(
+                    name=f"Building {i}", address_line1="1 St", city="City", postcode="1", latitude=1, longitude=1
+                )
+                building.users.add(self.regular_user)
+                ServiceRequest.objects.create(
+                    status='open',
+                    created_by=self.regular_user,
+                    service_request_item=self.service_type,
+                    building=building,
+                    service_level_agreement_date=timezone.now()
+                )
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(reverse('dashboard-action-required'))
+            return len(context.captured_queries)
+
+        urgent_requests(2)
+        small = count_queries()
+        urgent_requests(15)
+        self.assertEqual(count_queries(), small)
+
     def test_requests_by_building(self):
         self.client.force_authenticate(user=self.admin_user)
         response = self.client.get(reverse('dashboard-requests-by-building'))
@@ -136,3 +204,29 @@ class DashboardViewSetTests(TestCase):
         for status_type in ['open', 'in_progress', 'completed']:
             actual_count = ServiceRequest.objects.filter(status=status_type).count()
             self.assertEqual(response.data['stats'][f'{status_type}_requests']['value'], actual_count)
+
+    def test_general_stats_overdue_and_priority_breakdown(self):
+        self.client.force_authenticate(user=self.admin_user)
+        ServiceRequest.objects.update(service_level_agreement_date=timezone.now() + timedelta(days=5))
+        for sla, request_status in [(timedelta(days=-1), 'open'), (timedelta(hours=-2), 'in_progress'),
+                                    (timedelta(hours=3), 'open'), (timedelta(days=-3), 'completed'),
+                                    (timedelta(hours=1), 'cancelled')]:
+            ServiceRequest.objects.create(
+                status=request_status,
+                priority='high',
+                created_by=self.admin_user,
+                service_request_item=self.service_type,
+                building=self.building,
+                service_level_agreement_date=timezone.now() + sla
+            )
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('dashboard-general-stats'))
+        stats = response.data['stats']
+
+        self.assertEqual(stats['overdue_requests']['value'], 2)
+        self.assertEqual(stats['due_within_24h_requests']['value'], 1)
+        self.assertEqual(stats['cancelled_requests']['value'], 1)
+        active = ServiceRequest.objects.filter(status__in=['open', 'in_progress'])
+        for priority in ['low', 'medium', 'high']:
+            self.assertEqual(stats[f'{priority}_priority_requests']['value'], active.filter(priority=priority).count())
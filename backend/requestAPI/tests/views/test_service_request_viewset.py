@@ -3,8 +3,16 @@ from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from datetime import timedelta
 from decimal import Decimal
-from requestAPI.models import Building, ServiceType, ServiceRequest, ErrorLog
+from django.test import override_settings
+from unittest.mock import patch
+from requestAPI.models import Building, ServiceType, ServiceRequest, ErrorLog, Update, NotificationOutbox, DailyRequestStats, UnreadNotificationCounter
+from requestAPI.rollups import rebuild_daily_stats
+from requestAPI.read_markers import refresh_unread_count
 
 class ServiceRequestViewSetTests(TestCase):
     def setUp(self):
@@ -90,4 +98,261 @@ class ServiceRequestViewSetTests(TestCase):
         )
         response = self.client.get(reverse('service-request-detail', kwargs={'pk': service_request_without_access.id}))
         
-        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def create_requests(self, count):
+        for i in range(count):
+            building = Building.objects.create(
+                name=f"Building {i}",
+                address_line1=f"{i} Test St",
+                city="Test City",
+                postcode="12345",
+                latitude=Decimal('51.5074'),
+                longitude=Decimal('-0.1278')
+            )
+            building.users.add(self.regular_user, self.admin_user)
+            service_type = ServiceType.objects.create(name=f"Service {i}", description="Test Description")
+            ServiceRequest.objects.create(
+                created_by=self.regular_user,
+                service_request_item=service_type,
+                building=building
+            )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def test_list_query_count_is_constant(self):
+        self.client.force_authenticate(user=self.admin_user)
+        self.create_requests(2)
+        small = self.count_queries(reverse('service-request-list'))
+        self.create_requests(20)
+        self.assertEqual(self.count_queries(reverse('service-request-list')), small)
+
+    def test_retrieve_query_count(self):
+        self.client.force_authenticate(user=self.regular_user)
+        self.service_request.building.users.add(self.regular_user)
+        # service request (with joins) and the building's users
+        with self.assertNumQueries(2):
+            self.client.get(reverse('service-request-detail', kwargs={'pk': self.service_request.id}))
+
+    def test_user_home_data_query_count_is_constant(self):
+        self.client.force_authenticate(user=self.regular_user)
+        self.create_requests(2)
+        small = self.count_queries(reverse('service-request-user-home-data'))
+        self.create_requests(8)
+        self.assertEqual(self.count_queries(reverse('service-request-user-home-data')), small)
+
+    def walk_pages(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [item['id'] for item in response.data['results']]
+            url = response.data['next']
+            pages += 1
+        return ids, pages
+
+    def test_cursor_pagination_admin_orders_by_sla(self):
+        self.client.force_authenticate(user=self.admin_user)
+        now = timezone.now()
+        for i in range(11):
+            ServiceRequest.objects.create(
+                created_by=self.regular_user,
+                service_request_item=self.service_type,
+                building=self.building,
+                # pairs of identical SLA dates to exercise the id tie-break
+                service_level_agreement_date=now + timedelta(hours=i // 2)
+            )
+        ServiceRequest.objects.filter(id=self.service_request.id).update(service_level_agreement_date=None)
+
+        ids, pages = self.walk_pages(reverse('service-request-list') + '?page_size=4')
+
+        expected = list(ServiceRequest.objects.exclude(id=self.service_request.id).order_by('service_level_agreement_date', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected + [self.service_request.id])
+        self.assertEqual(pages, 3)
+
+    def test_cursor_pagination_null_tail_spans_pages(self):
+        self.client.force_authenticate(user=self.admin_user)
+        for i in range(8):
+            ServiceRequest.objects.create(created_by=self.regular_user, service_request_item=self.service_type, building=self.building)
+        nulls = list(ServiceRequest.objects.order_by('-id').values_list('id', flat=True)[:5])
+        ServiceRequest.objects.filter(id__in=nulls).update(service_level_agreement_date=None)
+
+        ids, pages = self.walk_pages(reverse('service-request-list') + '?page_size=3')
+
+        dated = list(ServiceRequest.objects.exclude(id__in=nulls).order_by('service_level_agreement_date', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, dated + sorted(nulls))
+        self.assertEqual(pages, 3)
+
+    def test_cursor_pagination_customer_newest_first(self):
+        self.client.force_authenticate(user=self.regular_user)
+        for i in range(5):
+            ServiceRequest.objects.create(created_by=self.regular_user, service_request_item=self.service_type, building=self.building)
+        ServiceRequest.objects.create(created_by=self.admin_user, service_request_item=self.service_type, building=self.building)
+
+        ids, _ = self.walk_pages(reverse('service-request-list') + '?page_size=2')
+
+        expected = list(ServiceRequest.objects.filter(created_by=self.regular_user).order_by('-created_date', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_cursor_pagination_respects_ordering_and_filters(self):
+        self.client.force_authenticate(user=self.admin_user)
+        for priority in ['high', 'low', 'high', 'medium', 'high']:
+            ServiceRequest.objects.create(created_by=self.regular_user, service_request_item=self.service_type, building=self.building, priority=priority)
+
+        ids, _ = self.walk_pages(reverse('service-request-list') + '?page_size=2&priority=high&ordering=-id')
+
+        expected = list(ServiceRequest.objects.filter(priority='high').order_by('-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_cursor_pagination_page_query_count_is_constant(self):
+        self.client.force_authenticate(user=self.admin_user)
+        self.create_requests(12)
+        first = self.client.get(reverse('service-request-list') + '?page_size=4')
+        first_page = self.count_queries(reverse('service-request-list') + '?page_size=4')
+        self.assertEqual(self.count_queries(first.data['next']), first_page)
+
+    def test_invalid_cursor(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('service-request-list') + '?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_without_pagination_params_is_unpaginated(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('service-request-list'))
+        self.assertIsInstance(response.data, list)
+
+    def bulk_update_status(self, data):
+        return self.client.post(reverse('service-request-bulk-update-status'), data, format='json')
+
+    def test_bulk_update_status_results(self):
+        self.client.force_authenticate(user=self.admin_user)
+        self.create_requests(2)
+        first, second = ServiceRequest.objects.exclude(id=self.service_request.id).order_by('id')
+        second.status = 'completed'
+        second.save()
+        response = self.bulk_update_status({'ids': [first.id, second.id, 9999, first.id], 'status': 'completed', 'comment': 'All done'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [
+            {'id': first.id, 'result': 'updated', 'previous_status': 'open', 'status': 'completed'},
+            {'id': second.id, 'result': 'unchanged', 'status': 'completed'},
+            {'id': 9999, 'result': 'not_found'},
+        ])
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'completed')
+        # a status event and the comment, only for the request that moved
+        self.assertEqual(
+            list(Update.objects.filter(created_by=self.admin_user).values_list('service_request_id', 'type', 'associated_to_id')),
+            [(first.id, 'event', self.regular_user.id), (first.id, 'message', self.regular_user.id)]
+        )
+        self.assertEqual([row.payload['type'] for row in NotificationOutbox.objects.order_by('id')], ['STATUS_CHANGED', 'COMMENT_ADDED'])
+
+    def test_bulk_and_single_payloads_match(self):
+        self.client.force_authenticate(user=self.admin_user)
+        self.create_requests(1)
+        other = ServiceRequest.objects.exclude(id=self.service_request.id).get()
+        self.client.patch(reverse('service-request-update-status', kwargs={'pk': self.service_request.id}), {'status': 'completed', 'comment': 'Done'})
+        self.bulk_update_status({'ids': [other.id], 'status': 'completed', 'comment': 'Done'})
+        payloads = {}
+        for row in NotificationOutbox.objects.order_by('id'):
+            payload = dict(row.payload)
+            for changing in ('requestId', 'service', 'building', 'slaDate', 'timestamp'):
+                payload.pop(changing)
+            payloads.setdefault(payload['type'], []).append(payload)
+        for notification_type in ('STATUS_CHANGED', 'COMMENT_ADDED'):
+            single, bulk = payloads[notification_type]
+            self.assertEqual(single, bulk)
+
+    def test_bulk_update_status_keeps_rollup_and_counters(self):
+        self.client.force_authenticate(user=self.admin_user)
+        self.create_requests(3)
+        self.bulk_update_status({'ids': list(ServiceRequest.objects.values_list('id', flat=True)), 'status': 'in_progress'})
+        incremental = set(DailyRequestStats.objects.filter(count__gt=0).values_list('day', 'building', 'service_type', 'status', 'count'))
+        rebuild_daily_stats()
+        self.assertEqual(incremental, set(DailyRequestStats.objects.values_list('day', 'building', 'service_type', 'status', 'count')))
+        self.assertEqual(UnreadNotificationCounter.objects.get(user=self.regular_user).count, 4)
+
+    @patch('requestAPI.utils.notification_dispatcher')
+    def test_bulk_update_status_events(self, dispatcher):
+        self.client.force_authenticate(user=self.admin_user)
+        self.create_requests(2)
+        ids = list(ServiceRequest.objects.values_list('id', flat=True))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bulk_update_status({'ids': ids, 'status': 'completed', 'comment': 'Done'})
+        groups = [call.args[0] for call in dispatcher.enqueue.call_args_list]
+        self.assertEqual(groups.count(f"user_{self.regular_user.id}"), 3)
+        self.assertEqual(groups.count('admin_feed'), 6)
+        # every timeline event in one dispatch, a status event and the comment per request
+        dispatcher.enqueue_many.assert_called_once()
+        timeline = dispatcher.enqueue_many.call_args.args[0]
+        self.assertEqual(sorted(group for group, _ in timeline), sorted(f"request_{id}" for id in ids for _ in range(2)))
+        notifications = [call.args[1] for call in dispatcher.enqueue.call_args_list if call.args[0].startswith('user_')]
+        self.assertEqual({notification['unread_count'] for notification in notifications}, {6})
+        self.assertEqual(
+            sorted(notification['notification']['id'] for notification in notifications),
+            list(Update.objects.filter(created_by=self.admin_user, type='event').order_by('id').values_list('id', flat=True))
+        )
+
+    def test_bulk_update_status_query_count_is_constant(self):
+        self.client.force_authenticate(user=self.admin_user)
+        self.create_requests(2)
+        # the first count for a user is a full recount
+        refresh_unread_count(self.regular_user.id)
+        with CaptureQueriesContext(connection) as small:
+            self.bulk_update_status({'ids': list(ServiceRequest.objects.values_list('id', flat=True)), 'status': 'in_progress'})
+        self.create_requests(10)
+        with CaptureQueriesContext(connection) as large:
+            self.bulk_update_status({'ids': list(ServiceRequest.objects.values_list('id', flat=True)), 'status': 'completed'})
+        # the rollup (and its savepoints) only grows with the number of distinct (day, building, service type) keys moved
+        rollup_queries = lambda context: sum(
+            'requestAPI_dailyrequeststats' in query['sql'] or 'SAVEPOINT' in query['sql'] for query in context.captured_queries
+        )
+        self.assertEqual(len(large.captured_queries) - rollup_queries(large), len(small.captured_queries) - rollup_queries(small))
+
+    @override_settings(BULK_STATUS_MAX_IDS=2)
+    def test_bulk_update_status_validation(self):
+        self.client.force_authenticate(user=self.regular_user)
+        self.assertEqual(self.bulk_update_status({'ids': [self.service_request.id], 'status': 'completed'}).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.admin_user)
+        for data in [{'ids': [1, 2, 3], 'status': 'completed'}, {'ids': [], 'status': 'completed'},
+                     {'ids': 'abc', 'status': 'completed'}, {'ids': [self.service_request.id], 'status': 'invalid_status'}]:
+            self.assertEqual(self.bulk_update_status(data).status_code, status.HTTP_400_BAD_REQUEST)
+        self.service_request.refresh_from_db()
+        self.assertEqual(self.service_request.status, 'open')
+
+    def test_sparse_fields(self):
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('service-request-list')
+        default = self.client.get(url).data[0]
+        self.assertIn('building_detail', default)
+        self.assertIn('users', default['building_detail'])
+
+        response = self.client.get(url, {'fields': 'id,status'})
+        self.assertEqual(list(response.data[0]), ['id', 'status'])
+        response = self.client.get(url, {'fields': 'id', 'expand': 'building_detail'})
+        self.assertEqual(list(response.data[0]), ['id', 'building_detail'])
+        self.assertEqual(response.data[0]['building_detail'], default['building_detail'])
+        # expand on its own keeps the plain fields and drops the other nested objects
+        response = self.client.get(url, {'expand': 'created_by'})
+        self.assertEqual(set(default) - set(response.data[0]), {'building_detail', 'service_request_item_detail'})
+
+    def test_sparse_fields_skip_nested_queries(self):
+        self.client.force_authenticate(user=self.admin_user)
+        self.create_requests(3)
+        url = reverse('service-request-list')
+        full = self.count_queries(url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url, {'fields': 'id,status'})
+        # no building users prefetch, no joins
+        self.assertLess(len(context.captured_queries), full)
+        self.assertFalse(any('JOIN' in query['sql'] for query in context.captured_queries if 'requestAPI_servicerequest' in query['sql']))
+
+    def test_sparse_fields_ignored_on_writes(self):
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('service-request-update-status', kwargs={'pk': self.service_request.id})
+        response = self.client.patch(f"{url}?fields=id", {'status': 'in_progress'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'in_progress')
@@ -5,8 +5,11 @@ from rest_framework.test import APIClient
 from rest_framework import status
 from django.urls import reverse
 from decimal import Decimal
-from requestAPI.models import Building, ServiceType, ServiceRequest, Update
+from requestAPI.models import Building, ServiceType, ServiceRequest, Update, NotificationReadMarker, UnreadNotificationCounter
 from django.utils import timezone
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from unittest.mock import patch
 
 class UpdateViewSetTests(TestCase):
     def setUp(self):
@@ -111,3 +114,229 @@ class UpdateViewSetTests(TestCase):
         self.client.force_authenticate(user=another_user)
         response = self.client.post(reverse('update-mark-read', kwargs={'id': self.update.id}))
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def create_updates(self, count, **fields):
+        # each from a different author so a missing select_related shows up as extra queries
+        for i in range(count):
+            author = User.objects.create_user(f'author{Update.objects.count()}', f'author{i}@test.com', 'pass')
+            Update.objects.create(
+                title=f"Update {i}",
+                created_by=author,
+                service_request=self.service_request,
+                associated_to=self.regular_user,
+                **fields
+            )
+
+    def count_queries(self, url, params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def test_service_request_updates_pages(self):
+        self.client.force_authenticate(user=self.regular_user)
+        self.create_updates(4)
+        url = reverse('update-service-request-updates')
+        response = self.client.get(url, {'service_request_id': self.service_request.id, 'page_size': 3})
+        first_page = [update['id'] for update in response.data['results']]
+        self.assertEqual(len(first_page), 3)
+        response = self.client.get(response.data['next'])
+        second_page = [update['id'] for update in response.data['results']]
+        self.assertIsNone(response.data['next'])
+        # newest first across pages, every update exactly once
+        expected = list(Update.objects.filter(service_request=self.service_request).order_by('-created_date', '-id').values_list('id', flat=True))
+        self.assertEqual(first_page + second_page, expected)
+
+    def test_service_request_updates_unpaginated_by_default(self):
+        self.client.force_authenticate(user=self.regular_user)
+        response = self.client.get(reverse('update-service-request-updates'), {'service_request_id': self.service_request.id})
+        self.assertIsInstance(response.data, list)
+
+    def test_update_pages_use_constant_queries(self):
+        self.client.force_authenticate(user=self.regular_user)
+        timeline = (reverse('update-service-request-updates'), {'service_request_id': self.service_request.id, 'page_size': 50})
+        notifications = (reverse('update-notifications'), {'page_size': 50})
+        self.create_updates(2)
+        small = [self.count_queries(*timeline), self.count_queries(*notifications)]
+        self.create_updates(20)
+        self.assertEqual([self.count_queries(*timeline), self.count_queries(*notifications)], small)
+
+    def test_notifications_pages(self):
+        self.client.force_authenticate(user=self.regular_user)
+        self.create_updates(3)
+        response = self.client.get(reverse('update-notifications'), {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+
+    def notification_ids(self):
+        return sorted(update['id'] for update in self.client.get(reverse('update-notifications')).data)
+
+    def test_mark_all_read_is_a_single_marker_row(self):
+        self.client.force_authenticate(user=self.regular_user)
+        self.create_updates(3)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse('update-mark-all-read'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # the Update rows themselves are untouched, and the counter is zeroed without counting them
+        self.assertFalse(any('UPDATE "requestAPI_update"' in query['sql'] for query in context.captured_queries))
+        self.assertFalse(any('COUNT(' in query['sql'] for query in context.captured_queries))
+        self.assertEqual(UnreadNotificationCounter.objects.get(user=self.regular_user).count, 0)
+        self.assertEqual(NotificationReadMarker.objects.get(user=self.regular_user).last_read_id, Update.objects.latest('id').id)
+        self.assertEqual(self.notification_ids(), [])
+
+        # anything newer than the watermark is unread again
+        self.create_updates(1)
+        self.assertEqual(self.notification_ids(), [Update.objects.latest('id').id])
+
+    def test_marked_updates_report_is_read(self):
+        self.client.force_authenticate(user=self.regular_user)
+        self.create_updates(1)
+        self.client.post(reverse('update-mark-all-read'))
+        response = self.client.get(reverse('update-list'))
+        self.assertTrue(all(update['is_read'] for update in response.data))
+
+    def test_is_read_filter_applies_watermark(self):
+        self.client.force_authenticate(user=self.regular_user)
+        self.create_updates(2)
+        self.client.post(reverse('update-mark-all-read'))
+        self.create_updates(1)
+        newest = Update.objects.latest('id').id
+        unread = self.client.get(reverse('update-list'), {'is_read': 'false'}).data
+        self.assertEqual([update['id'] for update in unread], [newest])
+        read = self.client.get(reverse('update-list'), {'is_read': 'true'}).data
+        self.assertEqual(sorted(update['id'] for update in read), sorted(Update.objects.exclude(id=newest).values_list('id', flat=True)))
+        self.assertTrue(all(update['is_read'] for update in read))
+
+    def test_mark_all_read_for_one_request(self):
+        self.client.force_authenticate(user=self.regular_user)
+        other_request = ServiceRequest.objects.create(
+            created_by=self.regular_user, service_request_item=self.service_type, building=self.building
+        )
+        self.create_updates(2)
+        other = Update.objects.create(
+            title="Other", created_by=self.admin_user, service_request=other_request, associated_to=self.regular_user
+        )
+        self.assertEqual(self.unread_count(), 3)
+        response = self.client.post(reverse('update-mark-all-read'), {'service_request': self.service_request.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.notification_ids(), [other.id])
+        # only that request's two came off the count
+        self.assertEqual(UnreadNotificationCounter.objects.get(user=self.regular_user).count, 1)
+
+    def test_watermark_never_moves_back(self):
+        self.client.force_authenticate(user=self.regular_user)
+        self.create_updates(2)
+        self.client.post(reverse('update-mark-all-read'))
+        last_read_id = NotificationReadMarker.objects.get(user=self.regular_user).last_read_id
+        from requestAPI.read_markers import advance_read_marker
+        advance_read_marker(self.regular_user.id, 1)
+        self.assertEqual(NotificationReadMarker.objects.get(user=self.regular_user).last_read_id, last_read_id)
+
+    def unread_count(self):
+        response = self.client.get(reverse('update-unread-count'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['unread_count']
+
+    def test_unread_count_follows_notifications(self):
+        self.client.force_authenticate(user=self.regular_user)
+        self.create_updates(3)
+        self.assertEqual(self.unread_count(), len(self.notification_ids()))
+        self.assertEqual(self.unread_count(), 3)
+
+        newest = Update.objects.latest('id')
+        self.client.post(reverse('update-mark-read', kwargs={'id': newest.id}))
+        self.client.post(reverse('update-mark-read', kwargs={'id': newest.id}))
+        self.assertEqual(self.unread_count(), 2)
+
+        self.client.post(reverse('update-mark-all-read'))
+        self.assertEqual(self.unread_count(), 0)
+        self.create_updates(1)
+        self.assertEqual(self.unread_count(), 1)
+        Update.objects.latest('id').delete()
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_cascade_delete_adjusts_the_count_without_recounting(self):
+        self.client.force_authenticate(user=self.regular_user)
+        self.create_updates(4)
+        self.client.post(reverse('update-mark-read', kwargs={'id': Update.objects.latest('id').id}))
+        self.assertEqual(self.unread_count(), 3)
+        with CaptureQueriesContext(connection) as context:
+            self.service_request.delete()
+        self.assertFalse(any('COUNT(' in query['sql'] for query in context.captured_queries))
+        self.assertEqual(UnreadNotificationCounter.objects.get(user=self.regular_user).count, 0)
+
+    def test_unread_count_reads_the_counter(self):
+        self.client.force_authenticate(user=self.regular_user)
+        self.create_updates(5)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.unread_count(), 5)
+        self.assertFalse(any('"requestAPI_update"' in query['sql'] for query in context.captured_queries))
+
+    def test_unread_count_backfills_missing_counter(self):
+        self.client.force_authenticate(user=self.regular_user)
+        self.create_updates(2)
+        UnreadNotificationCounter.objects.all().delete()
+        self.assertEqual(self.unread_count(), 2)
+        self.assertEqual(UnreadNotificationCounter.objects.get(user=self.regular_user).count, 2)
+
+    @patch('requestAPI.utils.notification_dispatcher')
+    def test_notification_event_carries_unread_count(self, dispatcher):
+        self.client.force_authenticate(user=self.admin_user)
+        self.create_updates(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('update-list'), {
+                'service_request': self.service_request.id,
+                'message': 'New comment'
+            })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        events = [call.args[1] for call in dispatcher.enqueue.call_args_list if call.args[0] == f"user_{self.regular_user.id}"]
+        self.assertEqual([event['unread_count'] for event in events], [3])
+
+    def unread_count_events(self, dispatcher, user):
+        return [event['unread_count'] for group, event in (call.args for call in dispatcher.enqueue.call_args_list)
+                if group == f"user_{user.id}" and event['type'] == 'unread_count']
+
+    @patch('requestAPI.utils.notification_dispatcher')
+    def test_marking_read_pushes_the_unread_count(self, dispatcher):
+        self.client.force_authenticate(user=self.regular_user)
+        self.create_updates(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('update-mark-read', kwargs={'id': Update.objects.latest('id').id}))
+        with self.captureOnCommitCallbacks(execute=True):
+            # already read, nothing changed so nothing is sent
+            self.client.post(reverse('update-mark-read', kwargs={'id': Update.objects.latest('id').id}))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('update-mark-all-read'))
+        self.assertEqual(self.unread_count_events(dispatcher, self.regular_user), [2, 0])
+
+    def test_edits_only_recount_when_the_read_state_changes(self):
+        self.create_updates(2)
+        update = Update.objects.latest('id')
+        with CaptureQueriesContext(connection) as context:
+            update.title = 'Edited'
+            update.save()
+            update.save(update_fields=['message'])
+        self.assertFalse(any('"requestAPI_unreadnotificationcounter"' in query['sql'] for query in context.captured_queries))
+        self.assertFalse(any('COUNT(' in query['sql'] for query in context.captured_queries))
+        self.assertEqual(UnreadNotificationCounter.objects.get(user=self.regular_user).count, 2)
+
+        update.is_read = True
+        update.save()
+        self.assertEqual(UnreadNotificationCounter.objects.get(user=self.regular_user).count, 1)
+        update.is_read = False
+        update.save()
+        self.assertEqual(UnreadNotificationCounter.objects.get(user=self.regular_user).count, 2)
+
+    @patch('requestAPI.utils.notification_dispatcher')
+    def test_reassigned_update_moves_between_counts(self, dispatcher):
+        other_user = User.objects.create_user('other', 'other@test.com', 'otherpass')
+        self.create_updates(2)
+        update = Update.objects.latest('id')
+        with self.captureOnCommitCallbacks(execute=True):
+            update.associated_to = other_user
+            update.save()
+        self.assertEqual(UnreadNotificationCounter.objects.get(user=self.regular_user).count, 1)
+        self.assertEqual(UnreadNotificationCounter.objects.get(user=other_user).count, 1)
+        self.assertEqual(self.unread_count_events(dispatcher, self.regular_user), [1])
+        self.assertEqual(self.unread_count_events(dispatcher, other_user), [1])
@@ -3,6 +3,10 @@ from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from decimal import Decimal
+from requestAPI.models import Building
 
 class UserViewSetTests(TestCase):
     def setUp(self):
@@ -18,6 +22,23 @@ class UserViewSetTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), User.objects.count())
 
+    def test_list_users_buildings_are_opt_out(self):
+        self.client.force_authenticate(user=self.admin_user)
+        building = Building.objects.create(
+            name="Test Building", address_line1="123 Test St", city="Test City", postcode="12345",
+            latitude=Decimal('51.5074'), longitude=Decimal('-0.1278')
+        )
+        for i in range(3):
+            User.objects.create_user(f'user{i}', f'user{i}@test.com', 'pass').buildings.add(building)
+        with CaptureQueriesContext(connection) as full:
+            response = self.client.get(reverse('user-list'))
+        self.assertEqual(response.data[-1]['buildings'][0]['name'], "Test Building")
+        with CaptureQueriesContext(connection) as sparse:
+            response = self.client.get(reverse('user-list'), {'fields': 'id,username'})
+        self.assertEqual(list(response.data[-1]), ['id', 'username'])
+        # one prefetch for every user's buildings, none without them
+        self.assertEqual(len(full.captured_queries) - len(sparse.captured_queries), 1)
+
     def test_list_users_unauthorized(self):
         response = self.client.get(reverse('user-list'))
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,23 @@
+from django.db import IntegrityError, transaction
+
+
+def update_or_insert(model, key, updates, defaults=None):
+    """
+    Applies updates (values or F()/expressions) to the row matching key, or inserts key + defaults if there is
+    no such row yet - the insert runs in a savepoint and, if a concurrent request created the row first, the
+    update is applied to theirs instead. defaults=None never inserts. Returns whether a row was updated.
+
+    Unlike update_or_create this never locks or reads the row, the common case is a single UPDATE.
+    """
+    rows = model.objects.filter(**key)
+    if rows.update(**updates):
+        return True
+    if defaults is None:
+        return False
+    try:
+        with transaction.atomic():
+            model.objects.create(**key, **defaults)
+        return False
+    except IntegrityError:
+        # another request created the row first
+        return bool(rows.update(**updates))
@@ -1,48 +1,139 @@
 from rest_framework.views import exception_handler
-from .models import ErrorLog
-import traceback
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-import boto3
-import json
+from .models import NotificationOutbox
+from .error_logging import error_log_writer
+from .dispatcher import notification_dispatcher
+from .read_markers import get_unread_count, get_unread_counts
+from django.db import transaction
 import logging
-import os
 
 logger = logging.getLogger(__name__)
 
-sqs = boto3.client('sqs', region_name='eu-north-1')
+def publish_notification(payload: dict) -> None:
+    # queue the notification in the outbox rather than calling SQS from the request thread,
+    # the row is committed (or rolled back) with the Update that caused it and delivered by
+    # the dispatch_notifications management command - see requestAPI.outbox
+    NotificationOutbox.objects.create(payload=payload)
 
-QUEUE_URL = os.environ.get('SQS_NOTIFICATION_QUEUE_URL')
+def publish_notifications(payloads) -> None:
+    # publish_notification for many payloads in a single insert
+    NotificationOutbox.objects.bulk_create([NotificationOutbox(payload=payload) for payload in payloads])
 
-def publish_notification(payload: dict) -> None:
-    if not QUEUE_URL:
-        logger.error('SQS_NOTIFICATION_QUEUE_URL environment variable is not set')
-        return
-    try:
-        sqs.send_message(
-            QueueUrl=QUEUE_URL,
-            MessageBody=json.dumps(payload)
-        )
-        logger.info(f"Notification published to SQS for request {payload.get('requestId')}")
-    except Exception as e:
-        logger.error(f"Failed to publish notification to SQS: {str(e)}")
+def customer_notification_payload(service_request, update, notification_type, **fields):
+    # the outbox payload every customer notification shares, the request's creator is always the recipient
+    customer = service_request.created_by
+    return {
+        "requestId": service_request.id,
+        "type": notification_type,
+        "recipientEmail": customer.email,
+        "recipientName": customer.get_full_name() or customer.username,
+        "recipientRole": "customer",
+        "service": service_request.service_request_item.name,
+        "building": service_request.building.name,
+        "priority": service_request.priority,
+        "slaDate": service_request.service_level_agreement_date.isoformat(),
+        "timestamp": update.created_date.isoformat(),
+        **fields
+    }
+
+def status_changed_payload(service_request, update, previous_status, new_status):
+    return customer_notification_payload(
+        service_request, update, "STATUS_CHANGED", previousStatus=previous_status, newStatus=new_status
+    )
+
+def comment_added_payload(service_request, update, author):
+    return customer_notification_payload(
+        service_request, update, "COMMENT_ADDED",
+        commentAuthor=author.get_full_name() or author.username, commentContent=update.message
+    )
 
 def send_notification_to_user(user_id, notification):
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        f"user_{user_id}",
-        {
-            "type": "send_notification",
-            "notification": notification
+    # only queued once the surrounding transaction commits (straight away if there isn't one) so rolled back
+    # updates never reach the socket, the dispatcher then sends it from its own loop without blocking the view.
+    # The user's unread count is read once committed so the badge can update without fetching the list
+    send_notifications_to_users([(user_id, notification)])
+
+def send_notifications_to_users(notifications):
+    # send_notification_to_user for many (user_id, notification) pairs - one on commit callback that reads every
+    # recipient's unread count in one go and queues all the events together, the dispatcher then batches them per user
+    notifications = list(notifications)
+
+    def enqueue():
+        unread_counts = get_unread_counts({user_id for user_id, _ in notifications})
+        for user_id, notification in notifications:
+            notification_dispatcher.enqueue(f"user_{user_id}", {
+                "type": "send_notification",
+                "notification": notification,
+                "unread_count": unread_counts[user_id]
+            })
+    transaction.on_commit(enqueue)
+
+def send_unread_count(user_id):
+    # the badge after something was marked read (or an edit moved an update between users) - the same user group
+    # notifications go to, read once committed like theirs
+    def enqueue():
+        notification_dispatcher.enqueue(f"user_{user_id}", {
+            "type": "unread_count",
+            "unread_count": get_unread_count(user_id)
+        })
+    transaction.on_commit(enqueue)
+
+# admin dashboards subscribe to the global feed or to individual buildings - see AdminFeedConsumer
+ADMIN_FEED_GROUP = "admin_feed"
+
+def admin_building_group(building_id):
+    return f"admin_building_{building_id}"
+
+def send_admin_event(event_type, service_request, **fields):
+    # compact delta for live admin views (request_created, status_changed, comment_added), queued on commit
+    # like user notifications so the dashboards never see a change that was rolled back
+    sla_date = service_request.service_level_agreement_date
+    event = {
+        "type": "admin_event",
+        "event": {
+            "type": event_type,
+            "request_id": service_request.id,
+            "building_id": service_request.building_id,
+            "status": service_request.status,
+            "priority": service_request.priority,
+            "sla_date": sla_date.isoformat() if sla_date else None,
+            **fields
         }
-    )
+    }
+
+    def enqueue():
+        notification_dispatcher.enqueue(ADMIN_FEED_GROUP, event)
+        notification_dispatcher.enqueue(admin_building_group(service_request.building_id), event)
+    transaction.on_commit(enqueue)
+
+def request_timeline_group(service_request_id):
+    return f"request_{service_request_id}"
+
+def send_timeline_update(update_data):
+    # new Update pushed to request detail pages that have the request open - see RequestTimelineConsumer
+    event = {
+        "type": "timeline_update",
+        "update": update_data
+    }
+    group = request_timeline_group(update_data['service_request'])
+    transaction.on_commit(lambda: notification_dispatcher.enqueue(group, event))
+
+def send_timeline_updates(updates_data):
+    # send_timeline_update for many updates - one on commit callback, each request's updates leave together
+    # as a single channel layer message
+    events = [
+        (request_timeline_group(update_data['service_request']), {"type": "timeline_update", "update": update_data})
+        for update_data in updates_data
+    ]
+    transaction.on_commit(lambda: notification_dispatcher.enqueue_many(events))
 
 def error_log_exception_handler(exc, context):
     response = exception_handler(exc, context)
     request = context['request']
+    # aggregated by fingerprint and written in batches off the request thread, 4xx are filtered out
+    # by default - see ERROR_LOGGING in settings
     if response is not None:
-        ErrorLog.objects.create(
-            endpoint=request.path,
-            error_message=f"{str(exc)}\n{traceback.format_exc()}",
-        )
-    return response
\ No newline at end of file
+        error_log_writer.record(request, exc, response.status_code)
+    else:
+        # unhandled, Django turns it into a 500 once this returns None
+        error_log_writer.record(request, exc, 500)
+    return response